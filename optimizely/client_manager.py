@@ -0,0 +1,212 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+from . import logger as _logging
+from . import optimizely
+
+
+def get_approximate_size(config):
+  """ Get the approximate number of bytes of memory held by a project config.
+
+  All objects reachable from the config are counted once, except for classes, modules,
+  functions as well as the logger and error handler, which are not owned by the config.
+
+  Args:
+    config: ProjectConfig to measure.
+
+  Returns:
+    Number of bytes.
+  """
+
+  excluded_ids = set([id(config.logger), id(config.error_handler)])
+  seen_ids = set()
+  size = 0
+  pending = [config]
+  while pending:
+    obj = pending.pop()
+    if id(obj) in seen_ids or id(obj) in excluded_ids:
+      continue
+    if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+      continue
+
+    seen_ids.add(id(obj))
+    size += sys.getsizeof(obj)
+    pending.extend(gc.get_referents(obj))
+
+  return size
+
+
+class _PendingLoad(object):
+  """ Load of a client in progress, which threads requesting the same client wait for. """
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.client = None
+
+
+class ClientManager(object):
+  """ Class holding Optimizely clients for many projects, loading them on first use.
+
+  The approximate memory held by the configs of resident clients is tracked. When it exceeds the
+  memory budget, the least recently used clients are evicted, to be loaded again when next requested.
+  """
+
+  def __init__(self, datafile_loader, memory_budget=None, client_options=None, logger=None):
+    """ ClientManager init method.
+
+    Args:
+      datafile_loader: Callable taking a project key, e.g. a project ID or SDK key, and returning
+                       the JSON string representing the project.
+      memory_budget: Optional number of bytes the configs of resident clients may use. By default there is no limit.
+      client_options: Optional dict of keyword arguments for creating Optimizely clients, e.g. event_dispatcher.
+      logger: Optional component which provides a log method to log messages. By default nothing would be logged.
+    """
+
+    self.datafile_loader = datafile_loader
+    self.memory_budget = memory_budget
+    self.client_options = client_options or {}
+    self.logger = _logging.adapt_logger(logger or _logging.NoOpLogger())
+
+    # Maps project key to tuple of client and approximate size, least recently used first.
+    self._clients = OrderedDict()
+    self._pending_loads = {}
+    self._lock = threading.Lock()
+
+    self._resident_bytes = 0
+    self._loads = 0
+    self._load_failures = 0
+    self._load_time = 0.0
+    self._evictions = 0
+
+  def get_client(self, project_key):
+    """ Get the client for the given project, loading it if it is not resident.
+
+    Concurrent requests for a project which is being loaded wait for that load instead of loading it again.
+
+    Args:
+      project_key: Key identifying the project, as taken by the datafile loader.
+
+    Returns:
+      Optimizely client for the project. None if it could not be loaded.
+    """
+
+    with self._lock:
+      entry = self._clients.pop(project_key, None)
+      if entry is not None:
+        self._clients[project_key] = entry
+        return entry[0]
+
+      pending_load = self._pending_loads.get(project_key)
+      is_loading = pending_load is None
+      if is_loading:
+        pending_load = self._pending_loads[project_key] = _PendingLoad()
+
+    if not is_loading:
+      pending_load.done.wait()
+      return pending_load.client
+
+    try:
+      pending_load.client = self._load_client(project_key)
+    finally:
+      with self._lock:
+        del self._pending_loads[project_key]
+      pending_load.done.set()
+
+    return pending_load.client
+
+  def _load_client(self, project_key):
+    """ Helper method to create the client for a project and make it resident.
+
+    Args:
+      project_key: Key identifying the project.
+
+    Returns:
+      Optimizely client for the project. None if it could not be loaded.
+    """
+
+    start_time = time.time()
+    try:
+      client = optimizely.Optimizely(self.datafile_loader(project_key), **self.client_options)
+    except Exception as error:
+      self.logger.error('Unable to load datafile for project "%s": %s' % (project_key, str(error)))
+      client = None
+
+    if client is None or not client.is_valid:
+      if client is not None:
+        self.logger.error('Unable to create client for project "%s".' % project_key)
+      with self._lock:
+        self._load_failures += 1
+      return None
+
+    size = get_approximate_size(client.config)
+    load_time = time.time() - start_time
+    with self._lock:
+      self._loads += 1
+      self._load_time += load_time
+      self._clients[project_key] = (client, size)
+      self._resident_bytes += size
+      self._evict()
+
+    self.logger.debug('Loaded project "%s" in %.1f ms using about %d bytes.' % (project_key, 1000 * load_time, size))
+    return client
+
+  def _evict(self):
+    """ Helper method to evict least recently used clients until the memory budget is met.
+    The most recently used client is never evicted. Must be called holding the lock. """
+
+    if self.memory_budget is None:
+      return
+
+    while self._resident_bytes > self.memory_budget and len(self._clients) > 1:
+      project_key, (client, size) = self._clients.popitem(last=False)
+      self._resident_bytes -= size
+      self._evictions += 1
+      self.logger.debug('Evicted project "%s" to stay within memory budget.' % project_key)
+
+  def remove_client(self, project_key):
+    """ Remove the client for the given project. It is loaded again when next requested.
+
+    Args:
+      project_key: Key identifying the project.
+    """
+
+    with self._lock:
+      entry = self._clients.pop(project_key, None)
+      if entry is not None:
+        self._resident_bytes -= entry[1]
+
+  def get_metrics(self):
+    """ Get metrics of the clients managed.
+
+    Returns:
+      Dict with the number of resident clients, their approximate size in bytes, the number of loads,
+      failed loads and evictions so far and the total and average load time in milliseconds.
+    """
+
+    with self._lock:
+      return {
+        'clients': len(self._clients),
+        'resident_bytes': self._resident_bytes,
+        'loads': self._loads,
+        'load_failures': self._load_failures,
+        'evictions': self._evictions,
+        'load_time_ms': 1000 * self._load_time,
+        'average_load_time_ms': 1000 * self._load_time / self._loads if self._loads else 0.0
+      }
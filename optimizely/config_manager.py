@@ -0,0 +1,488 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import requests
+import tempfile
+import threading
+import time
+
+from requests import exceptions as request_exception
+
+from . import exceptions
+from . import logger as _logging
+from . import project_config
+from .error_handler import NoOpErrorHandler as noop_error_handler
+from .helpers import enums
+from .helpers import validator
+
+
+class StaticConfigManager(object):
+  """ Class holding the current project config and swapping in configs built from newer datafiles.
+
+  Readers get the current config through get_config without taking any lock. A new config is
+  fully built before it is published with a single reference assignment, so readers observe
+  either the old or the new config and never a partially built one. Listeners are notified
+  of every published config, which is how Optimizely instances using this manager pick it up.
+  """
+
+  def __init__(self, datafile=None, logger=None, error_handler=None, skip_json_validation=False, lazy_config=False):
+    """ StaticConfigManager init method.
+
+    Args:
+      datafile: Optional JSON string representing the project. If not given, no config is available
+                until one is set through set_datafile or set_config.
+      logger: Optional component which provides a log method to log messages. By default nothing would be logged.
+      error_handler: Optional component which provides a handle_error method to handle exceptions.
+                     By default all exceptions will be suppressed.
+      skip_json_validation: Optional boolean param which allows skipping JSON schema validation of datafiles.
+                            By default JSON schema validation will be performed.
+      lazy_config: Optional boolean param which allows building project configs in lazy mode.
+                   By default project configs are compiled completely upfront.
+    """
+
+    self.logger = _logging.adapt_logger(logger or _logging.NoOpLogger())
+    self.error_handler = error_handler or noop_error_handler
+    self.validate_schema = not skip_json_validation
+    self.lazy_config = lazy_config
+    self._config = None
+    # Durations in milliseconds of the stages of the last config update: parsing the JSON of the datafile,
+    # validating it against the schema and building the config from it.
+    self.last_update_timings = {}
+    # Listeners are replaced rather than mutated so that notifying them needs no lock.
+    self._config_listeners = ()
+    # Serializes writers only. Readers never take it. Reentrant, as listeners called while holding it
+    # may publish configs or add and remove listeners themselves.
+    self._update_lock = threading.RLock()
+
+    if datafile is not None:
+      self.set_datafile(datafile)
+
+  def get_config(self):
+    """ Get the current project config.
+
+    Returns:
+      ProjectConfig currently in use. None if no valid config has been set yet.
+    """
+
+    return self._config
+
+  def set_datafile(self, datafile):
+    """ Build a project config from the given datafile and publish it.
+
+    Entities which did not change since the current config are reused rather than rebuilt.
+    The config is not published if the datafile is invalid or has the same revision as the current config.
+
+    Args:
+      datafile: JSON string representing the project.
+
+    Returns:
+      Boolean True if a new config was published. False otherwise.
+    """
+
+    with self._update_lock:
+      start_time = time.time()
+      if self._is_current_revision(datafile):
+        return False
+
+      try:
+        config_dict = json.loads(datafile)
+      except:
+        self._handle_invalid_datafile()
+        return False
+
+      parse_end_time = time.time()
+      if self.validate_schema and not validator.is_datafile_valid(config_dict):
+        self._handle_invalid_datafile()
+        return False
+
+      previous_config = self._config
+      validate_end_time = time.time()
+      try:
+        config = project_config.ProjectConfig(config_dict, self.logger, self.error_handler,
+                                              previous_config=previous_config, lazy=self.lazy_config)
+      except exceptions.UnsupportedDatafileVersionException as error:
+        self.logger.error(error.args[0])
+        self.error_handler.handle_error(error)
+        return False
+      except:
+        self._handle_invalid_datafile()
+        return False
+
+      self.last_update_timings = {
+        'parse': 1000 * (parse_end_time - start_time),
+        'validate': 1000 * (validate_end_time - parse_end_time),
+        'build': 1000 * (time.time() - validate_end_time)
+      }
+      return self._publish_config(config)
+
+  def _handle_invalid_datafile(self):
+    """ Helper method to log and handle a datafile which no config can be built from. """
+
+    self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('datafile'))
+    self.error_handler.handle_error(
+      exceptions.InvalidInputException(enums.Errors.INVALID_INPUT_ERROR.format('datafile'))
+    )
+
+  def _is_current_revision(self, datafile):
+    """ Helper method to determine, without building a config or parsing the datafile, if the datafile has
+    the revision already in use. Must be called holding the update lock.
+
+    Args:
+      datafile: JSON string representing the project.
+
+    Returns:
+      Boolean True if the datafile has the revision of the current config. False otherwise.
+    """
+
+    current_config = self._config
+    if current_config is None:
+      return False
+
+    revision = project_config.get_datafile_revision(datafile)
+    if revision != current_config.get_revision():
+      return False
+
+    self.logger.debug('Config revision "%s" is already in use. Not updating config.' % revision)
+    return True
+
+  def set_config(self, config):
+    """ Publish an already built project config.
+
+    Args:
+      config: ProjectConfig to be used from now on.
+
+    Returns:
+      Boolean True if the config was published. False if it has the same revision as the current config.
+    """
+
+    with self._update_lock:
+      return self._publish_config(config)
+
+  def _publish_config(self, config):
+    """ Helper method to swap in the given config and notify listeners. Must be called holding the update lock.
+
+    Args:
+      config: ProjectConfig to be used from now on.
+
+    Returns:
+      Boolean True if the config was published. False if it has the same revision as the current config.
+    """
+
+    previous_config = self._config
+    if previous_config and previous_config.get_revision() == config.get_revision():
+      self.logger.debug('Config revision "%s" is already in use. Not updating config.' % config.get_revision())
+      return False
+
+    self._config = config
+    self.logger.debug('Updated config from revision "%s" to revision "%s".' % (
+      previous_config.get_revision() if previous_config else None,
+      config.get_revision()
+    ))
+
+    for listener in self._config_listeners:
+      try:
+        listener(config)
+      except:
+        self.logger.exception('Problem calling config listener.')
+
+    return True
+
+  def add_config_listener(self, listener):
+    """ Add a callback to be called with every config published from now on.
+
+    If a config is available, the listener is called with it right away. This happens while holding
+    the update lock, so the listener can not miss or reorder a concurrently published config.
+    Listeners may call back into the manager from the same thread.
+
+    Args:
+      listener: Callable taking the newly published ProjectConfig.
+    """
+
+    with self._update_lock:
+      if listener in self._config_listeners:
+        return
+
+      self._config_listeners += (listener,)
+      if self._config is not None:
+        listener(self._config)
+
+  def remove_config_listener(self, listener):
+    """ Remove a previously added config listener.
+
+    Args:
+      listener: Callable previously passed to add_config_listener.
+    """
+
+    with self._update_lock:
+      self._config_listeners = tuple(
+        config_listener for config_listener in self._config_listeners if config_listener != listener
+      )
+
+
+class _BackgroundConfigManager(StaticConfigManager):
+  """ Base class for config managers checking for datafile updates from a background thread. """
+
+  def _start(self, check_for_update, interval, thread_name, initial_delay=None):
+    """ Helper method to start the daemon thread calling check_for_update every interval seconds until stopped.
+
+    Args:
+      check_for_update: Callable checking for a new datafile and publishing the config built from it.
+      interval: Number of seconds between checks.
+      thread_name: Name of the thread.
+      initial_delay: Optional number of seconds before the first check. Defaults to interval.
+    """
+
+    self._stopped = threading.Event()
+    self._thread = threading.Thread(target=self._run, name=thread_name,
+                                    args=(check_for_update, interval,
+                                          interval if initial_delay is None else initial_delay))
+    self._thread.daemon = True
+    self._thread.start()
+
+  def _run(self, check_for_update, interval, delay):
+    """ Helper method run by the background thread. """
+
+    while not self._stopped.wait(delay):
+      delay = interval
+      try:
+        check_for_update()
+      except:
+        self.logger.exception('Problem checking for datafile updates.')
+
+  def stop(self):
+    """ Stop checking for datafile updates. The config in use is kept. """
+
+    self._stopped.set()
+    if self._thread is not threading.current_thread():
+      self._thread.join()
+
+
+class FileConfigManager(_BackgroundConfigManager):
+  """ Config manager keeping the project config in sync with a datafile on local disk.
+
+  The file is polled from a background thread, comparing its modification time, inode and size
+  with those seen last. It is only read when they change, e.g. when it is rewritten in place or
+  replaced by renaming another file over it, and the config is only rebuilt if the revision changed.
+  """
+
+  def __init__(self, path, poll_interval=enums.ConfigManager.DEFAULT_FILE_POLL_INTERVAL, **kwargs):
+    """ FileConfigManager init method. The datafile is loaded before returning and then watched for changes.
+
+    Args:
+      path: Path of the datafile to watch.
+      poll_interval: Optional number of seconds between checks of the file for changes.
+      kwargs: Optional logger, error_handler and skip_json_validation as taken by StaticConfigManager.
+    """
+
+    super(FileConfigManager, self).__init__(**kwargs)
+    self.path = path
+    self.poll_interval = _get_valid_interval(poll_interval, enums.ConfigManager.DEFAULT_FILE_POLL_INTERVAL,
+                                             self.logger)
+    self._file_signature = None
+
+    self.check_for_update()
+    self._start(self.check_for_update, self.poll_interval, 'optimizely-file-config-manager')
+
+  def _get_file_signature(self):
+    """ Helper method to get the attributes of the file which change when its content is replaced.
+
+    Returns:
+      Tuple of modification time, inode and size of the file.
+    """
+
+    file_stat = os.stat(self.path)
+    return getattr(file_stat, 'st_mtime_ns', file_stat.st_mtime), file_stat.st_ino, file_stat.st_size
+
+  def check_for_update(self):
+    """ Load the datafile if it changed since it was last seen and publish the config built from it.
+
+    Returns:
+      Boolean True if a new config was published. False otherwise.
+    """
+
+    try:
+      file_signature = self._get_file_signature()
+      if file_signature == self._file_signature:
+        return False
+
+      with open(self.path, 'rb') as datafile:
+        content = datafile.read().decode('utf-8')
+    except (IOError, OSError, UnicodeDecodeError) as error:
+      self.logger.error('Unable to read datafile "%s": %s' % (self.path, str(error)))
+      return False
+
+    # The signature taken before reading is kept, so a file still being written
+    # while it was read is read again on the next check.
+    self._file_signature = file_signature
+    return self.set_datafile(content)
+
+
+class PollingConfigManager(_BackgroundConfigManager):
+  """ Config manager polling a URL for the datafile.
+
+  Requests go through one pooled session, accept gzip and are conditional on the ETag and
+  Last-Modified of the last response, so unchanged datafiles are neither transferred nor parsed.
+  The last good datafile can be kept in a cache file to start from after a restart, before the
+  first request completes. Fetching, parsing and building happen on a background thread.
+  """
+
+  def __init__(self,
+               sdk_key=None,
+               url=None,
+               update_interval=enums.ConfigManager.DEFAULT_UPDATE_INTERVAL,
+               cache_path=None,
+               request_timeout=enums.ConfigManager.REQUEST_TIMEOUT,
+               **kwargs):
+    """ PollingConfigManager init method. A cached datafile is loaded before returning and the
+    first request is sent right away from the background thread.
+
+    Args:
+      sdk_key: SDK key of the project environment whose datafile is to be polled. Used if url is not given.
+      url: Optional URL of the datafile.
+      update_interval: Optional number of seconds between requests.
+      cache_path: Optional path of a file in which the last good datafile is kept.
+      request_timeout: Optional number of seconds to wait for a response.
+      kwargs: Optional logger, error_handler and skip_json_validation as taken by StaticConfigManager.
+
+    Raises:
+      InvalidInputException if neither sdk_key nor url is given.
+    """
+
+    super(PollingConfigManager, self).__init__(**kwargs)
+    if not url and not sdk_key:
+      raise exceptions.InvalidInputException(enums.Errors.INVALID_INPUT_ERROR.format('sdk_key or url'))
+
+    self.url = url or enums.ConfigManager.DATAFILE_URL_TEMPLATE.format(sdk_key=sdk_key)
+    self.update_interval = _get_valid_interval(update_interval, enums.ConfigManager.DEFAULT_UPDATE_INTERVAL,
+                                               self.logger)
+    self.cache_path = cache_path
+    self.request_timeout = request_timeout
+    self.session = requests.Session()
+    self.session.headers['Accept-Encoding'] = 'gzip'
+    self._etag = None
+    self._last_modified = None
+
+    if cache_path and os.path.exists(cache_path):
+      self._load_cache()
+
+    self._start(self.check_for_update, self.update_interval, 'optimizely-polling-config-manager', initial_delay=0)
+
+  def _load_cache(self):
+    """ Helper method to publish the config built from the cached datafile. """
+
+    try:
+      with open(self.cache_path, 'rb') as cache_file:
+        datafile = cache_file.read().decode('utf-8')
+    except (IOError, OSError, UnicodeDecodeError) as error:
+      self.logger.error('Unable to read cached datafile "%s": %s' % (self.cache_path, str(error)))
+      return
+
+    self.set_datafile(datafile)
+
+  def _write_cache(self, datafile):
+    """ Helper method to atomically replace the cached datafile.
+
+    Args:
+      datafile: JSON string representing the project.
+    """
+
+    directory = os.path.dirname(os.path.abspath(self.cache_path))
+    try:
+      fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.optimizely-datafile-')
+      with os.fdopen(fd, 'wb') as cache_file:
+        cache_file.write(datafile.encode('utf-8'))
+      os.rename(temp_path, self.cache_path)
+    except (IOError, OSError) as error:
+      self.logger.error('Unable to cache datafile in "%s": %s' % (self.cache_path, str(error)))
+
+  def check_for_update(self):
+    """ Request the datafile and publish the config built from it if it changed.
+
+    Returns:
+      Boolean True if a new config was published. False otherwise.
+    """
+
+    headers = {}
+    if self._etag:
+      headers['If-None-Match'] = self._etag
+    if self._last_modified:
+      headers['If-Modified-Since'] = self._last_modified
+
+    start_time = time.time()
+    try:
+      response = self.session.get(self.url, headers=headers, timeout=self.request_timeout)
+      response.raise_for_status()
+      datafile = response.content.decode('utf-8')
+    except (request_exception.RequestException, UnicodeDecodeError) as error:
+      self.logger.error('Fetching datafile from %s failed. Error: %s' % (self.url, str(error)))
+      return False
+    fetch_time = 1000 * (time.time() - start_time)
+
+    if response.status_code == 304:
+      self.logger.debug('Datafile at %s has not been modified.' % self.url)
+      self.last_update_timings = {'fetch': fetch_time}
+      return False
+
+    published = self.set_datafile(datafile)
+    current_config = self.get_config()
+    revision = project_config.get_datafile_revision(datafile)
+    if published or (current_config is not None and current_config.get_revision() == revision):
+      # Requests are only made conditional on datafiles in use, so that invalid ones are fetched again.
+      self._etag = response.headers.get('ETag')
+      self._last_modified = response.headers.get('Last-Modified')
+
+    if not published:
+      self.last_update_timings = {'fetch': fetch_time}
+      return False
+
+    self.last_update_timings = dict(self.last_update_timings, fetch=fetch_time)
+    self.logger.debug(
+      'Updated config from %s in %.1f ms (fetch %.1f ms, parse %.1f ms, validate %.1f ms, build %.1f ms).' % (
+        self.url,
+        sum(self.last_update_timings.values()),
+        self.last_update_timings['fetch'],
+        self.last_update_timings['parse'],
+        self.last_update_timings['validate'],
+        self.last_update_timings['build']
+      )
+    )
+    if self.cache_path:
+      self._write_cache(datafile)
+    return True
+
+  def stop(self):
+    """ Stop polling. The config in use is kept. """
+
+    super(PollingConfigManager, self).stop()
+    self.session.close()
+
+
+def _get_valid_interval(interval, default_interval, logger):
+  """ Helper method to validate an interval given in seconds.
+
+  Args:
+    interval: Interval to validate.
+    default_interval: Interval to fall back to if the given one is invalid.
+    logger: Logger to log the invalid interval to.
+
+  Returns:
+    The given interval if it is a positive number. The default interval otherwise.
+  """
+
+  if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+    logger.warning('Invalid interval %s. Defaulting to %s seconds.' % (interval, default_interval))
+    return default_interval
+
+  return interval
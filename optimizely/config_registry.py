@@ -0,0 +1,73 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import threading
+import weakref
+
+from six import text_type
+
+from . import project_config
+
+# Project configs built in this process, keyed by hash of the datafile they were built from.
+# Entries go away once no config sharing their data is referenced anymore.
+_configs = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+
+
+def _get_datafile_hash(datafile):
+  """ Helper method to hash the content of a datafile.
+
+  Args:
+    datafile: JSON string representing the project.
+
+  Returns:
+    Hex digest of the datafile.
+  """
+
+  if isinstance(datafile, text_type):
+    datafile = datafile.encode('utf-8')
+  return hashlib.sha256(datafile).hexdigest()
+
+
+def get_project_config(datafile, logger, error_handler, lazy=False):
+  """ Get a project config for the datafile, sharing its data with every other config obtained
+  for the same datafile in this process. The datafile is only parsed if no such config is alive.
+
+  Args:
+    datafile: JSON string representing the project.
+    logger: Provides a log message to send log messages to.
+    error_handler: Provides a handle_error method to handle exceptions.
+    lazy: Optional boolean param which allows building the config in lazy mode.
+          Configs in lazy mode are only shared with other configs in lazy mode.
+
+  Returns:
+    Frozen ProjectConfig using the given logger and error handler.
+
+  Raises:
+    Any exception raised when building a ProjectConfig from the datafile.
+  """
+
+  datafile_key = (_get_datafile_hash(datafile), lazy)
+  with _lock:
+    config = _configs.get(datafile_key)
+    if config is None:
+      config = project_config.ProjectConfig(datafile, logger, error_handler, lazy=lazy)
+      config.freeze()
+      _configs[datafile_key] = config
+    else:
+      logger.debug('Sharing config for revision "%s" built from the same datafile.' % config.get_revision())
+
+  shared_config = config.share(logger, error_handler)
+  shared_config.freeze()
+  return shared_config
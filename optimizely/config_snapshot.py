@@ -0,0 +1,155 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import mmap
+import os
+import struct
+import tempfile
+
+from six import PY2
+from six.moves import cPickle as pickle
+
+from . import exceptions
+from . import version
+from .helpers import enums
+from .project_config import ProjectConfig
+
+# Snapshots are pickled ProjectConfig objects. Only load snapshots produced by a trusted process,
+# as unpickling arbitrary data can execute code.
+SNAPSHOT_MAGIC = b'OPTCFG'
+SNAPSHOT_FORMAT_VERSION = 6
+SNAPSHOT_FILE_TEMPLATE = 'optimizely-config-{revision}.snapshot'
+
+# Header layout: magic, format version, length of SDK version string, length of revision string.
+_HEADER = struct.Struct('>6sHHH')
+
+
+def get_snapshot_path(directory, revision):
+  """ Get path of the snapshot for the given datafile revision.
+
+  Args:
+    directory: Directory in which snapshots are stored.
+    revision: Revision of the datafile the snapshot was compiled from.
+
+  Returns:
+    Path of the snapshot file.
+  """
+
+  return os.path.join(directory, SNAPSHOT_FILE_TEMPLATE.format(revision=revision))
+
+
+def dump(config, path):
+  """ Serialize a fully built project config to a snapshot file.
+
+  The file is written to a temporary location first and then renamed so that
+  readers never observe a partially written snapshot.
+
+  Args:
+    config: ProjectConfig to be serialized.
+    path: Path of the snapshot file to be written.
+  """
+
+  sdk_version = version.__version__.encode('utf-8')
+  revision = (config.get_revision() or '').encode('utf-8')
+  header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(sdk_version), len(revision))
+  payload = pickle.dumps(config, pickle.HIGHEST_PROTOCOL)
+
+  directory = os.path.dirname(os.path.abspath(path))
+  fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.optimizely-snapshot-')
+  try:
+    with os.fdopen(fd, 'wb') as snapshot_file:
+      snapshot_file.write(header)
+      snapshot_file.write(sdk_version)
+      snapshot_file.write(revision)
+      snapshot_file.write(payload)
+    os.rename(temp_path, path)
+  except:
+    os.remove(temp_path)
+    raise
+
+
+def load(path, logger, error_handler, revision=None):
+  """ Restore a project config from a snapshot file without re-parsing or re-indexing the datafile.
+
+  Args:
+    path: Path of the snapshot file.
+    logger: Provides a log message to send log messages to.
+    error_handler: Provides a handle_error method to handle exceptions.
+    revision: Optional datafile revision the snapshot is expected to have been compiled from.
+
+  Returns:
+    ProjectConfig restored from the snapshot.
+
+  Raises:
+    InvalidConfigSnapshotException if the snapshot is unreadable, was produced by a different
+    SDK or snapshot format version or does not match the expected revision.
+  """
+
+  try:
+    with open(path, 'rb') as snapshot_file:
+      mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+  except (IOError, OSError, ValueError) as error:
+    raise exceptions.InvalidConfigSnapshotException(enums.Errors.INVALID_CONFIG_SNAPSHOT.format(str(error)))
+
+  try:
+    if len(mapped) < _HEADER.size:
+      raise exceptions.InvalidConfigSnapshotException(enums.Errors.INVALID_CONFIG_SNAPSHOT.format('truncated header'))
+
+    magic, format_version, sdk_version_length, revision_length = _HEADER.unpack(mapped[:_HEADER.size])
+    if magic != SNAPSHOT_MAGIC or format_version != SNAPSHOT_FORMAT_VERSION:
+      raise exceptions.InvalidConfigSnapshotException(
+        enums.Errors.INVALID_CONFIG_SNAPSHOT.format('unsupported snapshot format')
+      )
+
+    offset = _HEADER.size
+    sdk_version = mapped[offset:offset + sdk_version_length].decode('utf-8')
+    offset += sdk_version_length
+    snapshot_revision = mapped[offset:offset + revision_length].decode('utf-8')
+    offset += revision_length
+
+    if sdk_version != version.__version__:
+      raise exceptions.InvalidConfigSnapshotException(
+        enums.Errors.INVALID_CONFIG_SNAPSHOT.format('compiled by SDK version %s' % sdk_version)
+      )
+
+    if revision is not None and snapshot_revision != revision:
+      raise exceptions.InvalidConfigSnapshotException(
+        enums.Errors.INVALID_CONFIG_SNAPSHOT.format('compiled from revision %s' % snapshot_revision)
+      )
+
+    # Unpickle straight out of the mapped pages instead of reading the file into a separate buffer.
+    # Restoring allocates a large number of objects in a burst, none of which are garbage, so
+    # cyclic garbage collection is paused while doing so.
+    payload = mapped[offset:] if PY2 else memoryview(mapped)[offset:]
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+      config = pickle.loads(payload)
+    except Exception as error:
+      raise exceptions.InvalidConfigSnapshotException(enums.Errors.INVALID_CONFIG_SNAPSHOT.format(str(error)))
+    finally:
+      if gc_was_enabled:
+        gc.enable()
+      del payload
+  finally:
+    mapped.close()
+
+  if not isinstance(config, ProjectConfig):
+    raise exceptions.InvalidConfigSnapshotException(
+      enums.Errors.INVALID_CONFIG_SNAPSHOT.format('snapshot does not hold a project config')
+    )
+
+  config.logger = logger
+  config.error_handler = error_handler
+  return config
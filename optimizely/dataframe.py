@@ -0,0 +1,210 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Assignment of variations to the users of DataFrames and tables.
+Install the optimizely-sdk[dataframe] extra to use it with pandas DataFrames or Arrow tables. """
+
+try:
+  import pandas
+except ImportError:
+  pandas = None
+
+try:
+  import pyarrow
+except ImportError:
+  pyarrow = None
+
+from six import string_types
+
+from .helpers import enums
+from .helpers import validator
+
+
+def is_supported(df):
+  """ Determine if variations can be assigned to the users of the given object.
+
+  Args:
+    df: Object holding the users.
+
+  Returns:
+    Boolean True if it is a pandas DataFrame or an Arrow table. False otherwise.
+  """
+
+  if pandas is not None and isinstance(df, pandas.DataFrame):
+    return True
+
+  return pyarrow is not None and isinstance(df, pyarrow.Table)
+
+
+def _get_column_names(df):
+  """ Helper method to get the names of the columns of a DataFrame or table. """
+
+  if pandas is not None and isinstance(df, pandas.DataFrame):
+    return list(df.columns)
+
+  return list(df.column_names)
+
+
+def _get_column(df, column_name):
+  """ Helper method to get the values of a column of a DataFrame or table as a list of Python values. """
+
+  if pandas is not None and isinstance(df, pandas.DataFrame):
+    return df[column_name].tolist()
+
+  return df.column(column_name).to_pylist()
+
+
+def _create_result(df, columns, column_names):
+  """ Helper method to create a DataFrame or table of the same kind as the given one holding the given columns. """
+
+  if pandas is not None and isinstance(df, pandas.DataFrame):
+    # Object columns keep None for missing variations rather than turning it into NaN
+    return pandas.DataFrame(columns, index=df.index, columns=column_names, dtype=object)
+
+  return pyarrow.Table.from_arrays([pyarrow.array(columns[column_name], type=pyarrow.string())
+                                    for column_name in column_names], names=column_names)
+
+
+def _is_missing(value):
+  """ Helper method to determine if a value of a column is missing, i.e. None, NaN or pandas.NA. """
+
+  if value is None:
+    return True
+
+  try:
+    return bool(value != value)
+  except TypeError:
+    # pandas.NA can not be converted to a boolean
+    return True
+
+
+def get_users(user_ids, attribute_columns):
+  """ Get the users of the rows of columns.
+
+  Args:
+    user_ids: List of the IDs for users of the rows.
+    attribute_columns: Dict mapping attribute key to the list of its values in the rows.
+                       Missing values are left out of the attributes of the row.
+
+  Returns:
+    List of tuples of ID for user and dict representing user attributes, one per row.
+  """
+
+  users = []
+  for idx, user_id in enumerate(user_ids):
+    attributes = {}
+    for attribute_key, values in attribute_columns.items():
+      if not _is_missing(values[idx]):
+        attributes[attribute_key] = values[idx]
+    users.append((user_id, attributes))
+
+  return users
+
+
+def assign_variations_to_users(client, users, experiment_keys):
+  """ Get the variations where users will be bucketed for many experiments, as get_variation does.
+
+  Users are bound to decision services once for all experiments through the same batch path as
+  get_variation_many: inputs are validated and user profiles are looked up once, and users with the same
+  attributes share the results of evaluating audiences. Each user is still decided, and hashed for bucketing,
+  one at a time per experiment; there is no vectorized bucketing. No impression event is sent.
+
+  Args:
+    client: Optimizely client making the decisions.
+    users: List of tuples of ID for user and dict representing user attributes.
+    experiment_keys: List of the keys of the experiments for which user variations need to be determined.
+
+  Returns:
+    Dict mapping experiment key to the list of the variation keys of the users, in the order of users.
+    None for users which are invalid or not in the experiment. None if the client is invalid.
+  """
+
+  config_bundle = client._get_config_bundle('assign_variations')
+  if not config_bundle:
+    return None
+
+  user_decision_services = client._bind_users(config_bundle, users)
+  columns = {}
+  for experiment_key in experiment_keys:
+    variation_keys = columns[experiment_key] = [None] * len(users)
+    experiment = config_bundle.config.get_experiment_from_key(experiment_key)
+    if not experiment:
+      client.logger.info('Experiment key "%s" is invalid. Not activating %s users.' % (experiment_key, len(users)))
+      continue
+
+    for idx, user_decision_service in enumerate(user_decision_services):
+      if not user_decision_service:
+        continue
+
+      variation = user_decision_service.get_variation(experiment,
+                                                      user_decision_service.user_id,
+                                                      user_decision_service.attributes)
+      if variation:
+        variation_keys[idx] = variation.key
+
+  for user_decision_service in user_decision_services:
+    if user_decision_service:
+      user_decision_service.save_user_profile()
+
+  return columns
+
+
+def assign_variations(client, df, user_id_col, attribute_cols, experiment_keys):
+  """ Get the variations where the users of the rows of a pandas DataFrame or Arrow table will be bucketed,
+  as get_variation does for each row, including audiences, groups, forced variations and bucketing IDs.
+
+  Columns are read at once rather than row by row, audiences are evaluated once per distinct combination
+  of attribute values and user profiles are looked up together. Rows are then decided one by one, so the time
+  taken grows with the number of rows times the number of experiments, as with get_variation_many.
+
+  Args:
+    client: Optimizely client making the decisions.
+    df: pandas DataFrame or Arrow table holding a user per row.
+    user_id_col: Name of the column holding the IDs for users, which are to be strings.
+    attribute_cols: List of the names of the columns holding user attributes, named after the attribute keys.
+                    Use the $opt_bucketing_id attribute to bucket by another column than the user ID.
+    experiment_keys: List of the keys of the experiments for which user variations need to be determined.
+
+  Returns:
+    DataFrame or table of the same kind, with a column of variation keys per experiment named after its key,
+    holding None for users which are invalid or not in the experiment. A DataFrame keeps the index of df.
+    None if the client or the inputs are invalid.
+  """
+
+  if not is_supported(df):
+    client.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('df'))
+    return None
+
+  column_names = _get_column_names(df)
+  if not isinstance(user_id_col, string_types) or user_id_col not in column_names:
+    client.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id_col'))
+    return None
+
+  if not isinstance(attribute_cols, (list, tuple)) or not all(attribute_col in column_names
+                                                              for attribute_col in attribute_cols):
+    client.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('attribute_cols'))
+    return None
+
+  if not isinstance(experiment_keys, (list, tuple)) or not all(validator.is_non_empty_string(experiment_key)
+                                                               for experiment_key in experiment_keys):
+    client.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('experiment_keys'))
+    return None
+
+  users = get_users(_get_column(df, user_id_col),
+                    dict((attribute_col, _get_column(df, attribute_col)) for attribute_col in attribute_cols))
+
+  columns = assign_variations_to_users(client, users, experiment_keys)
+  if columns is None:
+    return None
+
+  return _create_result(df, columns, list(experiment_keys))
@@ -0,0 +1,201 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from . import bucketer
+from . import decision_service
+from .helpers import experiment as experiment_helper
+
+# Marks a decision which depends on the user.
+_VARIES = object()
+
+
+class DecisionAnalysis(object):
+  """ Class holding the decisions of a project config which are the same for every user.
+
+  Decisions are constant when there are no audiences to evaluate and bucketing can only have one outcome,
+  e.g. for 100% rollouts without audiences or experiments whose single variation covers the whole traffic.
+  Experiments in mutually exclusive groups are never considered constant.
+
+  Constant decisions of experiments, and of features going through experiments, only hold for users who are not
+  forced into a variation and have no stored decision. Experiments whitelisting users are never considered constant.
+  """
+
+  def __init__(self, config):
+    """ DecisionAnalysis init method analyzing the given config.
+
+    Args:
+      config: ProjectConfig to analyze. Experiments of rollouts and running experiments must be compiled.
+    """
+
+    self._config = config
+    self._totals = {
+      'total_experiments': len(config.experiment_id_map),
+      'total_rollouts': len(config.rollout_id_map),
+      'total_features': len(config.feature_key_map)
+    }
+    # Maps experiment key to tuple of the experiment and the variation every user gets, None for no variation.
+    self.experiment_variations = {}
+    # Maps rollout ID to tuple of the rollout and the Decision every user gets.
+    self.rollout_decisions = {}
+    # Maps feature key to tuple of the feature and the Decision every user gets.
+    self.feature_decisions = {}
+
+    for experiment in config.experiment_id_map.values():
+      variation = self._analyze_experiment(experiment)
+      if variation is not _VARIES:
+        self.experiment_variations[experiment.key] = (experiment, variation)
+
+    for rollout in config.rollout_id_map.values():
+      decision = self._analyze_rollout(rollout)
+      if decision is not _VARIES:
+        self.rollout_decisions[rollout.id] = (rollout, decision)
+
+    for feature in config.feature_key_map.values():
+      decision = self._analyze_feature(feature)
+      if decision is not _VARIES:
+        self.feature_decisions[feature.key] = (feature, decision)
+
+    # The config is only needed while analyzing it
+    del self._config
+
+  def get_report(self):
+    """ Get what the analysis found.
+
+    Returns:
+      Dict with the sorted keys of the experiments and features and the sorted IDs of the rollouts
+      whose decisions are the same for every user, along with the total number of each.
+    """
+
+    report = {
+      'experiments': sorted(self.experiment_variations.keys()),
+      'rollouts': sorted(self.rollout_decisions.keys()),
+      'features': sorted(self.feature_decisions.keys())
+    }
+    report.update(self._totals)
+    return report
+
+  def _get_constant_variation(self, experiment):
+    """ Helper method to determine the variation every user passing the audience conditions is bucketed into.
+
+    Args:
+      experiment: Experiment to be bucketed into, not in a group.
+
+    Returns:
+      Variation every user gets. None if no user gets one. _VARIES if it depends on the user.
+    """
+
+    audience_conditions = experiment.getAudienceConditionsOrIds()
+    if audience_conditions is not None and audience_conditions != []:
+      return _VARIES
+
+    # Bucket values range over [0, MAX_TRAFFIC_VALUE) and the first range ending above the value wins.
+    for traffic_allocation in experiment.trafficAllocation:
+      end_of_range = traffic_allocation.get('endOfRange')
+      if end_of_range <= 0:
+        continue
+      if end_of_range < bucketer.MAX_TRAFFIC_VALUE:
+        return _VARIES
+
+      variation_id = traffic_allocation.get('entityId')
+      if not variation_id:
+        return None
+      # Unknown variations are left to be reported when bucketing
+      variation = self._config.variation_id_map.get(experiment.key, {}).get(variation_id)
+      return variation if variation else _VARIES
+
+    return None
+
+  def _analyze_experiment(self, experiment):
+    """ Helper method to determine the variation every user gets in an experiment, as in DecisionService.get_variation.
+
+    Args:
+      experiment: Experiment to analyze.
+
+    Returns:
+      Variation every user gets. None if no user gets one. _VARIES if it depends on the user.
+    """
+
+    if not experiment_helper.is_experiment_running(experiment):
+      return None
+
+    if experiment.forcedVariations or experiment.groupPolicy in bucketer.GROUP_POLICIES:
+      return _VARIES
+
+    return self._get_constant_variation(experiment)
+
+  def _analyze_rollout(self, rollout):
+    """ Helper method to determine the decision every user gets for a rollout,
+    as in DecisionService.get_variation_for_rollout.
+
+    Args:
+      rollout: Rollout to analyze.
+
+    Returns:
+      Decision every user gets. _VARIES if it depends on the user.
+    """
+
+    no_decision = decision_service.Decision(None, None, decision_service.DECISION_SOURCE_ROLLOUT)
+    if not rollout.experiments:
+      return no_decision
+
+    rules = [self._config.experiment_key_map.get(rule.get('key')) for rule in rollout.experiments]
+    if not all(rules):
+      return _VARIES
+
+    # Rules are evaluated in order, so a constant decision requires the first rule to have no audiences.
+    # Users not in the traffic of that rule are only evaluated against the "Everyone Else" rule.
+    if len(rules) > 1:
+      variation = self._get_constant_variation(rules[0])
+      if variation is _VARIES:
+        return _VARIES
+      if variation:
+        return decision_service.Decision(rules[0], variation, decision_service.DECISION_SOURCE_ROLLOUT)
+
+    everyone_else_rule = rules[-1]
+    variation = self._get_constant_variation(everyone_else_rule)
+    if variation is _VARIES:
+      return _VARIES
+    if variation:
+      return decision_service.Decision(everyone_else_rule, variation, decision_service.DECISION_SOURCE_ROLLOUT)
+    return no_decision
+
+  def _analyze_feature(self, feature):
+    """ Helper method to determine the decision every user gets for a feature,
+    as in DecisionService.get_variation_for_feature.
+
+    Args:
+      feature: Feature to analyze.
+
+    Returns:
+      Decision every user gets. _VARIES if it depends on the user.
+    """
+
+    if feature.groupId:
+      return _VARIES
+
+    experiment = None
+    if feature.experimentIds:
+      experiment = self._config.experiment_id_map.get(feature.experimentIds[0])
+      if not experiment or experiment.key not in self.experiment_variations:
+        return _VARIES
+
+      variation = self.experiment_variations[experiment.key][1]
+      if variation:
+        return decision_service.Decision(experiment, variation, decision_service.DECISION_SOURCE_EXPERIMENT)
+
+    if feature.rolloutId:
+      if feature.rolloutId not in self.rollout_decisions:
+        return _VARIES
+      return self.rollout_decisions[feature.rolloutId][1]
+
+    return decision_service.Decision(experiment, None, decision_service.DECISION_SOURCE_EXPERIMENT)
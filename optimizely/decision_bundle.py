@@ -0,0 +1,202 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import namedtuple
+
+from . import entities
+
+try:
+  from types import MappingProxyType as _frozen_mapping
+except ImportError:
+  # Python 2 has no read-only mapping view, so bundles hold copies instead.
+  _frozen_mapping = dict
+
+
+class FeatureDecision(namedtuple('FeatureDecision',
+                                 'feature_key enabled variation_key experiment_key source variables')):
+  """ Decision made for a feature flag.
+
+  feature_key: Key of the feature.
+  enabled: Boolean True if the feature is enabled for the user.
+  variation_key: Key of the variation the user is in. None if in none.
+  experiment_key: Key of the experiment or rollout rule the variation belongs to. None if the user is in none.
+  source: decision_service.DECISION_SOURCE_EXPERIMENT or DECISION_SOURCE_ROLLOUT.
+  variables: Read-only mapping of variable key to typed value for the user.
+  """
+
+  __slots__ = ()
+
+
+class DecisionBundle(namedtuple('DecisionBundle', 'user_id revision feature_decisions')):
+  """ Decisions made for every feature flag of a project for a user in a single pass.
+
+  user_id: ID for user.
+  revision: Revision of the datafile the decisions were made with.
+  feature_decisions: Read-only mapping of feature key to FeatureDecision.
+  """
+
+  __slots__ = ()
+
+  def is_feature_enabled(self, feature_key):
+    """ Determine if the feature is enabled for the user.
+
+    Args:
+      feature_key: Key of the feature.
+
+    Returns:
+      True if the feature is enabled for the user. False otherwise, including for unknown features.
+    """
+
+    feature_decision = self.feature_decisions.get(feature_key)
+    return bool(feature_decision and feature_decision.enabled)
+
+  def get_enabled_features(self):
+    """ Get the features enabled for the user.
+
+    Returns:
+      Sorted list of the keys of the features enabled for the user.
+    """
+
+    return sorted(feature_key for feature_key, feature_decision in self.feature_decisions.items()
+                  if feature_decision.enabled)
+
+  def get_feature_variable(self, feature_key, variable_key):
+    """ Get the value of a variable of a feature for the user.
+
+    Args:
+      feature_key: Key of the feature.
+      variable_key: Key of the variable.
+
+    Returns:
+      Typed value of the variable. None for unknown features or variables.
+    """
+
+    feature_decision = self.feature_decisions.get(feature_key)
+    if not feature_decision:
+      return None
+
+    return feature_decision.variables.get(variable_key)
+
+
+class FeatureVariables(dict):
+  """ Dict mapping the key of each variable of a feature to its typed value for a user,
+  with accessors checking the type of the variable. """
+
+  def __init__(self, values, types):
+    """ FeatureVariables init method.
+
+    Args:
+      values: Dict mapping variable key to typed value.
+      types: Dict mapping variable key to type of the variable, one of boolean/double/integer/string.
+    """
+
+    dict.__init__(self, values)
+    self.types = types
+
+  def get_typed(self, variable_key, variable_type):
+    """ Get the value of a variable if it is of the given type.
+
+    Args:
+      variable_key: Key of the variable.
+      variable_type: Type of variable which could be one of boolean/double/integer/string.
+
+    Returns:
+      Typed value of the variable. None for unknown variables or if the type of the variable differs.
+    """
+
+    if self.types.get(variable_key) != variable_type:
+      return None
+
+    return self.get(variable_key)
+
+  def get_boolean(self, variable_key):
+    """ Get the value of a boolean variable. None for unknown variables or variables of another type. """
+
+    return self.get_typed(variable_key, entities.Variable.Type.BOOLEAN)
+
+  def get_double(self, variable_key):
+    """ Get the value of a double variable. None for unknown variables or variables of another type. """
+
+    return self.get_typed(variable_key, entities.Variable.Type.DOUBLE)
+
+  def get_integer(self, variable_key):
+    """ Get the value of an integer variable. None for unknown variables or variables of another type. """
+
+    return self.get_typed(variable_key, entities.Variable.Type.INTEGER)
+
+  def get_string(self, variable_key):
+    """ Get the value of a string variable. None for unknown variables or variables of another type. """
+
+    return self.get_typed(variable_key, entities.Variable.Type.STRING)
+
+
+def create_feature_variables(config, feature, variation):
+  """ Create the FeatureVariables holding the values of all variables of a feature for a variation.
+
+  Args:
+    config: ProjectConfig the decision was made with.
+    feature: Feature decided on.
+    variation: Variation decided on. None for the default values.
+
+  Returns:
+    FeatureVariables of the feature.
+  """
+
+  values = {}
+  types = {}
+  for variable_key, variable in feature.variables.items():
+    values[variable_key] = config.get_typed_variable_value(variable, variation)
+    types[variable_key] = variable.type
+
+  return FeatureVariables(values, types)
+
+
+def create_feature_decision(config, feature, decision):
+  """ Create the FeatureDecision for the decision made for a feature.
+
+  Args:
+    config: ProjectConfig the decision was made with.
+    feature: Feature decided on.
+    decision: Decision namedtuple returned by DecisionService.get_variation_for_feature.
+
+  Returns:
+    FeatureDecision holding the typed values of all variables of the feature.
+  """
+
+  variation = decision.variation
+  variables = dict(
+    (variable_key, config.get_typed_variable_value(variable, variation))
+    for variable_key, variable in feature.variables.items()
+  )
+
+  return FeatureDecision(feature.key,
+                         bool(variation and variation.featureEnabled),
+                         variation.key if variation else None,
+                         decision.experiment.key if variation else None,
+                         decision.source,
+                         _frozen_mapping(variables))
+
+
+def create_decision_bundle(config, user_id, feature_decisions):
+  """ Create the DecisionBundle holding the given feature decisions.
+
+  Args:
+    config: ProjectConfig the decisions were made with.
+    user_id: ID for user.
+    feature_decisions: Dict mapping feature key to FeatureDecision, which is not to be mutated afterwards.
+
+  Returns:
+    DecisionBundle.
+  """
+
+  return DecisionBundle(user_id, config.revision, _frozen_mapping(feature_decisions))
@@ -0,0 +1,142 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from .helpers import enums
+from .lru_cache import LRUCache
+
+KIND_EXPERIMENT = 'experiment'
+KIND_FEATURE = 'feature'
+
+
+def get_attributes_fingerprint(attributes):
+  """ Get a value identifying the given attributes regardless of their order.
+
+  The type of each value is part of the fingerprint, as e.g. True and 1 are equal in Python
+  but may not match the same audience conditions.
+
+  Args:
+    attributes: Dict representing user attributes.
+
+  Returns:
+    Hashable fingerprint of the attributes. None if some attribute value is not hashable.
+  """
+
+  if not attributes:
+    return frozenset()
+
+  try:
+    return frozenset((key, type(value), value) for key, value in attributes.items())
+  except TypeError:
+    return None
+
+
+class DecisionCache(object):
+  """ Class caching the decisions made for users, so that the same user with the same attributes
+  asking again for the same experiment or feature is not bucketed again.
+
+  Decisions are cached per account, project and config revision for a bounded number of keys, evicting the
+  least recently used once full, and expire after a timeout. Decision services do not use the cache while users are
+  forced into variations or a user profile service is in use, as these can change the outcome.
+  Replace it with your own implementation providing the same methods, e.g. to share decisions between processes.
+  """
+
+  def __init__(self,
+               capacity=enums.DecisionCache.DEFAULT_CAPACITY,
+               timeout=enums.DecisionCache.DEFAULT_TIMEOUT):
+    """ DecisionCache init method.
+
+    Args:
+      capacity: Optional maximum number of decisions to cache. None for no limit.
+      timeout: Optional number of seconds after which a decision expires. None for decisions which do not expire.
+    """
+
+    self._cache = LRUCache(capacity, timeout)
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+
+  def get_key(self, config, kind, entity_key, user_id, attributes):
+    """ Get the key to cache the decision for a user with the given attributes under.
+
+    The bucketing ID is an attribute, so it is covered by the attributes.
+
+    Args:
+      config: ProjectConfig the decision is made with.
+      kind: KIND_EXPERIMENT or KIND_FEATURE.
+      entity_key: Key of the experiment or feature.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      Hashable key. None if the decision cannot be cached.
+    """
+
+    fingerprint = get_attributes_fingerprint(attributes)
+    if fingerprint is None:
+      return None
+
+    return (config.account_id, config.project_id, config.revision, kind, entity_key, user_id, fingerprint)
+
+  def lookup(self, key):
+    """ Get the decision cached under the given key.
+
+    Args:
+      key: Key as returned by get_key.
+
+    Returns:
+      Decision cached. None if there is none.
+    """
+
+    decision = self._cache.lookup(key)
+    with self._lock:
+      if decision is None:
+        self._misses += 1
+      else:
+        self._hits += 1
+
+    return decision
+
+  def save(self, key, decision):
+    """ Cache a decision under the given key.
+
+    Args:
+      key: Key as returned by get_key.
+      decision: Decision to cache.
+    """
+
+    self._cache.save(key, decision)
+
+  def reset(self):
+    """ Remove all cached decisions. Metrics are kept. """
+
+    self._cache.reset()
+
+  def get_metrics(self):
+    """ Get metrics of the decisions cached.
+
+    Returns:
+      Dict with the number of decisions cached, including expired ones which have not been dropped yet,
+      the number of hits, misses and evictions so far and the ratio of hits to lookups.
+    """
+
+    with self._lock:
+      lookups = self._hits + self._misses
+      return {
+        'entries': len(self._cache),
+        'hits': self._hits,
+        'misses': self._misses,
+        'evictions': self._cache.evictions,
+        'hit_ratio': float(self._hits) / lookups if lookups else 0.0
+      }
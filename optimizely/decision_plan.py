@@ -0,0 +1,56 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import namedtuple
+
+# Entities a decision for a feature goes through, resolved when the config is built.
+# Entities which are not in the datafile are None, so that looking them up again reports them.
+FeaturePlan = namedtuple('FeaturePlan', 'feature group experiment_ids experiment rollout')
+
+# Targeting rule experiments of a rollout in order of evaluation, the last one being the "Everyone Else" rule.
+RolloutPlan = namedtuple('RolloutPlan', 'rollout rules everyone_else_rule')
+
+
+def compile_feature(config, feature):
+  """ Compile the plan to decide on a feature.
+
+  Args:
+    config: ProjectConfig the feature belongs to.
+    feature: Feature to compile.
+
+  Returns:
+    FeaturePlan for the feature.
+  """
+
+  return FeaturePlan(
+    feature,
+    config.group_id_map.get(feature.groupId) if feature.groupId else None,
+    frozenset(feature.experimentIds),
+    config.experiment_id_map.get(feature.experimentIds[0]) if feature.experimentIds else None,
+    config.rollout_id_map.get(feature.rolloutId) if feature.rolloutId else None
+  )
+
+
+def compile_rollout(config, rollout):
+  """ Compile the plan to decide on a rollout.
+
+  Args:
+    config: ProjectConfig the rollout belongs to.
+    rollout: Rollout to compile.
+
+  Returns:
+    RolloutPlan for the rollout.
+  """
+
+  rules = tuple(config.experiment_key_map.get(rule.get('key')) for rule in rollout.experiments)
+  return RolloutPlan(rollout, rules[:-1], rules[-1] if rules else None)
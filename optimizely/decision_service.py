@@ -15,10 +15,13 @@ from collections import namedtuple
 from six import string_types
 
 from . import bucketer
+from . import decision_cache as _decision_cache
+from . import decision_plan
 from .helpers import audience as audience_helper
 from .helpers import enums
 from .helpers import experiment as experiment_helper
 from .helpers import validator
+from .forced_variation_store import ForcedVariationStore
 from .user_profile import UserProfile
 
 Decision = namedtuple('Decision', 'experiment variation source')
@@ -29,12 +32,25 @@ DECISION_SOURCE_ROLLOUT = 'rollout'
 class DecisionService(object):
   """ Class encapsulating all decision related capabilities. """
 
-  def __init__(self, config, user_profile_service):
+  def __init__(self, config, user_profile_service, forced_variation_store=None, decision_cache=None):
     self.bucketer = bucketer.Bucketer(config)
     self.user_profile_service = user_profile_service
     self.config = config
     self.logger = config.logger
 
+    # Store of the forced variations set by the user by calling
+    # set_forced_variation (it is not the same as the whitelisting
+    # forcedVariations data structure).
+    # It is kept here rather than in the project config so that the config
+    # holds no per-client mutable state and can be shared and frozen.
+    # A store may be passed in to carry forced variations over from a
+    # decision service using a previous config.
+    self.forced_variation_store = forced_variation_store or ForcedVariationStore()
+
+    # Optional cache of the decisions made for users, which may be shared with decision
+    # services using other configs as it is keyed by account, project and config revision.
+    self.decision_cache = decision_cache
+
   def _get_bucketing_id(self, user_id, attributes):
     """ Helper method to determine bucketing ID for the user.
 
@@ -57,7 +73,135 @@ class DecisionService(object):
 
     return user_id
 
-  def get_forced_variation(self, experiment, user_id):
+  def _can_use_constant_decisions(self, ignore_user_profile=False):
+    """ Helper method to determine if decisions which are the same for every user apply,
+    i.e. if no user is forced into a variation and no stored decision could apply.
+
+    Args:
+      ignore_user_profile: True if stored decisions are ignored. Defaults to False.
+
+    Returns:
+      Boolean True if decisions which are the same for every user apply. False otherwise.
+    """
+
+    if self.user_profile_service and not ignore_user_profile:
+      return False
+
+    return not self.forced_variation_store.has_forced_variations()
+
+  def _get_decision_cache_key(self, kind, entity_key, user_id, attributes, ignore_user_profile=False):
+    """ Helper method to get the key to cache a decision under.
+    Decisions are only cached under the same conditions as decisions which are the same for every user apply.
+
+    Args:
+      kind: decision_cache.KIND_EXPERIMENT or decision_cache.KIND_FEATURE.
+      entity_key: Key of the experiment or feature.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+      ignore_user_profile: True if stored decisions are ignored. Defaults to False.
+
+    Returns:
+      Key to cache the decision under. None if the decision is not to be cached.
+    """
+
+    if not self.decision_cache or not self._can_use_constant_decisions(ignore_user_profile):
+      return None
+
+    return self.decision_cache.get_key(self.config, kind, entity_key, user_id, attributes)
+
+  def _is_user_in_experiment(self, experiment, attributes):
+    """ Helper method to determine if the user satisfies the audience conditions of an experiment.
+
+    Args:
+      experiment: Object representing the experiment.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      Boolean True if the user satisfies the audience conditions. False otherwise.
+    """
+
+    return audience_helper.is_user_in_experiment(self.config, experiment, attributes)
+
+  def _lookup_user_profile(self, user_id):
+    """ Helper method to retrieve the profile of the user from the user profile service.
+
+    Args:
+      user_id: ID for user.
+
+    Returns:
+      UserProfile of the user. None if it could not be retrieved or has an invalid format.
+    """
+
+    try:
+      retrieved_profile = self.user_profile_service.lookup(user_id)
+    except:
+      self.logger.exception('Unable to retrieve user profile for user "%s" as lookup failed.' % user_id)
+      retrieved_profile = None
+
+    if not validator.is_user_profile_valid(retrieved_profile):
+      self.logger.warning('User profile has invalid format.')
+      return None
+
+    return UserProfile(**retrieved_profile)
+
+  def lookup_user_profiles(self, user_ids):
+    """ Retrieve the profiles of many users from the user profile service at once.
+    Services without a lookup_many method are asked for each user in turn.
+
+    Args:
+      user_ids: List of IDs for users.
+
+    Returns:
+      Dict mapping user ID to UserProfile, for the users whose profile could be retrieved and has a valid format.
+    """
+
+    lookup_many = getattr(self.user_profile_service, 'lookup_many', None)
+    if lookup_many is None:
+      user_profiles = {}
+      for user_id in user_ids:
+        user_profile = self._lookup_user_profile(user_id)
+        if user_profile:
+          user_profiles[user_id] = user_profile
+      return user_profiles
+
+    try:
+      retrieved_profiles = dict(lookup_many(user_ids) or {})
+    except:
+      self.logger.exception('Unable to retrieve user profiles for %s users as lookup failed.' % len(user_ids))
+      return {}
+
+    user_profiles = {}
+    for user_id, retrieved_profile in retrieved_profiles.items():
+      if retrieved_profile is None:
+        continue
+
+      if not validator.is_user_profile_valid(retrieved_profile):
+        self.logger.warning('User profile has invalid format.')
+        continue
+
+      user_profiles[user_id] = UserProfile(**retrieved_profile)
+
+    return user_profiles
+
+  def _save_user_profile(self, user_profile):
+    """ Helper method to save the profile of the user with the user profile service.
+
+    Args:
+      user_profile: UserProfile to be saved.
+    """
+
+    try:
+      self.user_profile_service.save(user_profile.__dict__)
+    except:
+      self.logger.exception('Unable to save user profile for user "%s".' % user_profile.user_id)
+
+  def save_user_profile(self):
+    """ Save the user profile changed by the decisions made, if saving it was deferred.
+    DecisionService saves profiles as decisions are made, so there is nothing left to save. """
+
+    pass
+
+  def get_whitelisted_variation(self, experiment, user_id):
     """ Determine if a user is forced into a variation for the given experiment and return that variation.
 
     Args:
@@ -78,6 +222,101 @@ class DecisionService(object):
 
     return None
 
+  def set_forced_variation(self, experiment_key, user_id, variation_key):
+    """ Sets users to a map of experiments to forced variations.
+
+      Args:
+        experiment_key: Key for experiment.
+        user_id: The user ID.
+        variation_key: Key for variation. If None, then clear the existing experiment-to-variation mapping.
+
+      Returns:
+        A boolean value that indicates if the set completed successfully.
+    """
+    experiment = self.config.get_experiment_from_key(experiment_key)
+    if not experiment:
+      # The invalid experiment key will be logged inside this call.
+      return False
+
+    experiment_id = experiment.id
+    if variation_key is None:
+      if self.forced_variation_store.remove_forced_variation(user_id, experiment_id):
+        self.logger.debug('Variation mapped to experiment "%s" has been removed for user "%s".' % (
+          experiment_key,
+          user_id
+        ))
+      elif self.forced_variation_store.get_forced_variations(user_id) is not None:
+        self.logger.debug('Nothing to remove. Variation mapped to experiment "%s" for user "%s" does not exist.' % (
+          experiment_key,
+          user_id
+        ))
+      else:
+        self.logger.debug('Nothing to remove. User "%s" does not exist in the forced variation map.' % user_id)
+      return True
+
+    if not validator.is_non_empty_string(variation_key):
+      self.logger.debug('Variation key is invalid.')
+      return False
+
+    forced_variation = self.config.get_variation_from_key(experiment_key, variation_key)
+    if not forced_variation:
+      # The invalid variation key will be logged inside this call.
+      return False
+
+    variation_id = forced_variation.id
+    self.forced_variation_store.set_forced_variation(user_id, experiment_id, variation_id)
+
+    self.logger.debug('Set variation "%s" for experiment "%s" and user "%s" in the forced variation map.' % (
+      variation_id,
+      experiment_id,
+      user_id
+    ))
+    return True
+
+  def get_forced_variation(self, experiment_key, user_id):
+    """ Gets the forced variation key for the given user and experiment.
+
+      Args:
+        experiment_key: Key for experiment.
+        user_id: The user ID.
+
+      Returns:
+        The variation which the given user and experiment should be forced into.
+    """
+
+    experiment_to_variation_map = self.forced_variation_store.get_forced_variations(user_id)
+    if experiment_to_variation_map is None:
+      self.logger.debug('User "%s" is not in the forced variation map.' % user_id)
+      return None
+
+    experiment = self.config.get_experiment_from_key(experiment_key)
+    if not experiment:
+      # The invalid experiment key will be logged inside this call.
+      return None
+
+    if not experiment_to_variation_map:
+      self.logger.debug('No experiment "%s" mapped to user "%s" in the forced variation map.' % (
+        experiment_key,
+        user_id
+      ))
+      return None
+
+    variation_id = experiment_to_variation_map.get(experiment.id)
+    if variation_id is None:
+      self.logger.debug(
+        'No variation mapped to experiment "%s" in the forced variation map.' % experiment_key
+      )
+      return None
+
+    variation = self.config.get_variation_from_id(experiment_key, variation_id)
+
+    self.logger.debug('Variation "%s" is mapped to experiment "%s" and user "%s" in the forced variation map' % (
+      variation.key,
+      experiment_key,
+      user_id
+    ))
+    return variation
+
   def get_stored_variation(self, experiment, user_profile):
     """ Determine if the user has a stored variation available for the given experiment and return that.
 
@@ -128,35 +367,65 @@ class DecisionService(object):
       self.logger.info('Experiment "%s" is not running.' % experiment.key)
       return None
 
-    # Check if the user is forced into a variation
-    variation = self.config.get_forced_variation(experiment.key, user_id)
-    if variation:
-      return variation
+    # Return the decision without bucketing if it is the same for every user
+    if self._can_use_constant_decisions(ignore_user_profile):
+      experiment_and_variation = self.config.decision_analysis.experiment_variations.get(experiment.key)
+      if experiment_and_variation and experiment_and_variation[0] is experiment:
+        self.logger.debug('Experiment "%s" has the same decision for every user.' % experiment.key)
+        return experiment_and_variation[1]
+
+    # Return the decision cached for the user if there is one
+    decision_cache_key = self._get_decision_cache_key(_decision_cache.KIND_EXPERIMENT, experiment.key,
+                                                      user_id, attributes, ignore_user_profile)
+    if decision_cache_key is not None:
+      decision = self.decision_cache.lookup(decision_cache_key)
+      if decision:
+        self.logger.debug('Returning cached decision of user "%s" for experiment "%s".' % (user_id, experiment.key))
+        return decision.variation
+
+    variation = self._get_variation_for_user(experiment, user_id, attributes, ignore_user_profile)
+    if decision_cache_key is not None:
+      self.decision_cache.save(decision_cache_key, Decision(experiment, variation, DECISION_SOURCE_EXPERIMENT))
+    return variation
+
+  def _get_variation_for_user(self, experiment, user_id, attributes, ignore_user_profile):
+    """ Helper method to determine the variation of a running experiment a user should be put in,
+    going through forced variations, whitelisting, stored decisions, audience conditions and bucketing.
+
+    Args:
+      experiment: Experiment for which user variation needs to be determined.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+      ignore_user_profile: True to ignore the user profile lookup.
+
+    Returns:
+      Variation user should see. None if user is not in experiment.
+    """
+
+    # Check if the user is forced into a variation, unless no user is
+    if self.forced_variation_store.has_forced_variations():
+      variation = self.get_forced_variation(experiment.key, user_id)
+      if variation:
+        return variation
 
     # Check to see if user is white-listed for a certain variation
-    variation = self.get_forced_variation(experiment, user_id)
+    variation = self.get_whitelisted_variation(experiment, user_id)
     if variation:
       return variation
 
     # Check to see if user has a decision available for the given experiment
-    user_profile = UserProfile(user_id)
+    user_profile = None
     if not ignore_user_profile and self.user_profile_service:
-      try:
-        retrieved_profile = self.user_profile_service.lookup(user_id)
-      except:
-        self.logger.exception('Unable to retrieve user profile for user "%s" as lookup failed.' % user_id)
-        retrieved_profile = None
-
-      if validator.is_user_profile_valid(retrieved_profile):
-        user_profile = UserProfile(**retrieved_profile)
+      user_profile = self._lookup_user_profile(user_id)
+      if user_profile:
         variation = self.get_stored_variation(experiment, user_profile)
         if variation:
           return variation
       else:
-        self.logger.warning('User profile has invalid format.')
+        user_profile = UserProfile(user_id)
 
     # Bucket user and store the new decision
-    if not audience_helper.is_user_in_experiment(self.config, experiment, attributes):
+    if not self._is_user_in_experiment(experiment, attributes):
       self.logger.info('User "%s" does not meet conditions to be in experiment "%s".' % (
         user_id,
         experiment.key
@@ -169,12 +438,9 @@ class DecisionService(object):
 
     if variation:
       # Store this new decision and return the variation for the user
-      if not ignore_user_profile and self.user_profile_service:
-        try:
-          user_profile.save_variation_for_experiment(experiment.id, variation.id)
-          self.user_profile_service.save(user_profile.__dict__)
-        except:
-          self.logger.exception('Unable to save user profile for user "%s".' % user_id)
+      if user_profile:
+        user_profile.save_variation_for_experiment(experiment.id, variation.id)
+        self._save_user_profile(user_profile)
       return variation
 
     return None
@@ -192,47 +458,53 @@ class DecisionService(object):
       Decision namedtuple consisting of experiment and variation for the user.
     """
 
+    # Return the decision without evaluating rules if it is the same for every user
+    if rollout:
+      rollout_and_decision = self.config.decision_analysis.rollout_decisions.get(rollout.id)
+      if rollout_and_decision and rollout_and_decision[0] is rollout:
+        self.logger.debug('Rollout "%s" has the same decision for every user.' % rollout.id)
+        return rollout_and_decision[1]
+
+    if not rollout or not rollout.experiments:
+      return Decision(None, None, DECISION_SOURCE_ROLLOUT)
+
+    rollout_plan = self.config.rollout_plan_map.get(rollout.id)
+    if not rollout_plan or rollout_plan.rollout is not rollout:
+      rollout_plan = decision_plan.compile_rollout(self.config, rollout)
+
     # Go through each experiment in order and try to get the variation for the user
-    if rollout and len(rollout.experiments) > 0:
-      for idx in range(len(rollout.experiments) - 1):
-        experiment = self.config.get_experiment_from_key(rollout.experiments[idx].get('key'))
+    bucketing_id = self._get_bucketing_id(user_id, attributes)
+    for idx, experiment in enumerate(rollout_plan.rules):
+      # Check if user meets audience conditions for targeting rule
+      if not self._is_user_in_experiment(experiment, attributes):
+        self.logger.debug('User "%s" does not meet conditions for targeting rule %s.' % (
+          user_id,
+          idx + 1
+        ))
+        continue
 
-        # Check if user meets audience conditions for targeting rule
-        if not audience_helper.is_user_in_experiment(self.config, experiment, attributes):
-          self.logger.debug('User "%s" does not meet conditions for targeting rule %s.' % (
-            user_id,
-            idx + 1
-          ))
-          continue
+      self.logger.debug('User "%s" meets conditions for targeting rule %s.' % (user_id, idx + 1))
+      variation = self.bucketer.bucket(experiment, user_id, bucketing_id)
+      if variation:
+        self.logger.debug('User "%s" is in variation %s of experiment %s.' % (
+          user_id,
+          variation.key,
+          experiment.key
+        ))
+        return Decision(experiment, variation, DECISION_SOURCE_ROLLOUT)
 
-        self.logger.debug('User "%s" meets conditions for targeting rule %s.' % (user_id, idx + 1))
-        # Determine bucketing ID to be used
-        bucketing_id = self._get_bucketing_id(user_id, attributes)
-        variation = self.bucketer.bucket(experiment, user_id, bucketing_id)
-        if variation:
-          self.logger.debug('User "%s" is in variation %s of experiment %s.' % (
-            user_id,
-            variation.key,
-            experiment.key
-          ))
-          return Decision(experiment, variation, DECISION_SOURCE_ROLLOUT)
-        else:
-          # Evaluate no further rules
-          self.logger.debug('User "%s" is not in the traffic group for the targeting else. '
-                            'Checking "Everyone Else" rule now.' % user_id)
-          break
-
-      # Evaluate last rule i.e. "Everyone Else" rule
-      everyone_else_experiment = self.config.get_experiment_from_key(rollout.experiments[-1].get('key'))
-      if audience_helper.is_user_in_experiment(self.config,
-                                               self.config.get_experiment_from_key(rollout.experiments[-1].get('key')),
-                                               attributes):
-        # Determine bucketing ID to be used
-        bucketing_id = self._get_bucketing_id(user_id, attributes)
-        variation = self.bucketer.bucket(everyone_else_experiment, user_id, bucketing_id)
-        if variation:
-          self.logger.debug('User "%s" meets conditions for targeting rule "Everyone Else".' % user_id)
-          return Decision(everyone_else_experiment, variation, DECISION_SOURCE_ROLLOUT)
+      # Evaluate no further rules
+      self.logger.debug('User "%s" is not in the traffic group for the targeting else. '
+                        'Checking "Everyone Else" rule now.' % user_id)
+      break
+
+    # Evaluate last rule i.e. "Everyone Else" rule
+    everyone_else_experiment = rollout_plan.everyone_else_rule
+    if self._is_user_in_experiment(everyone_else_experiment, attributes):
+      variation = self.bucketer.bucket(everyone_else_experiment, user_id, bucketing_id)
+      if variation:
+        self.logger.debug('User "%s" meets conditions for targeting rule "Everyone Else".' % user_id)
+        return Decision(everyone_else_experiment, variation, DECISION_SOURCE_ROLLOUT)
 
     return Decision(None, None, DECISION_SOURCE_ROLLOUT)
 
@@ -277,16 +549,55 @@ class DecisionService(object):
       Decision namedtuple consisting of experiment and variation for the user.
     """
 
+    # Return the decision without bucketing if it is the same for every user
+    if self._can_use_constant_decisions():
+      feature_and_decision = self.config.decision_analysis.feature_decisions.get(feature.key)
+      if feature_and_decision and feature_and_decision[0] is feature:
+        self.logger.debug('Feature "%s" has the same decision for every user.' % feature.key)
+        return feature_and_decision[1]
+
+    # Return the decision cached for the user if there is one
+    decision_cache_key = self._get_decision_cache_key(_decision_cache.KIND_FEATURE, feature.key, user_id, attributes)
+    if decision_cache_key is not None:
+      decision = self.decision_cache.lookup(decision_cache_key)
+      if decision:
+        self.logger.debug('Returning cached decision of user "%s" for feature "%s".' % (user_id, feature.key))
+        return decision
+
+    decision = self._get_decision_for_user(feature, user_id, attributes)
+    if decision_cache_key is not None:
+      self.decision_cache.save(decision_cache_key, decision)
+    return decision
+
+  def _get_decision_for_user(self, feature, user_id, attributes):
+    """ Helper method to determine the experiment/variation a user is bucketed in for a feature,
+    going through its group or experiment and then its rollout.
+
+    Args:
+      feature: Feature for which we are determining if it is enabled or not for the given user.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      Decision namedtuple consisting of experiment and variation for the user.
+    """
+
+    feature_plan = self.config.feature_plan_map.get(feature.key)
+    if not feature_plan or feature_plan.feature is not feature:
+      feature_plan = decision_plan.compile_feature(self.config, feature)
+
     experiment = None
     variation = None
     bucketing_id = self._get_bucketing_id(user_id, attributes)
 
     # First check if the feature is in a mutex group
     if feature.groupId:
-      group = self.config.get_group(feature.groupId)
+      group = feature_plan.group
+      if not group or group.id != feature.groupId:
+        group = self.config.get_group(feature.groupId)
       if group:
         experiment = self.get_experiment_in_group(group, bucketing_id)
-        if experiment and experiment.id in feature.experimentIds:
+        if experiment and experiment.id in feature_plan.experiment_ids:
           variation = self.get_variation(experiment, user_id, attributes)
 
           if variation:
@@ -301,7 +612,7 @@ class DecisionService(object):
     # Next check if the feature is being experimented on
     elif feature.experimentIds:
       # If an experiment is not in a group, then the feature can only be associated with one experiment
-      experiment = self.config.get_experiment_from_id(feature.experimentIds[0])
+      experiment = feature_plan.experiment or self.config.get_experiment_from_id(feature.experimentIds[0])
       if experiment:
         variation = self.get_variation(experiment, user_id, attributes)
 
@@ -314,7 +625,85 @@ class DecisionService(object):
 
     # Next check if user is part of a rollout
     if not variation and feature.rolloutId:
-      rollout = self.config.get_rollout_from_id(feature.rolloutId)
+      rollout = feature_plan.rollout or self.config.get_rollout_from_id(feature.rolloutId)
       return self.get_variation_for_rollout(rollout, user_id, attributes)
 
     return Decision(experiment, variation, DECISION_SOURCE_EXPERIMENT)
+
+
+class UserDecisionService(DecisionService):
+  """ DecisionService bound to a single user and attributes, which memoizes the bucketing ID, the results of
+  evaluating audiences and the user's profile across the decisions made for that user. It is not thread-safe.
+
+  The user's profile is looked up once. Decisions are saved to it in memory, and it is written back once
+  save_user_profile is called, only if it changed.
+  """
+
+  def __init__(self, decision_service, user_id, attributes, user_profile=None, audience_results=None):
+    """ UserDecisionService init method.
+
+    Args:
+      decision_service: DecisionService whose config and components are to be used.
+      user_id: ID for user.
+      attributes: Dict representing user attributes, which must not be mutated while the service is in use.
+      user_profile: Optional UserProfile of the user already looked up, e.g. along with those of other users.
+      audience_results: Optional dict of the results of evaluating audiences to share with services bound
+                        to users with the same attributes.
+    """
+
+    DecisionService.__init__(self,
+                             decision_service.config,
+                             decision_service.user_profile_service,
+                             decision_service.forced_variation_store,
+                             decision_service.decision_cache)
+    self.logger = decision_service.logger
+    self.user_id = user_id
+    self.attributes = attributes
+    self._bucketing_id = None
+    self._audience_results = audience_results if audience_results is not None else {}
+    self._user_profile = user_profile
+    # Decisions of the profile as last looked up or saved.
+    self._saved_experiment_bucket_map = dict(user_profile.experiment_bucket_map) if user_profile else None
+
+  def _is_bound_user(self, user_id, attributes):
+    """ Helper method to determine if a decision is made for the user and attributes the service is bound to. """
+
+    return user_id == self.user_id and attributes is self.attributes
+
+  def _get_bucketing_id(self, user_id, attributes):
+    if not self._is_bound_user(user_id, attributes):
+      return DecisionService._get_bucketing_id(self, user_id, attributes)
+
+    if self._bucketing_id is None:
+      self._bucketing_id = DecisionService._get_bucketing_id(self, user_id, attributes)
+    return self._bucketing_id
+
+  def _is_user_in_experiment(self, experiment, attributes):
+    if attributes is not self.attributes:
+      return DecisionService._is_user_in_experiment(self, experiment, attributes)
+
+    return audience_helper.is_user_in_experiment(self.config, experiment, attributes, self._audience_results)
+
+  def _lookup_user_profile(self, user_id):
+    if user_id != self.user_id:
+      return DecisionService._lookup_user_profile(self, user_id)
+
+    # The profile is updated in place as decisions are made, so it stays current.
+    if self._user_profile is None:
+      self._user_profile = DecisionService._lookup_user_profile(self, user_id) or UserProfile(user_id)
+      self._saved_experiment_bucket_map = dict(self._user_profile.experiment_bucket_map)
+    return self._user_profile
+
+  def _save_user_profile(self, user_profile):
+    if user_profile is not self._user_profile:
+      DecisionService._save_user_profile(self, user_profile)
+
+  def save_user_profile(self):
+    """ Save the user's profile if decisions made since it was looked up or last saved changed it. """
+
+    user_profile = self._user_profile
+    if user_profile is None or user_profile.experiment_bucket_map == self._saved_experiment_bucket_map:
+      return
+
+    DecisionService._save_user_profile(self, user_profile)
+    self._saved_experiment_bucket_map = dict(user_profile.experiment_bucket_map)
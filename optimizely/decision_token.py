@@ -0,0 +1,162 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+
+from six import string_types
+
+from . import decision_bundle
+from . import decision_service
+from . import exceptions
+from .helpers import enums
+
+# Tokens are the URL-safe base64 encodings of a JSON payload and of its HMAC-SHA256 signature, joined by a dot.
+# The payload holds the format version, the config revision, the user ID and, per feature, its key, whether it is
+# enabled and the IDs of the experiment and variation decided on along with the source of the decision.
+TOKEN_FORMAT_VERSION = 1
+
+_DECISION_SOURCES = (decision_service.DECISION_SOURCE_EXPERIMENT, decision_service.DECISION_SOURCE_ROLLOUT)
+
+
+def _encode(data):
+  """ Helper method to encode bytes as unpadded URL-safe base64. """
+
+  return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _decode(data):
+  """ Helper method to decode unpadded URL-safe base64. """
+
+  return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _sign(payload, key):
+  """ Helper method to compute the signature of an encoded payload. """
+
+  if isinstance(key, string_types):
+    key = key.encode('utf-8')
+
+  return hmac.new(key, payload, hashlib.sha256).digest()
+
+
+def _invalid(reason):
+  """ Helper method to create the exception raised for an invalid token. """
+
+  return exceptions.InvalidDecisionTokenException(enums.Errors.INVALID_DECISION_TOKEN.format(reason))
+
+
+def _is_source_index(value):
+  """ Helper method to determine if a value is the index of a decision source. """
+
+  return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(_DECISION_SOURCES)
+
+
+def dump(config, bundle, key):
+  """ Serialize the decisions of a bundle into a compact token signed with the given key, so that other services
+  using the same datafile revision can reuse them rather than deciding again.
+
+  Args:
+    config: ProjectConfig the decisions were made with.
+    bundle: decision_bundle.DecisionBundle to serialize.
+    key: Secret key, as bytes or string, shared with the services the token is handed to.
+
+  Returns:
+    String token.
+
+  Raises:
+    InvalidDecisionTokenException if the decisions were not made with the given config's revision.
+  """
+
+  if bundle.revision != config.revision:
+    raise _invalid('decided with revision %s' % bundle.revision)
+
+  feature_decisions = []
+  for feature_decision in bundle.feature_decisions.values():
+    experiment_id = variation_id = None
+    if feature_decision.variation_key is not None:
+      experiment = config.experiment_key_map[feature_decision.experiment_key]
+      experiment_id = experiment.id
+      variation_id = config.get_variation_from_key(experiment.key, feature_decision.variation_key).id
+
+    feature_decisions.append([feature_decision.feature_key,
+                              int(feature_decision.enabled),
+                              experiment_id,
+                              variation_id,
+                              _DECISION_SOURCES.index(feature_decision.source)])
+
+  payload = _encode(json.dumps([TOKEN_FORMAT_VERSION, config.revision, bundle.user_id, feature_decisions],
+                               separators=(',', ':')).encode('utf-8'))
+  return (payload + b'.' + _encode(_sign(payload, key))).decode('ascii')
+
+
+def load(config, token, key, user_id=None):
+  """ Restore the decisions serialized into a token, after checking its signature.
+  The values of variables are read from the config rather than from the token.
+
+  Args:
+    config: ProjectConfig to restore the decisions with.
+    token: String token created by dump.
+    key: Secret key, as bytes or string, the token was signed with.
+    user_id: Optional ID for user the decisions are expected to have been made for.
+
+  Returns:
+    decision_bundle.DecisionBundle holding the decisions of the token.
+
+  Raises:
+    InvalidDecisionTokenException if the token is malformed, its signature does not match, it was produced with
+    a different token format version or datafile revision, or it was issued for another user.
+  """
+
+  try:
+    payload, signature = token.encode('ascii').split(b'.')
+    signature = _decode(signature)
+  except (AttributeError, UnicodeError, ValueError, TypeError, binascii.Error):
+    raise _invalid('malformed token')
+
+  if not hmac.compare_digest(signature, _sign(payload, key)):
+    raise _invalid('signature mismatch')
+
+  try:
+    format_version, revision, token_user_id, feature_decisions = json.loads(_decode(payload).decode('utf-8'))
+    if format_version != TOKEN_FORMAT_VERSION:
+      raise _invalid('unsupported token format')
+
+    if revision != config.revision:
+      raise _invalid('issued for revision %s' % revision)
+
+    if user_id is not None and token_user_id != user_id:
+      raise _invalid('issued for another user')
+
+    restored_decisions = {}
+    for feature_key, enabled, experiment_id, variation_id, source_index in feature_decisions:
+      feature = config.feature_key_map.get(feature_key)
+      experiment = config.experiment_id_map.get(experiment_id) if experiment_id is not None else None
+      if not feature or (experiment_id is not None and not experiment) or not _is_source_index(source_index):
+        raise _invalid('decision does not match the datafile')
+
+      variation = config.get_variation_from_id(experiment.key, variation_id) if experiment else None
+      feature_decision = decision_bundle.create_feature_decision(
+        config, feature, decision_service.Decision(experiment, variation, _DECISION_SOURCES[source_index])
+      )
+      if feature_decision.enabled != bool(enabled):
+        raise _invalid('decision does not match the datafile')
+
+      restored_decisions[feature_key] = feature_decision
+  except (ValueError, TypeError, IndexError, binascii.Error):
+    raise _invalid('malformed payload')
+
+  return decision_bundle.create_decision_bundle(config, token_user_id, restored_decisions)
@@ -303,6 +303,40 @@ class EventBuilder(BaseEventBuilder):
                  http_verb=self.HTTP_VERB,
                  headers=self.HTTP_HEADERS)
 
+  def create_impression_event_batch(self, impressions):
+    """ Create a single impression Event to be sent to the logging endpoint for many impressions.
+
+    Args:
+      impressions: List of tuples of experiment, ID for variation, ID for user and dict representing user
+                   attributes, for each impression to be recorded. Impressions of the same user with the same
+                   attributes dict are recorded as snapshots of the same visitor.
+
+    Returns:
+      Event object encapsulating the impression events. None if there are no impressions.
+    """
+
+    if not impressions:
+      return None
+
+    params = None
+    visitors = {}
+    for experiment, variation_id, user_id, attributes in impressions:
+      visitor = visitors.get((user_id, id(attributes)))
+      if visitor is None:
+        common_params = self._get_common_params(user_id, attributes)
+        visitor = visitors[(user_id, id(attributes))] = common_params[self.EventParams.USERS][0]
+        if params is None:
+          params = common_params
+        else:
+          params[self.EventParams.USERS].append(visitor)
+
+      visitor[self.EventParams.SNAPSHOTS].append(self._get_required_params_for_impression(experiment, variation_id))
+
+    return Event(self.EVENTS_URL,
+                 params,
+                 http_verb=self.HTTP_VERB,
+                 headers=self.HTTP_HEADERS)
+
   def create_conversion_event(self, event_key, user_id, attributes, event_tags, decisions):
     """ Create conversion Event to be sent to the logging endpoint.
 
@@ -325,3 +359,29 @@ class EventBuilder(BaseEventBuilder):
                  params,
                  http_verb=self.HTTP_VERB,
                  headers=self.HTTP_HEADERS)
+
+
+class UserEventBuilder(EventBuilder):
+  """ EventBuilder bound to a single user's attributes, which memoizes the attribute list of the events built. """
+
+  def __init__(self, config, attributes):
+    """ UserEventBuilder init method.
+
+    Args:
+      config: ProjectConfig the events are built for.
+      attributes: Dict representing user attributes, which must not be mutated while the builder is in use.
+    """
+
+    EventBuilder.__init__(self, config)
+    self.attributes = attributes
+    self._attribute_params = None
+
+  def _get_attributes(self, attributes):
+    if attributes is not self.attributes:
+      return EventBuilder._get_attributes(self, attributes)
+
+    if self._attribute_params is None:
+      self._attribute_params = EventBuilder._get_attributes(self, attributes)
+
+    # Events are handed to dispatchers and listeners, so each one gets its own copy.
+    return [dict(param) for param in self._attribute_params]
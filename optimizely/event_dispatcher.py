@@ -30,6 +30,9 @@ class EventDispatcher(object):
 
     Args:
       event: Object holding information about the request to be dispatched to the Optimizely backend.
+
+    Returns:
+      Boolean False if the event could not be dispatched. True otherwise.
     """
 
     try:
@@ -42,3 +45,6 @@ class EventDispatcher(object):
 
     except request_exception.RequestException as error:
       logging.error('Dispatch event failed. Error: %s' % str(error))
+      return False
+
+    return True
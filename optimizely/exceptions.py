@@ -22,6 +22,16 @@ class InvalidAudienceException(Exception):
   pass
 
 
+class InvalidConfigSnapshotException(Exception):
+  """ Raised when provided config snapshot is invalid. """
+  pass
+
+
+class InvalidDecisionTokenException(Exception):
+  """ Raised when provided decision token is invalid. """
+  pass
+
+
 class InvalidEventException(Exception):
   """ Raised when provided event key is invalid. """
   pass
@@ -0,0 +1,103 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .helpers import enums
+from .lru_cache import LRUCache
+
+
+class ForcedVariationStore(object):
+  """ Class storing the variations users are forced into by calling set_forced_variation.
+
+  Forced variations are kept for a bounded number of users, evicting the least recently used user
+  once full, and expire after a timeout. Replace it with your own implementation providing the same
+  methods, e.g. to share forced variations between processes.
+
+  The experiment-to-variation maps handed out are never mutated. Updates replace a user's map as a whole,
+  so they are safe to read while other threads set forced variations.
+  """
+
+  def __init__(self,
+               capacity=enums.ForcedVariationStore.DEFAULT_CAPACITY,
+               timeout=enums.ForcedVariationStore.DEFAULT_TIMEOUT):
+    """ ForcedVariationStore init method.
+
+    Args:
+      capacity: Optional maximum number of users to keep forced variations for. None for no limit.
+      timeout: Optional number of seconds after which the forced variations of a user expire.
+               None for forced variations which do not expire.
+    """
+
+    self._cache = LRUCache(capacity, timeout)
+
+  def has_forced_variations(self):
+    """ Determine, without taking any lock, if there might be any forced variations.
+
+    Returns:
+      Boolean False if there are no forced variations or all of them expired. True otherwise.
+    """
+
+    return self._cache.has_entries()
+
+  def get_forced_variations(self, user_id):
+    """ Get the forced variations of the given user.
+
+    Args:
+      user_id: ID for user.
+
+    Returns:
+      Dict mapping experiment ID to variation ID, which must not be mutated. None if the user has none.
+    """
+
+    return self._cache.lookup(user_id)
+
+  def set_forced_variation(self, user_id, experiment_id, variation_id):
+    """ Force the given user into a variation of an experiment.
+
+    Args:
+      user_id: ID for user.
+      experiment_id: ID for experiment.
+      variation_id: ID for variation.
+    """
+
+    def add_variation(experiment_to_variation_map):
+      experiment_to_variation_map = dict(experiment_to_variation_map or {})
+      experiment_to_variation_map[experiment_id] = variation_id
+      return experiment_to_variation_map
+
+    self._cache.update(user_id, add_variation)
+
+  def remove_forced_variation(self, user_id, experiment_id):
+    """ Remove the variation the given user is forced into for an experiment.
+
+    Args:
+      user_id: ID for user.
+      experiment_id: ID for experiment.
+
+    Returns:
+      Boolean True if the user was forced into a variation of the experiment. False otherwise.
+    """
+
+    removed = []
+
+    def remove_variation(experiment_to_variation_map):
+      if not experiment_to_variation_map or experiment_id not in experiment_to_variation_map:
+        return experiment_to_variation_map
+
+      removed.append(experiment_id)
+      experiment_to_variation_map = dict(experiment_to_variation_map)
+      del experiment_to_variation_map[experiment_id]
+      # Users without forced variations are dropped, so that the store becomes empty again.
+      return experiment_to_variation_map or None
+
+    self._cache.update(user_id, remove_variation)
+    return bool(removed)
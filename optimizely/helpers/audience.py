@@ -15,7 +15,7 @@ from . import condition as condition_helper
 from . import condition_tree_evaluator
 
 
-def is_user_in_experiment(config, experiment, attributes):
+def is_user_in_experiment(config, experiment, attributes, audience_results=None):
   """ Determine for given experiment if user satisfies the audiences for the experiment.
 
   Args:
@@ -23,6 +23,8 @@ def is_user_in_experiment(config, experiment, attributes):
     experiment: Object representing the experiment.
     attributes: Dict representing user attributes which will be used in determining
                 if the audience conditions are met. If not provided, default to an empty dict.
+    audience_results: Optional dict mapping audience ID to the result of evaluating it for the same user and
+                      attributes. Audiences in it are not evaluated again and audiences evaluated are added to it.
 
   Returns:
     Boolean representing if user satisfies audience conditions for any of the audiences or not.
@@ -44,6 +46,14 @@ def is_user_in_experiment(config, experiment, attributes):
     return custom_attr_condition_evaluator.evaluate(index)
 
   def evaluate_audience(audienceId):
+    if audience_results is not None:
+      if audienceId not in audience_results:
+        audience_results[audienceId] = evaluate_audience_conditions(audienceId)
+      return audience_results[audienceId]
+
+    return evaluate_audience_conditions(audienceId)
+
+  def evaluate_audience_conditions(audienceId):
     audience = config.get_audience(audienceId)
 
     if audience is None:
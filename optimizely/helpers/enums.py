@@ -14,6 +14,14 @@
 import logging
 
 
+class ConfigManager(object):
+  DATAFILE_URL_TEMPLATE = 'https://cdn.optimizely.com/datafiles/{sdk_key}.json'
+  DEFAULT_FILE_POLL_INTERVAL = 1
+  # Default interval in seconds between requests for the datafile.
+  DEFAULT_UPDATE_INTERVAL = 5 * 60
+  REQUEST_TIMEOUT = 10
+
+
 class ControlAttributes(object):
   BOT_FILTERING = '$opt_bot_filtering'
   BUCKETING_ID = '$opt_bucketing_id'
@@ -26,11 +34,24 @@ class DatafileVersions(object):
   V4 = '4'
 
 
+class DecisionCache(object):
+  DEFAULT_CAPACITY = 10000
+  # Default number of seconds after which cached decisions expire.
+  DEFAULT_TIMEOUT = 10 * 60
+
+
+class DecisionStream(object):
+  # Default number of records decided together by decide_stream.
+  DEFAULT_CHUNK_SIZE = 500
+
+
 class Errors(object):
   INVALID_ATTRIBUTE_ERROR = 'Provided attribute is not in datafile.'
   INVALID_ATTRIBUTE_FORMAT = 'Attributes provided are in an invalid format.'
   INVALID_AUDIENCE_ERROR = 'Provided audience is not in datafile.'
+  INVALID_CONFIG_SNAPSHOT = 'Provided config snapshot is invalid: {}.'
   INVALID_DATAFILE = 'Datafile has invalid format. Failing "{}".'
+  INVALID_DECISION_TOKEN = 'Provided decision token is invalid: {}.'
   INVALID_EVENT_TAG_FORMAT = 'Event tags provided are in an invalid format.'
   INVALID_EXPERIMENT_KEY_ERROR = 'Provided experiment is not in datafile.'
   INVALID_EVENT_KEY_ERROR = 'Provided event is not in datafile.'
@@ -45,11 +66,23 @@ class Errors(object):
   UNSUPPORTED_DATAFILE_VERSION = 'This version of the Python SDK does not support the given datafile version: "{}".'
 
 
+class ForcedVariationStore(object):
+  DEFAULT_CAPACITY = 10000
+  # Default number of seconds after which forced variations expire.
+  DEFAULT_TIMEOUT = 24 * 60 * 60
+
+
 class HTTPVerbs(object):
   GET = 'GET'
   POST = 'POST'
 
 
+class ImpressionCache(object):
+  DEFAULT_CAPACITY = 10000
+  # Default number of seconds during which repeated impressions are suppressed.
+  DEFAULT_TIMEOUT = 30 * 60
+
+
 class LogLevels(object):
   NOTSET = logging.NOTSET
   DEBUG = logging.DEBUG
@@ -64,7 +97,8 @@ class NotificationTypes(object):
       format is NOTIFICATION TYPE: list of parameters to callback.
 
       ACTIVATE notification listener has the following parameters:
-      Experiment experiment, str user_id, dict attributes (can be None), Variation variation, Event event
+      Experiment experiment, str user_id, dict attributes (can be None), Variation variation,
+      Event event (None for impressions suppressed by an impression cache)
       TRACK notification listener has the following parameters:
       str event_key, str user_id, dict attributes (can be None), event_tags (can be None), Event event
   """
@@ -25,16 +25,19 @@ def is_datafile_valid(datafile):
   """ Given a datafile determine if it is valid or not.
 
   Args:
-    datafile: JSON string representing the project.
+    datafile: JSON string representing the project, or the dict parsed from it.
 
   Returns:
     Boolean depending upon whether datafile is valid or not.
   """
 
-  try:
-    datafile_json = json.loads(datafile)
-  except:
-    return False
+  if isinstance(datafile, dict):
+    datafile_json = datafile
+  else:
+    try:
+      datafile_json = json.loads(datafile)
+    except:
+      return False
 
   try:
     jsonschema.Draft4Validator(constants.JSON_SCHEMA).validate(datafile_json)
@@ -171,6 +174,21 @@ def is_non_empty_string(input_id_key):
   return False
 
 
+def is_secret_key_valid(key):
+  """ Determine if provided key is usable to sign data with, i.e. a non-empty string or bytes.
+
+  Args:
+    key: Variable which needs to be validated.
+
+  Returns:
+    Boolean depending upon whether key is valid or not.
+  """
+  if key and isinstance(key, (string_types, bytes)):
+    return True
+
+  return False
+
+
 def is_attribute_valid(attribute_key, attribute_value):
   """ Determine if given attribute is valid.
 
@@ -0,0 +1,108 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from .helpers import enums
+from .lru_cache import LRUCache
+
+
+class ImpressionCache(object):
+  """ Class remembering the impressions sent recently, so that the impressions of feature checks repeating
+  for the same user, experiment, variation and config revision are suppressed rather than sent again.
+
+  Impressions are remembered for a bounded number of keys, evicting the least recently used once full,
+  and are sent again once the timeout since they were last sent elapsed. Impressions sent by activate
+  are always sent, as activating is an explicit request to record an impression.
+  """
+
+  def __init__(self,
+               capacity=enums.ImpressionCache.DEFAULT_CAPACITY,
+               timeout=enums.ImpressionCache.DEFAULT_TIMEOUT,
+               notify_suppressed=True):
+    """ ImpressionCache init method.
+
+    Args:
+      capacity: Optional maximum number of impressions to remember. None for no limit.
+      timeout: Optional number of seconds during which repeated impressions are suppressed.
+               None for impressions which are suppressed for as long as they are remembered.
+      notify_suppressed: Optional boolean param which allows not sending ACTIVATE notifications for suppressed
+                         impressions. By default they are sent, without an event.
+    """
+
+    self.notify_suppressed = notify_suppressed
+    self._cache = LRUCache(capacity, timeout)
+    self._lock = threading.Lock()
+    self._sent = 0
+    self._suppressed = 0
+
+  def should_send(self, config, experiment, variation, user_id):
+    """ Determine if an impression is to be sent, remembering it if so. Impressions which then can not be
+    dispatched are to be forgotten through forget.
+
+    Args:
+      config: ProjectConfig the decision was made with.
+      experiment: Experiment of the impression.
+      variation: Variation picked for the user.
+      user_id: ID for user.
+
+    Returns:
+      Boolean True if the impression was not sent recently. False if it is to be suppressed.
+    """
+
+    key = (config.revision, experiment.id, variation.id, user_id)
+    with self._lock:
+      if self._cache.lookup(key):
+        self._suppressed += 1
+        return False
+
+      self._cache.save(key, True)
+      self._sent += 1
+      return True
+
+  def forget(self, config, experiment, variation, user_id):
+    """ Forget an impression should_send allowed sending, e.g. as it could not be dispatched,
+    so that it is sent again when it repeats.
+
+    Args:
+      config: ProjectConfig the decision was made with.
+      experiment: Experiment of the impression.
+      variation: Variation picked for the user.
+      user_id: ID for user.
+    """
+
+    key = (config.revision, experiment.id, variation.id, user_id)
+    with self._lock:
+      if self._cache.remove(key):
+        self._sent -= 1
+
+  def reset(self):
+    """ Forget all impressions. Metrics are kept. """
+
+    self._cache.reset()
+
+  def get_metrics(self):
+    """ Get metrics of the impressions deduplicated.
+
+    Returns:
+      Dict with the number of impressions remembered, including expired ones which have not been dropped yet,
+      and the number of impressions sent, suppressed and evicted so far.
+    """
+
+    with self._lock:
+      return {
+        'entries': len(self._cache),
+        'sent': self._sent,
+        'suppressed': self._suppressed,
+        'evictions': self._cache.evictions
+      }
@@ -0,0 +1,166 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+  """ Thread-safe cache holding a bounded number of entries which expire after a timeout.
+
+  Once the cache is full, the least recently used entry is evicted to make room for a new one.
+  Expired entries are dropped when they are next looked up or evicted.
+  """
+
+  def __init__(self, capacity=None, timeout=None):
+    """ LRUCache init method.
+
+    Args:
+      capacity: Optional maximum number of entries. By default the number of entries is unbounded.
+      timeout: Optional number of seconds after which an entry expires. By default entries do not expire.
+    """
+
+    self.capacity = capacity
+    self.timeout = timeout
+    # Number of entries evicted to stay within capacity.
+    self.evictions = 0
+    # Maps key to tuple of value and time it was saved at, least recently used first.
+    self._entries = OrderedDict()
+    # Time the most recently saved entry was saved at. Once it expired, all entries did.
+    self._last_saved_at = None
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    """ Get the number of entries, including expired entries which have not been dropped yet. """
+
+    return len(self._entries)
+
+  def has_entries(self):
+    """ Determine if there might be entries which have not expired. The lock is only taken once all entries
+    expired, to drop them, so that the cache is found empty without the lock from then on.
+
+    Returns:
+      Boolean False if there are no entries or all of them expired. True otherwise.
+    """
+
+    if not self._entries:
+      return False
+
+    if not self.timeout or time.time() - self._last_saved_at <= self.timeout:
+      return True
+
+    with self._lock:
+      if self._entries and time.time() - self._last_saved_at > self.timeout:
+        self._entries.clear()
+      return bool(self._entries)
+
+  def lookup(self, key, default=None):
+    """ Get the value saved for the given key and mark it as most recently used.
+
+    Args:
+      key: Key of the entry.
+      default: Optional value to return if there is no entry for the key or it expired.
+
+    Returns:
+      Value of the entry. The default if there is none.
+    """
+
+    with self._lock:
+      entry = self._get_entry(key)
+      return default if entry is None else entry[0]
+
+  def save(self, key, value):
+    """ Save a value for the given key, evicting the least recently used entry if the cache is full.
+
+    Args:
+      key: Key of the entry.
+      value: Value to save.
+    """
+
+    with self._lock:
+      self._entries.pop(key, None)
+      self._put_entry(key, value)
+
+  def update(self, key, function):
+    """ Atomically replace the value for the given key with the result of a function of it.
+
+    Args:
+      key: Key of the entry.
+      function: Callable taking the current value, None if there is none, and returning the new value.
+                If it returns None, the entry is removed.
+
+    Returns:
+      The new value.
+    """
+
+    with self._lock:
+      entry = self._get_entry(key)
+      value = function(None if entry is None else entry[0])
+      self._entries.pop(key, None)
+      if value is not None:
+        self._put_entry(key, value)
+      return value
+
+  def remove(self, key):
+    """ Remove the entry for the given key.
+
+    Args:
+      key: Key of the entry.
+
+    Returns:
+      Boolean True if there was an entry which had not expired. False otherwise.
+    """
+
+    with self._lock:
+      return self._get_entry(key) is not None and self._entries.pop(key, None) is not None
+
+  def reset(self):
+    """ Remove all entries. """
+
+    with self._lock:
+      self._entries.clear()
+
+  def _get_entry(self, key):
+    """ Helper method to get the entry for a key and mark it as most recently used, dropping it if it expired.
+    Must be called holding the lock.
+
+    Args:
+      key: Key of the entry.
+
+    Returns:
+      Tuple of value and time it was saved at. None if there is no entry or it expired.
+    """
+
+    entry = self._entries.pop(key, None)
+    if entry is None or self._is_expired(entry):
+      return None
+
+    self._entries[key] = entry
+    return entry
+
+  def _put_entry(self, key, value):
+    """ Helper method to add an entry as most recently used, evicting least recently used entries
+    while the cache is over capacity. Must be called holding the lock. """
+
+    self._last_saved_at = time.time()
+    self._entries[key] = (value, self._last_saved_at)
+    if self.capacity is not None:
+      while len(self._entries) > self.capacity:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def _is_expired(self, entry):
+    """ Helper method to determine if an entry expired. """
+
+    return bool(self.timeout) and time.time() - entry[1] > self.timeout
@@ -10,31 +10,54 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import gc
+import itertools
+from collections import namedtuple
 from six import string_types
 
+from . import config_manager as _config_manager
+from . import config_registry
+from . import config_snapshot as _config_snapshot
+from . import decision_bundle
+from . import decision_cache
 from . import decision_service
+from . import decision_token
 from . import entities
 from . import event_builder
 from . import exceptions
+from . import forced_variation_store as _forced_variation_store
 from . import logger as _logging
 from . import project_config
+from . import user_context as _user_context
 from .error_handler import NoOpErrorHandler as noop_error_handler
 from .event_dispatcher import EventDispatcher as default_event_dispatcher
 from .helpers import enums
 from .helpers import validator
 from .notification_center import NotificationCenter as notification_center
+from .user_profile import UserProfile
+
+# Everything built for one project config. Replaced as a whole on config updates
+# so that every API call runs against a single consistent set of components.
+_ConfigBundle = namedtuple('_ConfigBundle', 'config decision_service event_builder')
 
 
 class Optimizely(object):
   """ Class encapsulating all SDK functionality. """
 
   def __init__(self,
-               datafile,
+               datafile=None,
                event_dispatcher=None,
                logger=None,
                error_handler=None,
                skip_json_validation=False,
-               user_profile_service=None):
+               user_profile_service=None,
+               config_snapshot=None,
+               config_manager=None,
+               share_config=False,
+               lazy_config=False,
+               forced_variation_store=None,
+               decision_cache=None,
+               impression_cache=None):
     """ Optimizely init method for managing Custom projects.
 
     Args:
@@ -46,15 +69,50 @@ class Optimizely(object):
       skip_json_validation: Optional boolean param which allows skipping JSON schema validation upon object invocation.
                             By default JSON schema validation will be performed.
       user_profile_service: Optional component which provides methods to store and manage user profiles.
+      config_snapshot: Optional path to a snapshot written by config_snapshot.dump. If the snapshot can be
+                       restored and was compiled from the revision of the datafile, the datafile is neither
+                       validated nor parsed. Otherwise the datafile is used.
+      config_manager: Optional config_manager.StaticConfigManager providing the project config. The client uses
+                      the config the manager holds and switches over to every config it publishes later on.
+                      If given, datafile and config_snapshot are ignored.
+      share_config: Optional boolean param which allows sharing the project config with all other instances in
+                    this process created with share_config from the same datafile, rather than building one
+                    per instance. Shared configs are frozen. By default each instance builds its own config.
+      lazy_config: Optional boolean param which allows building project configs in lazy mode, compiling only
+                   running experiments, rollouts and the audiences they reference upfront and everything else
+                   once asked for. By default project configs are compiled completely upfront.
+      forced_variation_store: Optional component which provides methods to store the variations users are forced
+                              into through set_forced_variation. By default forced variations are kept in memory
+                              for a bounded number of users and expire after a day.
+      decision_cache: Optional decision_cache.DecisionCache caching the decisions made for users, so that users
+                      asking again with the same attributes are not bucketed again. It is not used while users
+                      are forced into variations or with a user profile service. By default nothing is cached.
+      impression_cache: Optional impression_cache.ImpressionCache suppressing the impressions of feature checks
+                        repeating for the same user and variation. By default every impression is sent.
     """
     self.logger_name = '.'.join([__name__, self.__class__.__name__])
     self.is_valid = True
     self.event_dispatcher = event_dispatcher or default_event_dispatcher
     self.logger = _logging.adapt_logger(logger or _logging.NoOpLogger())
     self.error_handler = error_handler or noop_error_handler
+    self.user_profile_service = user_profile_service
+    self.forced_variation_store = forced_variation_store or _forced_variation_store.ForcedVariationStore()
+    self.decision_cache = decision_cache
+    self.impression_cache = impression_cache
+    self.config_manager = config_manager
+    self._config_bundle = None
+
+    config = None
+    if config_snapshot and not config_manager:
+      try:
+        revision = project_config.get_datafile_revision(datafile)
+        config = _config_snapshot.load(config_snapshot, self.logger, self.error_handler, revision=revision)
+      except exceptions.InvalidConfigSnapshotException as error:
+        self.logger.warning('%s Falling back to datafile.' % str(error))
 
     try:
-      self._validate_instantiation_options(datafile, skip_json_validation)
+      self._validate_instantiation_options(datafile,
+                                           skip_json_validation or config is not None or config_manager is not None)
     except exceptions.InvalidInputException as error:
       self.is_valid = False
       # We actually want to log this error to stderr, so make sure the logger
@@ -63,9 +121,18 @@ class Optimizely(object):
       self.logger.exception(str(error))
       return
 
+    self.notification_center = notification_center(self.logger)
+    if config_manager:
+      config_manager.add_config_listener(self._update_config)
+      return
+
     error_msg = None
     try:
-      self.config = project_config.ProjectConfig(datafile, self.logger, self.error_handler)
+      if config is None:
+        if share_config:
+          config = config_registry.get_project_config(datafile, self.logger, self.error_handler, lazy=lazy_config)
+        else:
+          config = project_config.ProjectConfig(datafile, self.logger, self.error_handler, lazy=lazy_config)
     except exceptions.UnsupportedDatafileVersionException as error:
       error_msg = error.args[0]
       error_to_handle = error
@@ -82,9 +149,147 @@ class Optimizely(object):
         self.error_handler.handle_error(error_to_handle)
         return
 
-    self.event_builder = event_builder.EventBuilder(self.config)
-    self.decision_service = decision_service.DecisionService(self.config, user_profile_service)
-    self.notification_center = notification_center(self.logger)
+    self.config_manager = _config_manager.StaticConfigManager(logger=self.logger,
+                                                              error_handler=self.error_handler,
+                                                              skip_json_validation=skip_json_validation,
+                                                              lazy_config=lazy_config)
+    self.config_manager.set_config(config)
+    self.config_manager.add_config_listener(self._update_config)
+
+  @property
+  def config(self):
+    """ ProjectConfig currently in use. None if there is none. """
+    config_bundle = self._config_bundle
+    return config_bundle.config if config_bundle else None
+
+  @property
+  def decision_service(self):
+    """ DecisionService for the project config currently in use. None if there is none. """
+    config_bundle = self._config_bundle
+    return config_bundle.decision_service if config_bundle else None
+
+  @property
+  def event_builder(self):
+    """ EventBuilder for the project config currently in use. None if there is none. """
+    config_bundle = self._config_bundle
+    return config_bundle.event_builder if config_bundle else None
+
+  def _update_config(self, config):
+    """ Config listener switching the client over to a newly published project config.
+
+    The components depending on the config are built before being published together with it by a
+    single reference assignment. API calls in flight keep using the bundle they started with.
+    Forced variations, cached decisions and notification listeners are carried over.
+
+    Args:
+      config: ProjectConfig to be used from now on.
+    """
+
+    self._config_bundle = _ConfigBundle(
+      config,
+      decision_service.DecisionService(config,
+                                       self.user_profile_service,
+                                       self.forced_variation_store,
+                                       self.decision_cache),
+      event_builder.EventBuilder(config)
+    )
+
+  def _get_config_bundle(self, api_name):
+    """ Helper method to get the config bundle a single API call is to run against.
+
+    Args:
+      api_name: Name of the API being called.
+
+    Returns:
+      _ConfigBundle currently in use. None, after logging an error, if the client is invalid or has no config yet.
+    """
+
+    config_bundle = self._config_bundle
+    if not self.is_valid or config_bundle is None:
+      self.logger.error(enums.Errors.INVALID_DATAFILE.format(api_name))
+      return None
+
+    return config_bundle
+
+  def _bind_user(self, config_bundle, user_id, attributes):
+    """ Helper method to get the config bundle a single API call deciding for a user is to run against,
+    so that the user's profile is looked up at most once and saved at most once per call.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      _ConfigBundle with a UserDecisionService if a user profile service is in use. The given one otherwise.
+      Call save_user_profile on its decision service once the decisions are made.
+    """
+
+    if not config_bundle.decision_service.user_profile_service:
+      return config_bundle
+
+    return config_bundle._replace(
+      decision_service=decision_service.UserDecisionService(config_bundle.decision_service, user_id, attributes)
+    )
+
+  def _bind_users(self, config_bundle, users):
+    """ Helper method to validate the users of a batch API call and bind a decision service to each valid one.
+    The profiles of all users are looked up at once, and users with the same attributes share the results
+    of evaluating audiences.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      users: List of tuples of ID for user and dict representing user attributes.
+
+    Returns:
+      List holding a UserDecisionService for each valid user and None for each invalid one, in the order of users.
+      Call save_user_profile on each service once the decisions are made.
+    """
+
+    valid_users = []
+    for user in users:
+      try:
+        user_id, attributes = user
+      except (TypeError, ValueError):
+        self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('users'))
+        valid_users.append(None)
+        continue
+
+      if not isinstance(user_id, string_types):
+        self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+        valid_users.append(None)
+        continue
+
+      if not self._validate_user_inputs(attributes):
+        valid_users.append(None)
+        continue
+
+      valid_users.append((user_id, attributes))
+
+    user_profiles = {}
+    if config_bundle.decision_service.user_profile_service:
+      user_ids = list(set(user[0] for user in valid_users if user))
+      user_profiles = config_bundle.decision_service.lookup_user_profiles(user_ids)
+      for user_id in user_ids:
+        user_profiles.setdefault(user_id, UserProfile(user_id))
+
+    audience_results_map = {}
+    user_decision_services = []
+    for user in valid_users:
+      if not user:
+        user_decision_services.append(None)
+        continue
+
+      user_id, attributes = user
+      fingerprint = decision_cache.get_attributes_fingerprint(attributes)
+      audience_results = audience_results_map.setdefault(fingerprint, {}) if fingerprint is not None else None
+      user_decision_services.append(decision_service.UserDecisionService(config_bundle.decision_service,
+                                                                         user_id,
+                                                                         attributes,
+                                                                         user_profiles.get(user_id),
+                                                                         audience_results))
+
+    return user_decision_services
 
   def _validate_instantiation_options(self, datafile, skip_json_validation):
     """ Helper method to validate all instantiation parameters.
@@ -133,10 +338,11 @@ class Optimizely(object):
 
     return True
 
-  def _get_decisions(self, event, user_id, attributes):
-    """ Helper method to retrieve decisions for the user for experiment(s) using the provided event.
+  def _get_decisions(self, config_bundle, event, user_id, attributes):
+    """ Helper method to retrieve decisions for the user for the running experiment(s) of the provided event.
 
     Args:
+      config_bundle: _ConfigBundle the API call runs against.
       event: The event which needs to be recorded.
       user_id: ID for user.
       attributes: Dict representing user attributes.
@@ -145,46 +351,139 @@ class Optimizely(object):
       List of tuples representing valid experiment IDs and variation IDs into which the user is bucketed.
     """
     decisions = []
-    for experiment_id in event.experimentIds:
-      experiment = self.config.get_experiment_from_id(experiment_id)
-      variation_key = self.get_variation(experiment.key, user_id, attributes)
+    for experiment in config_bundle.config.get_running_experiments_for_event(event):
+      variation = config_bundle.decision_service.get_variation(experiment, user_id, attributes)
 
-      if not variation_key:
+      if not variation:
         self.logger.info('Not tracking user "%s" for experiment "%s".' % (user_id, experiment.key))
         continue
 
-      variation = self.config.get_variation_from_key(experiment.key, variation_key)
-      decisions.append((experiment_id, variation.id))
+      decisions.append((experiment.id, variation.id))
 
     return decisions
 
-  def _send_impression_event(self, experiment, variation, user_id, attributes):
+  def _send_impression_event(self, config_bundle, experiment, variation, user_id, attributes):
     """ Helper method to send impression event.
 
     Args:
+      config_bundle: _ConfigBundle the API call runs against.
       experiment: Experiment for which impression event is being sent.
       variation: Variation picked for user for the given experiment.
       user_id: ID for user.
       attributes: Dict representing user attributes and values which need to be recorded.
+
+    Returns:
+      Boolean True if the impression event was dispatched. False otherwise.
     """
 
-    impression_event = self.event_builder.create_impression_event(experiment,
-                                                                  variation.id,
-                                                                  user_id,
-                                                                  attributes)
+    impression_event = config_bundle.event_builder.create_impression_event(experiment,
+                                                                           variation.id,
+                                                                           user_id,
+                                                                           attributes)
 
     self.logger.debug('Dispatching impression event to URL %s with params %s.' % (
       impression_event.url,
       impression_event.params
     ))
 
+    dispatched = self._dispatch_impression_event(impression_event)
+
+    self.notification_center.send_notifications(enums.NotificationTypes.ACTIVATE,
+                                                experiment, user_id, attributes, variation, impression_event)
+    return dispatched
+
+  def _dispatch_impression_event(self, impression_event, dispatch_event=None):
+    """ Helper method to dispatch an impression event.
+
+    Args:
+      impression_event: Event to dispatch.
+      dispatch_event: Optional callable to send the impression event with instead of the event dispatcher.
+
+    Returns:
+      Boolean True if the impression event was dispatched. False if dispatching raised or returned False.
+    """
+
     try:
-      self.event_dispatcher.dispatch_event(impression_event)
+      return (dispatch_event or self.event_dispatcher.dispatch_event)(impression_event) is not False
     except:
       self.logger.exception('Unable to dispatch impression event!')
+      return False
 
-    self.notification_center.send_notifications(enums.NotificationTypes.ACTIVATE,
-                                                experiment, user_id, attributes, variation, impression_event)
+  def _should_send_impression(self, config_bundle, experiment, variation, user_id, attributes):
+    """ Helper method to determine if the impression of a feature check is to be sent, or suppressed
+    by the impression cache as it was sent recently. ACTIVATE notifications are sent for suppressed
+    impressions unless the cache is configured otherwise.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      experiment: Experiment for which impression event is being sent.
+      variation: Variation picked for user for the given experiment.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      Boolean True if the impression is to be sent. False otherwise.
+    """
+
+    if not self.impression_cache or self.impression_cache.should_send(config_bundle.config,
+                                                                      experiment, variation, user_id):
+      return True
+
+    self.logger.debug('Suppressing impression of experiment "%s" for user "%s" as it was sent recently.' % (
+      experiment.key,
+      user_id
+    ))
+
+    if self.impression_cache.notify_suppressed:
+      self.notification_center.send_notifications(enums.NotificationTypes.ACTIVATE,
+                                                  experiment, user_id, attributes, variation, None)
+    return False
+
+  def _forget_impression(self, config_bundle, experiment, variation, user_id):
+    """ Helper method to have the impression cache forget an impression which could not be dispatched,
+    so that it is not suppressed when it repeats.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      experiment: Experiment for which impression event was to be sent.
+      variation: Variation picked for user for the given experiment.
+      user_id: ID for user.
+    """
+
+    if self.impression_cache:
+      self.impression_cache.forget(config_bundle.config, experiment, variation, user_id)
+
+  def _send_impression_events(self, config_bundle, impressions, dispatch_event=None):
+    """ Helper method to send many impressions together in a single impression event.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      impressions: List of tuples of experiment, variation picked for the user, ID for user and
+                   dict representing user attributes, for each impression to be recorded.
+      dispatch_event: Optional callable to send the impression event with instead of the event dispatcher.
+    """
+
+    impressions = [impression for impression in impressions
+                   if self._should_send_impression(config_bundle, *impression)]
+    if not impressions:
+      return
+
+    impression_event = config_bundle.event_builder.create_impression_event_batch([
+      (experiment, variation.id, user_id, attributes) for experiment, variation, user_id, attributes in impressions
+    ])
+
+    self.logger.debug('Dispatching impression event to URL %s with params %s.' % (
+      impression_event.url,
+      impression_event.params
+    ))
+
+    if not self._dispatch_impression_event(impression_event, dispatch_event):
+      for experiment, variation, user_id, attributes in impressions:
+        self._forget_impression(config_bundle, experiment, variation, user_id)
+
+    for experiment, variation, user_id, attributes in impressions:
+      self.notification_center.send_notifications(enums.NotificationTypes.ACTIVATE,
+                                                  experiment, user_id, attributes, variation, impression_event)
 
   def _get_feature_variable_for_type(self, feature_key, variable_key, variable_type, user_id, attributes):
     """ Helper method to determine value for a certain variable attached to a feature flag based on type of variable.
@@ -202,6 +501,10 @@ class Optimizely(object):
       - Variable key is invalid.
       - Mismatch with type of variable.
     """
+    config_bundle = self._get_config_bundle('get_feature_variable_%s' % variable_type)
+    if not config_bundle:
+      return None
+
     if not validator.is_non_empty_string(feature_key):
       self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('feature_key'))
       return None
@@ -217,11 +520,32 @@ class Optimizely(object):
     if not self._validate_user_inputs(attributes):
       return None
 
-    feature_flag = self.config.get_feature_from_key(feature_key)
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    value = self._get_feature_variable_value(config_bundle, feature_key, variable_key, variable_type,
+                                             user_id, attributes)
+    config_bundle.decision_service.save_user_profile()
+    return value
+
+  def _get_feature_variable_value(self, config_bundle, feature_key, variable_key, variable_type, user_id, attributes):
+    """ Helper method to determine value for a certain variable attached to a feature flag for the given user.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      feature_key: Key of the feature whose variable's value is being accessed.
+      variable_key: Key of the variable whose value is to be accessed.
+      variable_type: Type of variable which could be one of boolean/double/integer/string.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      Value of the variable. None if the feature or variable is invalid or the type of the variable differs.
+    """
+
+    feature_flag = config_bundle.config.get_feature_from_key(feature_key)
     if not feature_flag:
       return None
 
-    variable = self.config.get_variable_for_feature(feature_key, variable_key)
+    variable = config_bundle.config.get_variable_for_feature(feature_key, variable_key)
     if not variable:
       return None
 
@@ -233,24 +557,15 @@ class Optimizely(object):
       )
       return None
 
-    decision = self.decision_service.get_variation_for_feature(feature_flag, user_id, attributes)
-    if decision.variation:
-      variable_value = self.config.get_variable_value_for_variation(variable, decision.variation)
-
-    else:
-      variable_value = variable.defaultValue
+    decision = config_bundle.decision_service.get_variation_for_feature(feature_flag, user_id, attributes)
+    if not decision.variation:
       self.logger.info(
         'User "%s" is not in any variation or rollout rule. '
         'Returning default value for variable "%s" of feature flag "%s".' % (user_id, variable_key, feature_key)
       )
 
-    try:
-      actual_value = self.config.get_typecast_value(variable_value, variable_type)
-    except:
-      self.logger.error('Unable to cast value. Returning None.')
-      actual_value = None
-
-    return actual_value
+    # Values which can not be cast are reported when the config is built and come back as None.
+    return config_bundle.config.get_typed_variable_value(variable, decision.variation)
 
   def activate(self, experiment_key, user_id, attributes=None):
     """ Buckets visitor and sends impression event to Optimizely.
@@ -265,8 +580,8 @@ class Optimizely(object):
       None if user is not in experiment or if experiment is not Running.
     """
 
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('activate'))
+    config_bundle = self._get_config_bundle('activate')
+    if not config_bundle:
       return None
 
     if not validator.is_non_empty_string(experiment_key):
@@ -277,18 +592,41 @@ class Optimizely(object):
       self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
       return None
 
-    variation_key = self.get_variation(experiment_key, user_id, attributes)
+    if not self._validate_user_inputs(attributes):
+      self.logger.info('Not activating user "%s".' % user_id)
+      return None
+
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    variation_key = self._activate(config_bundle, experiment_key, user_id, attributes)
+    config_bundle.decision_service.save_user_profile()
+    return variation_key
+
+  def _activate(self, config_bundle, experiment_key, user_id, attributes):
+    """ Helper method to bucket the user into an experiment and send the impression event.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      experiment_key: Experiment which needs to be activated.
+      user_id: ID for user.
+      attributes: Dict representing user attributes and values which need to be recorded.
+
+    Returns:
+      Variation key representing the variation the user will be bucketed in.
+      None if user is not in experiment or if experiment is not Running.
+    """
+
+    variation_key = self._get_variation(config_bundle, experiment_key, user_id, attributes)
 
     if not variation_key:
       self.logger.info('Not activating user "%s".' % user_id)
       return None
 
-    experiment = self.config.get_experiment_from_key(experiment_key)
-    variation = self.config.get_variation_from_key(experiment_key, variation_key)
+    experiment = config_bundle.config.get_experiment_from_key(experiment_key)
+    variation = config_bundle.config.get_variation_from_key(experiment_key, variation_key)
 
     # Create and dispatch impression event
     self.logger.info('Activating user "%s" in experiment "%s".' % (user_id, experiment.key))
-    self._send_impression_event(experiment, variation, user_id, attributes)
+    self._send_impression_event(config_bundle, experiment, variation, user_id, attributes)
 
     return variation.key
 
@@ -302,8 +640,8 @@ class Optimizely(object):
       event_tags: Dict representing metadata associated with the event.
     """
 
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('track'))
+    config_bundle = self._get_config_bundle('track')
+    if not config_bundle:
       return
 
     if not validator.is_non_empty_string(event_key):
@@ -317,18 +655,33 @@ class Optimizely(object):
     if not self._validate_user_inputs(attributes, event_tags):
       return
 
-    event = self.config.get_event(event_key)
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    self._track(config_bundle, event_key, user_id, attributes, event_tags)
+    config_bundle.decision_service.save_user_profile()
+
+  def _track(self, config_bundle, event_key, user_id, attributes, event_tags):
+    """ Helper method to send the conversion event for the experiments of an event the user is bucketed into.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      event_key: Event key representing the event which needs to be recorded.
+      user_id: ID for user.
+      attributes: Dict representing visitor attributes and values which need to be recorded.
+      event_tags: Dict representing metadata associated with the event.
+    """
+
+    event = config_bundle.config.get_event(event_key)
     if not event:
       self.logger.info('Not tracking user "%s" for event "%s".' % (user_id, event_key))
       return
 
     # Filter out experiments that are not running or that do not include the user in audience
     # conditions and then determine the decision i.e. the corresponding variation
-    decisions = self._get_decisions(event, user_id, attributes)
+    decisions = self._get_decisions(config_bundle, event, user_id, attributes)
 
     # Create and dispatch conversion event if there are any decisions
     if decisions:
-      conversion_event = self.event_builder.create_conversion_event(
+      conversion_event = config_bundle.event_builder.create_conversion_event(
         event_key, user_id, attributes, event_tags, decisions
       )
       self.logger.info('Tracking event "%s" for user "%s".' % (event_key, user_id))
@@ -358,8 +711,8 @@ class Optimizely(object):
       None if user is not in experiment or if experiment is not Running.
     """
 
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('get_variation'))
+    config_bundle = self._get_config_bundle('get_variation')
+    if not config_bundle:
       return None
 
     if not validator.is_non_empty_string(experiment_key):
@@ -370,7 +723,29 @@ class Optimizely(object):
       self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
       return None
 
-    experiment = self.config.get_experiment_from_key(experiment_key)
+    if not self._validate_user_inputs(attributes):
+      return None
+
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    variation_key = self._get_variation(config_bundle, experiment_key, user_id, attributes)
+    config_bundle.decision_service.save_user_profile()
+    return variation_key
+
+  def _get_variation(self, config_bundle, experiment_key, user_id, attributes):
+    """ Helper method to get the variation where user will be bucketed.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      experiment_key: Experiment for which user variation needs to be determined.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      Variation key representing the variation the user will be bucketed in.
+      None if user is not in experiment or if experiment is not Running.
+    """
+
+    experiment = config_bundle.config.get_experiment_from_key(experiment_key)
 
     if not experiment:
       self.logger.info('Experiment key "%s" is invalid. Not activating user "%s".' % (
@@ -379,15 +754,63 @@ class Optimizely(object):
       ))
       return None
 
-    if not self._validate_user_inputs(attributes):
-      return None
-
-    variation = self.decision_service.get_variation(experiment, user_id, attributes)
+    variation = config_bundle.decision_service.get_variation(experiment, user_id, attributes)
     if variation:
       return variation.key
 
     return None
 
+  def get_variation_many(self, experiment_key, users):
+    """ Gets the variations where many users will be bucketed at once, e.g. for batch jobs.
+
+    Inputs are validated and the experiment is looked up once for the batch, and user profiles are looked up
+    together. No impression event is sent, as with get_variation.
+
+    Args:
+      experiment_key: Experiment for which user variations need to be determined.
+      users: List of tuples of ID for user and dict representing user attributes.
+
+    Returns:
+      List of the variation keys representing the variations the users will be bucketed in, in the order of users.
+      None for users which are invalid or not in the experiment, or for all users if the experiment is not Running.
+      Empty list if users is not a list.
+    """
+
+    if not isinstance(users, (list, tuple)):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('users'))
+      return []
+
+    variation_keys = [None] * len(users)
+    config_bundle = self._get_config_bundle('get_variation_many')
+    if not config_bundle:
+      return variation_keys
+
+    if not validator.is_non_empty_string(experiment_key):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('experiment_key'))
+      return variation_keys
+
+    experiment = config_bundle.config.get_experiment_from_key(experiment_key)
+    if not experiment:
+      self.logger.info('Experiment key "%s" is invalid. Not activating %s users.' % (experiment_key, len(users)))
+      return variation_keys
+
+    user_decision_services = self._bind_users(config_bundle, users)
+    for idx, user_decision_service in enumerate(user_decision_services):
+      if not user_decision_service:
+        continue
+
+      variation = user_decision_service.get_variation(experiment,
+                                                      user_decision_service.user_id,
+                                                      user_decision_service.attributes)
+      if variation:
+        variation_keys[idx] = variation.key
+
+    for user_decision_service in user_decision_services:
+      if user_decision_service:
+        user_decision_service.save_user_profile()
+
+    return variation_keys
+
   def is_feature_enabled(self, feature_key, user_id, attributes=None):
     """ Returns true if the feature is enabled for the given user.
 
@@ -400,8 +823,8 @@ class Optimizely(object):
       True if the feature is enabled for the user. False otherwise.
     """
 
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('is_feature_enabled'))
+    config_bundle = self._get_config_bundle('is_feature_enabled')
+    if not config_bundle:
       return False
 
     if not validator.is_non_empty_string(feature_key):
@@ -415,18 +838,39 @@ class Optimizely(object):
     if not self._validate_user_inputs(attributes):
       return False
 
-    feature = self.config.get_feature_from_key(feature_key)
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    is_enabled = self._is_feature_enabled(config_bundle, feature_key, user_id, attributes)
+    config_bundle.decision_service.save_user_profile()
+    return is_enabled
+
+  def _is_feature_enabled(self, config_bundle, feature_key, user_id, attributes):
+    """ Helper method to determine if the feature is enabled for the given user.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      feature_key: The key of the feature for which we are determining if it is enabled or not for the given user.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      True if the feature is enabled for the user. False otherwise.
+    """
+
+    feature = config_bundle.config.get_feature_from_key(feature_key)
     if not feature:
       return False
 
-    decision = self.decision_service.get_variation_for_feature(feature, user_id, attributes)
+    decision = config_bundle.decision_service.get_variation_for_feature(feature, user_id, attributes)
     if decision.variation:
-      # Send event if Decision came from an experiment.
+      # Send event if Decision came from an experiment, unless it was sent recently.
       if decision.source == decision_service.DECISION_SOURCE_EXPERIMENT:
-        self._send_impression_event(decision.experiment,
-                                    decision.variation,
-                                    user_id,
-                                    attributes)
+        if self._should_send_impression(config_bundle, decision.experiment, decision.variation, user_id, attributes):
+          if not self._send_impression_event(config_bundle,
+                                             decision.experiment,
+                                             decision.variation,
+                                             user_id,
+                                             attributes):
+            self._forget_impression(config_bundle, decision.experiment, decision.variation, user_id)
 
       if decision.variation.featureEnabled:
         self.logger.info('Feature "%s" is enabled for user "%s".' % (feature_key, user_id))
@@ -435,6 +879,61 @@ class Optimizely(object):
     self.logger.info('Feature "%s" is not enabled for user "%s".' % (feature_key, user_id))
     return False
 
+  def is_feature_enabled_many(self, feature_key, users):
+    """ Determines if the feature is enabled for many users at once, e.g. for batch jobs.
+
+    Inputs are validated and the feature is looked up once for the batch, and user profiles are looked up
+    together. Impressions of the users decided by experiments are sent together in a single event.
+
+    Args:
+      feature_key: The key of the feature for which we are determining if it is enabled or not for the users.
+      users: List of tuples of ID for user and dict representing user attributes.
+
+    Returns:
+      List of booleans True if the feature is enabled for the user, in the order of users.
+      False for users which are invalid. Empty list if users is not a list.
+    """
+
+    if not isinstance(users, (list, tuple)):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('users'))
+      return []
+
+    enabled = [False] * len(users)
+    config_bundle = self._get_config_bundle('is_feature_enabled_many')
+    if not config_bundle:
+      return enabled
+
+    if not validator.is_non_empty_string(feature_key):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('feature_key'))
+      return enabled
+
+    feature = config_bundle.config.get_feature_from_key(feature_key)
+    if not feature:
+      return enabled
+
+    user_decision_services = self._bind_users(config_bundle, users)
+    impressions = []
+    for idx, user_decision_service in enumerate(user_decision_services):
+      if not user_decision_service:
+        continue
+
+      user_id = user_decision_service.user_id
+      attributes = user_decision_service.attributes
+      decision = user_decision_service.get_variation_for_feature(feature, user_id, attributes)
+      if decision.variation:
+        if decision.source == decision_service.DECISION_SOURCE_EXPERIMENT:
+          impressions.append((decision.experiment, decision.variation, user_id, attributes))
+        enabled[idx] = bool(decision.variation.featureEnabled)
+
+    for user_decision_service in user_decision_services:
+      if user_decision_service:
+        user_decision_service.save_user_profile()
+
+    self._send_impression_events(config_bundle, impressions)
+
+    self.logger.info('Feature "%s" is enabled for %s of %s users.' % (feature_key, sum(enabled), len(users)))
+    return enabled
+
   def get_enabled_features(self, user_id, attributes=None):
     """ Returns the list of features that are enabled for the user.
 
@@ -447,8 +946,8 @@ class Optimizely(object):
     """
 
     enabled_features = []
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('get_enabled_features'))
+    config_bundle = self._get_config_bundle('get_enabled_features')
+    if not config_bundle:
       return enabled_features
 
     if not isinstance(user_id, string_types):
@@ -458,12 +957,282 @@ class Optimizely(object):
     if not self._validate_user_inputs(attributes):
       return enabled_features
 
-    for feature in self.config.feature_key_map.values():
-      if self.is_feature_enabled(feature.key, user_id, attributes):
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    enabled_features = self._get_enabled_features(config_bundle, user_id, attributes)
+    config_bundle.decision_service.save_user_profile()
+    return enabled_features
+
+  def _get_enabled_features(self, config_bundle, user_id, attributes):
+    """ Helper method to determine the features that are enabled for the user.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      A list of the keys of the features that are enabled for the user.
+    """
+
+    enabled_features = []
+    for feature in config_bundle.config.feature_key_map.values():
+      if self._is_feature_enabled(config_bundle, feature.key, user_id, attributes):
         enabled_features.append(feature.key)
 
     return enabled_features
 
+  def decide_all(self, user_id, attributes=None):
+    """ Decides every feature flag for the user in a single pass.
+
+    Each feature is decided once and the values of all its variables are read for the decision made.
+    Impressions of the features decided by experiments are sent together in a single event.
+
+    Args:
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      decision_bundle.DecisionBundle holding the decisions and variable values of every feature.
+      None if the client or the inputs are invalid.
+    """
+
+    config_bundle = self._get_config_bundle('decide_all')
+    if not config_bundle:
+      return None
+
+    if not isinstance(user_id, string_types):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+      return None
+
+    if not self._validate_user_inputs(attributes):
+      return None
+
+    # Decisions for the same user share the bucketing ID, audience results and user profile
+    user_decision_service = decision_service.UserDecisionService(config_bundle.decision_service, user_id, attributes)
+    impressions = []
+    bundle = self._decide_features(config_bundle, user_decision_service,
+                                   config_bundle.config.feature_key_map.values(), impressions)
+    user_decision_service.save_user_profile()
+    self._send_impression_events(config_bundle, impressions)
+
+    self.logger.debug('Decided %s features for user "%s".' % (len(bundle.feature_decisions), user_id))
+    return bundle
+
+  def _decide_features(self, config_bundle, user_decision_service, features, impressions):
+    """ Helper method to decide the given features for the user a decision service is bound to.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      user_decision_service: UserDecisionService bound to the user.
+      features: Features to decide.
+      impressions: List to which impressions of the features decided by experiments are appended.
+
+    Returns:
+      decision_bundle.DecisionBundle holding the decisions and variable values of the features.
+    """
+
+    config = config_bundle.config
+    user_id = user_decision_service.user_id
+    attributes = user_decision_service.attributes
+
+    feature_decisions = {}
+    for feature in features:
+      decision = user_decision_service.get_variation_for_feature(feature, user_id, attributes)
+      if decision.variation and decision.source == decision_service.DECISION_SOURCE_EXPERIMENT:
+        impressions.append((decision.experiment, decision.variation, user_id, attributes))
+      feature_decisions[feature.key] = decision_bundle.create_feature_decision(config, feature, decision)
+
+    return decision_bundle.create_decision_bundle(config, user_id, feature_decisions)
+
+  def decide_stream(self, users, feature_keys, chunk_size=enums.DecisionStream.DEFAULT_CHUNK_SIZE,
+                    impression_sink=None):
+    """ Lazily decides the given features for a stream of users of unbounded length, e.g. consumed from a queue.
+
+    Users are read and decided in chunks of a fixed size, so memory stays bounded however long the stream is.
+    Each chunk is decided as by get_variation_many, and the impressions of a chunk are sent together in a
+    single event once it is decided. The config is picked up anew for each chunk.
+
+    Args:
+      users: Iterable of tuples of ID for user and dict representing user attributes.
+      feature_keys: List of the keys of the features to decide. Unknown features are left out of the decisions.
+      chunk_size: Optional number of users to decide together.
+      impression_sink: Optional callable to send the impression event of each chunk with,
+                       instead of the event dispatcher.
+
+    Returns:
+      Generator yielding, in the order of users, a decision_bundle.DecisionBundle holding the decisions and
+      variable values of the features for each user. None for users which are invalid or decided while the
+      client is invalid. Nothing is yielded if the features or the chunk size are invalid.
+    """
+
+    if not isinstance(feature_keys, (list, tuple)) or not all(validator.is_non_empty_string(feature_key)
+                                                                for feature_key in feature_keys):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('feature_keys'))
+      return
+
+    if not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size < 1:
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('chunk_size'))
+      return
+
+    users = iter(users)
+    while True:
+      chunk = list(itertools.islice(users, chunk_size))
+      if not chunk:
+        return
+
+      config_bundle = self._get_config_bundle('decide_stream')
+      if not config_bundle:
+        for _ in chunk:
+          yield None
+        continue
+
+      features = [config_bundle.config.feature_key_map[feature_key]
+                  for feature_key in feature_keys if feature_key in config_bundle.config.feature_key_map]
+
+      user_decision_services = self._bind_users(config_bundle, chunk)
+      impressions = []
+      bundles = []
+      for user_decision_service in user_decision_services:
+        if not user_decision_service:
+          bundles.append(None)
+          continue
+
+        bundles.append(self._decide_features(config_bundle, user_decision_service, features, impressions))
+        user_decision_service.save_user_profile()
+
+      self._send_impression_events(config_bundle, impressions, impression_sink)
+      self.logger.debug('Decided %s features for a chunk of %s users.' % (len(features), len(chunk)))
+
+      for bundle in bundles:
+        yield bundle
+
+  def create_decision_token(self, bundle, key):
+    """ Serialize the decisions of a bundle made by decide_all into a compact token signed with the given key,
+    so that other services using the same datafile can reuse them with decide_all_from_token.
+
+    Args:
+      bundle: decision_bundle.DecisionBundle returned by decide_all.
+      key: Secret key, as bytes or string, shared with the services the token is handed to.
+
+    Returns:
+      String token. None if the client or the inputs are invalid or the decisions were made with another
+      datafile revision.
+    """
+
+    config_bundle = self._get_config_bundle('create_decision_token')
+    if not config_bundle:
+      return None
+
+    if not isinstance(bundle, decision_bundle.DecisionBundle):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('bundle'))
+      return None
+
+    if not validator.is_secret_key_valid(key):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('key'))
+      return None
+
+    try:
+      return decision_token.dump(config_bundle.config, bundle, key)
+    except exceptions.InvalidDecisionTokenException as error:
+      self.logger.error(str(error))
+      return None
+
+  def decide_all_from_token(self, token, key, user_id, attributes=None):
+    """ Reuses the decisions serialized into a token by another service for the user, or decides every feature
+    flag for the user as decide_all does if the token is invalid or was issued with another datafile revision.
+    No impression event is sent for reused decisions, as the service deciding them sent it.
+
+    Args:
+      token: String token created by create_decision_token.
+      key: Secret key, as bytes or string, the token was signed with.
+      user_id: ID for user.
+      attributes: Dict representing user attributes, used if deciding again.
+
+    Returns:
+      decision_bundle.DecisionBundle holding the decisions and variable values of every feature.
+      None if the client or the inputs are invalid.
+    """
+
+    config_bundle = self._get_config_bundle('decide_all_from_token')
+    if not config_bundle:
+      return None
+
+    if not isinstance(user_id, string_types):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+      return None
+
+    if not validator.is_secret_key_valid(key):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('key'))
+      return None
+
+    try:
+      bundle = decision_token.load(config_bundle.config, token, key, user_id)
+    except exceptions.InvalidDecisionTokenException as error:
+      self.logger.warning('%s Falling back to local evaluation.' % str(error))
+      return self.decide_all(user_id, attributes)
+
+    self.logger.debug('Reusing decisions of token for user "%s".' % user_id)
+    return bundle
+
+  def get_all_feature_variables(self, feature_key, user_id, attributes=None):
+    """ Returns the values of all variables attached to a feature flag, deciding for the user once.
+
+    Args:
+      feature_key: Key of the feature whose variables' values are being accessed.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      decision_bundle.FeatureVariables mapping variable key to typed value, with accessors checking the type
+      of the variable. None if the client, the inputs or the feature are invalid.
+    """
+
+    config_bundle = self._get_config_bundle('get_all_feature_variables')
+    if not config_bundle:
+      return None
+
+    if not validator.is_non_empty_string(feature_key):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('feature_key'))
+      return None
+
+    if not isinstance(user_id, string_types):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+      return None
+
+    if not self._validate_user_inputs(attributes):
+      return None
+
+    config_bundle = self._bind_user(config_bundle, user_id, attributes)
+    variables = self._get_all_feature_variables(config_bundle, feature_key, user_id, attributes)
+    config_bundle.decision_service.save_user_profile()
+    return variables
+
+  def _get_all_feature_variables(self, config_bundle, feature_key, user_id, attributes):
+    """ Helper method to determine the values of all variables attached to a feature flag for the given user.
+
+    Args:
+      config_bundle: _ConfigBundle the API call runs against.
+      feature_key: Key of the feature whose variables' values are being accessed.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      decision_bundle.FeatureVariables of the feature. None if the feature is invalid.
+    """
+
+    feature_flag = config_bundle.config.get_feature_from_key(feature_key)
+    if not feature_flag:
+      return None
+
+    decision = config_bundle.decision_service.get_variation_for_feature(feature_flag, user_id, attributes)
+    if not decision.variation:
+      self.logger.info(
+        'User "%s" is not in any variation or rollout rule. '
+        'Returning default values for variables of feature flag "%s".' % (user_id, feature_key)
+      )
+
+    return decision_bundle.create_feature_variables(config_bundle.config, feature_flag, decision.variation)
+
   def get_feature_variable_boolean(self, feature_key, variable_key, user_id, attributes=None):
     """ Returns value for a certain boolean variable attached to a feature flag.
 
@@ -540,6 +1309,31 @@ class Optimizely(object):
     variable_type = entities.Variable.Type.STRING
     return self._get_feature_variable_for_type(feature_key, variable_key, variable_type, user_id, attributes)
 
+  def create_user_context(self, user_id, attributes=None):
+    """ Create a context binding the user and attributes to the client, e.g. for the duration of a request.
+    Deciding through the context spares validating the inputs and memoizes results computed for the user.
+
+    Args:
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      user_context.UserContext for the user. None if the client or the inputs are invalid.
+    """
+
+    if not self.is_valid:
+      self.logger.error(enums.Errors.INVALID_DATAFILE.format('create_user_context'))
+      return None
+
+    if not isinstance(user_id, string_types):
+      self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+      return None
+
+    if not self._validate_user_inputs(attributes):
+      return None
+
+    return _user_context.UserContext(self, user_id, attributes)
+
   def set_forced_variation(self, experiment_key, user_id, variation_key):
     """ Force a user into a variation for a given experiment.
 
@@ -553,8 +1347,8 @@ class Optimizely(object):
       A boolean value that indicates if the set completed successfully.
     """
 
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('set_forced_variation'))
+    config_bundle = self._get_config_bundle('set_forced_variation')
+    if not config_bundle:
       return False
 
     if not validator.is_non_empty_string(experiment_key):
@@ -565,7 +1359,7 @@ class Optimizely(object):
       self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
       return False
 
-    return self.config.set_forced_variation(experiment_key, user_id, variation_key)
+    return config_bundle.decision_service.set_forced_variation(experiment_key, user_id, variation_key)
 
   def get_forced_variation(self, experiment_key, user_id):
     """ Gets the forced variation for a given user and experiment.
@@ -578,8 +1372,8 @@ class Optimizely(object):
       The forced variation key. None if no forced variation key.
     """
 
-    if not self.is_valid:
-      self.logger.error(enums.Errors.INVALID_DATAFILE.format('get_forced_variation'))
+    config_bundle = self._get_config_bundle('get_forced_variation')
+    if not config_bundle:
       return None
 
     if not validator.is_non_empty_string(experiment_key):
@@ -590,5 +1384,36 @@ class Optimizely(object):
       self.logger.error(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
       return None
 
-    forced_variation = self.config.get_forced_variation(experiment_key, user_id)
+    forced_variation = config_bundle.decision_service.get_forced_variation(experiment_key, user_id)
     return forced_variation.key if forced_variation else None
+
+  def close(self):
+    """ Stop switching over to the configs published by the config manager, so that the manager does not
+    keep the client alive once it is discarded. The client keeps using the config it holds.
+    Call it before discarding a client created with a config manager which outlives it.
+    """
+
+    if self.config_manager:
+      self.config_manager.remove_config_listener(self._update_config)
+
+  def freeze_for_fork(self):
+    """ Prepare the client to be inherited by worker processes forked from this process.
+
+    The project config is compiled completely and frozen and, on Python 3.7+, every object tracked by
+    the garbage collector is moved to its permanent generation so that collections in the workers do not
+    write to (and thereby copy) the memory pages holding the config. Per-client mutable state, i.e. forced
+    variations kept by the forced variation store and listeners kept by the notification center, stays writable
+    in each worker.
+
+    For best results, disable garbage collection early in the master process, call this right before
+    forking and re-enable garbage collection in each worker.
+    """
+
+    config_bundle = self._get_config_bundle('freeze_for_fork')
+    if not config_bundle:
+      return
+
+    config_bundle.config.materialize()
+    config_bundle.config.freeze()
+    if hasattr(gc, 'freeze'):
+      gc.freeze()
@@ -12,10 +12,13 @@
 # limitations under the License.
 
 import json
+import re
 
 from .helpers import condition as condition_helper
 from .helpers import enums
-from .helpers import validator
+from .helpers import experiment as experiment_helper
+from . import decision_analyzer
+from . import decision_plan
 from . import entities
 from . import exceptions
 
@@ -23,20 +26,60 @@ SUPPORTED_VERSIONS = [enums.DatafileVersions.V2, enums.DatafileVersions.V3, enum
 
 RESERVED_ATTRIBUTE_PREFIX = '$opt_'
 
+AUDIENCE_CONDITION_OPERATORS = (
+  condition_helper.ConditionOperatorTypes.AND,
+  condition_helper.ConditionOperatorTypes.OR,
+  condition_helper.ConditionOperatorTypes.NOT
+)
+
+# Matches members named revision along with their string value. Quotes within strings of JSON are escaped,
+# so that only actual members match.
+_REVISION_MEMBER_REGEX = re.compile(r'(?<!\\)"revision"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def get_datafile_revision(datafile):
+  """ Get the revision of a datafile without parsing all of it.
+
+  Args:
+    datafile: JSON string representing the project.
+
+  Returns:
+    Revision of the datafile. None if the datafile is not a valid JSON object.
+  """
+
+  try:
+    if isinstance(datafile, bytes):
+      datafile = datafile.decode('utf-8')
+
+    revision_members = _REVISION_MEMBER_REGEX.findall(datafile)
+    if len(revision_members) == 1:
+      return json.loads(revision_members[0])
+
+    # The datafile has no revision or other members named revision, which only parsing it tells apart.
+    return json.loads(datafile).get('revision')
+  except (AttributeError, TypeError, ValueError):
+    return None
+
 
 class ProjectConfig(object):
   """ Representation of the Optimizely project config. """
 
-  def __init__(self, datafile, logger, error_handler):
+  def __init__(self, datafile, logger, error_handler, previous_config=None, lazy=False):
     """ ProjectConfig init method to load and set project config data.
 
     Args:
-      datafile: JSON string representing the project.
+      datafile: JSON string representing the project, or the dict parsed from it.
       logger: Provides a log message to send log messages to.
       error_handler: Provides a handle_error method to handle exceptions.
+      previous_config: Optional ProjectConfig built from an earlier revision of the datafile.
+                       Entities which are unchanged in the given datafile are shared with it,
+                       along with everything compiled from them, instead of being rebuilt.
+      lazy: Optional boolean param which allows compiling only what decisions can make use of upfront,
+            i.e. running experiments, experiments of rollouts and the audiences they reference.
+            Everything else is compiled once asked for. By default everything is compiled upfront.
     """
 
-    config = json.loads(datafile)
+    config = datafile if isinstance(datafile, dict) else json.loads(datafile)
     self.logger = logger
     self.error_handler = error_handler
     self.version = config.get('version')
@@ -59,28 +102,42 @@ class ProjectConfig(object):
     self.anonymize_ip = config.get('anonymizeIP', False)
     self.bot_filtering = config.get('botFiltering', None)
 
-    # Utility maps for quick lookup
-    self.group_id_map = self._generate_key_map(self.groups, 'id', entities.Group)
-    self.experiment_key_map = self._generate_key_map(self.experiments, 'key', entities.Experiment)
-    self.event_key_map = self._generate_key_map(self.events, 'key', entities.Event)
-    self.attribute_key_map = self._generate_key_map(self.attributes, 'key', entities.Attribute)
-
-    self.audience_id_map = self._generate_key_map(self.audiences, 'id', entities.Audience)
-
     # Conditions of audiences in typedAudiences are not expected
     # to be string-encoded as they are in audiences.
     for typed_audience in self.typed_audiences:
       typed_audience['conditions'] = json.dumps(typed_audience['conditions'])
-    typed_audience_id_map = self._generate_key_map(self.typed_audiences, 'id', entities.Audience)
+
+    reusable = self._get_reusable_entities(previous_config) if previous_config else {}
+
+    # Utility maps for quick lookup
+    self.group_id_map = self._generate_key_map(self.groups, 'id', entities.Group, reusable.get('groups'))
+    self.experiment_key_map = self._generate_key_map(self.experiments, 'key', entities.Experiment,
+                                                     reusable.get('experiments'))
+    self.event_key_map = self._generate_key_map(self.events, 'key', entities.Event, reusable.get('events'))
+    self.attribute_key_map = self._generate_key_map(self.attributes, 'key', entities.Attribute,
+                                                    reusable.get('attributes'))
+
+    self.audience_id_map = self._generate_key_map(self.audiences, 'id', entities.Audience, reusable.get('audiences'))
+    typed_audience_id_map = self._generate_key_map(self.typed_audiences, 'id', entities.Audience,
+                                                   reusable.get('audiences'))
     self.audience_id_map.update(typed_audience_id_map)
 
-    self.rollout_id_map = self._generate_key_map(self.rollouts, 'id', entities.Layer)
-    for layer in self.rollout_id_map.values():
-      for experiment in layer.experiments:
-        self.experiment_key_map[experiment['key']] = entities.Experiment(**experiment)
+    self.rollout_id_map = self._generate_key_map(self.rollouts, 'id', entities.Layer, reusable.get('rollouts'))
+    rollout_experiment_key_map = self._generate_key_map(
+      [experiment for layer in self.rollout_id_map.values() for experiment in layer.experiments],
+      'key', entities.Experiment, reusable.get('rollout_experiments')
+    )
+    self.experiment_key_map.update(rollout_experiment_key_map)
 
-    self.audience_id_map = self._deserialize_audience(self.audience_id_map)
     for group in self.group_id_map.values():
+      if previous_config and previous_config.group_id_map.get(group.id) is group:
+        # Experiments of an unchanged group have already been assigned to it.
+        self.experiment_key_map.update(
+          (experiment['key'], previous_config.experiment_key_map[experiment['key']])
+          for experiment in group.experiments
+        )
+        continue
+
       experiments_in_group_key_map = self._generate_key_map(group.experiments, 'key', entities.Experiment)
       for experiment in experiments_in_group_key_map.values():
         experiment.__dict__.update({
@@ -93,20 +150,51 @@ class ProjectConfig(object):
     self.variation_key_map = {}
     self.variation_id_map = {}
     self.variation_variable_usage_map = {}
+    # Experiments whose variations are compiled once asked for, by key. Only used in lazy mode.
+    self._uncompiled_experiment_map = {}
+    referenced_audience_ids = set()
     for experiment in self.experiment_key_map.values():
       self.experiment_id_map[experiment.id] = experiment
-      self.variation_key_map[experiment.key] = self._generate_key_map(
-        experiment.variations, 'key', entities.Variation
+      if previous_config and previous_config.experiment_key_map.get(experiment.key) is experiment and \
+         experiment.key in previous_config.variation_key_map:
+        self.variation_key_map[experiment.key] = previous_config.variation_key_map[experiment.key]
+        self.variation_id_map[experiment.key] = previous_config.variation_id_map[experiment.key]
+        for variation_id in self.variation_id_map[experiment.key]:
+          self.variation_variable_usage_map[variation_id] = previous_config.variation_variable_usage_map[variation_id]
+      elif lazy and not experiment_helper.is_experiment_running(experiment) and \
+              experiment.key not in rollout_experiment_key_map:
+        self._uncompiled_experiment_map[experiment.key] = experiment
+        continue
+      else:
+        self._compile_experiment(experiment)
+
+      if lazy:
+        referenced_audience_ids.update(experiment.audienceIds)
+        referenced_audience_ids.update(self._get_audience_ids_in_conditions(experiment.audienceConditions))
+
+    reused_audiences = reusable.get('audiences') or {}
+    audiences_to_deserialize = {}
+    for audience_id, audience in self.audience_id_map.items():
+      if reused_audiences.get(audience_id, (None, None))[1] is audience:
+        continue
+      if not lazy or audience_id in referenced_audience_ids:
+        audiences_to_deserialize[audience_id] = audience
+    self._deserialize_audience(audiences_to_deserialize)
+
+    # Features are compiled using the experiments they reference and can only be reused if those are unchanged.
+    reusable_features = reusable.get('features')
+    if reusable_features:
+      reusable_features = dict(
+        (feature_key, (feature_dict, feature)) for feature_key, (feature_dict, feature) in reusable_features.items()
+        if all(self.experiment_id_map.get(experiment_id) is previous_config.experiment_id_map.get(experiment_id)
+               for experiment_id in feature_dict.get('experimentIds', []))
       )
-      self.variation_id_map[experiment.key] = {}
-      for variation in self.variation_key_map.get(experiment.key).values():
-        self.variation_id_map[experiment.key][variation.id] = variation
-        self.variation_variable_usage_map[variation.id] = self._generate_key_map(
-          variation.variables, 'id', entities.Variation.VariableUsage
-        )
 
-    self.feature_key_map = self._generate_key_map(self.feature_flags, 'key', entities.FeatureFlag)
+    self.feature_key_map = self._generate_key_map(self.feature_flags, 'key', entities.FeatureFlag, reusable_features)
     for feature in self.feature_key_map.values():
+      if reusable_features and reusable_features.get(feature.key, (None, None))[1] is feature:
+        continue
+
       feature.variables = self._generate_key_map(feature.variables, 'key', entities.Variable)
 
       # Check if any of the experiments are in a group and add the group id for faster bucketing later on
@@ -117,20 +205,282 @@ class ProjectConfig(object):
           # Experiments in feature can only belong to one mutex group
           break
 
-    # Map of user IDs to another map of experiments to variations.
-    # This contains all the forced variations set by the user
-    # by calling set_forced_variation (it is not the same as the
-    # whitelisting forcedVariations data structure).
-    self.forced_variation_map = {}
+    # Values of feature variables, type-cast upfront so that invalid values are reported once.
+    # Maps tuple of variation ID and variable ID to the value, with default values filled in.
+    self.variable_value_map = {}
+    self.variable_default_value_map = {}
+    for feature in self.feature_key_map.values():
+      is_feature_reused = bool(reusable_features) and reusable_features.get(feature.key, (None, None))[1] is feature
+      self._build_variable_values(feature, previous_config if is_feature_reused else None)
+
+    self.feature_plan_map = dict(
+      (feature.key, decision_plan.compile_feature(self, feature)) for feature in self.feature_key_map.values()
+    )
+    self.rollout_plan_map = dict(
+      (rollout.id, decision_plan.compile_rollout(self, rollout)) for rollout in self.rollout_id_map.values()
+    )
+
+    # Running experiments of each event by event key, so that tracking an event only decides for those.
+    self.event_running_experiments_map = dict(
+      (event.key, self._get_running_experiments(event.experimentIds)) for event in self.event_key_map.values()
+    )
+
+    self.decision_analysis = decision_analyzer.DecisionAnalysis(self)
+    if self.decision_analysis.feature_decisions:
+      self.logger.debug('Decisions of %s of %s features are the same for every user.' % (
+        len(self.decision_analysis.feature_decisions),
+        len(self.feature_key_map)
+      ))
+
+    if previous_config:
+      self.logger.debug('Built config for revision "%s" from revision "%s", reusing %s of %s experiments.' % (
+        self.revision,
+        previous_config.revision,
+        sum(1 for key, experiment in self.experiment_key_map.items()
+            if previous_config.experiment_key_map.get(key) is experiment),
+        len(self.experiment_key_map)
+      ))
+
+  def __setattr__(self, name, value):
+    if self.__dict__.get('_frozen'):
+      raise AttributeError('Project config is frozen. Can not set "%s".' % name)
+
+    object.__setattr__(self, name, value)
+
+  def __getstate__(self):
+    """ Get state to be pickled. Logger and error handler belong to the process and are not serialized. """
+
+    state = self.__dict__.copy()
+    state['logger'] = None
+    state['error_handler'] = None
+    state.pop('_frozen', None)
+    state.pop('_source_config', None)
+    return state
+
+  def share(self, logger, error_handler):
+    """ Get a config sharing all data with this one, but using the given logger and error handler.
+
+    No data is copied, so the shared data must be treated as read-only by both configs.
+
+    Args:
+      logger: Provides a log message to send log messages to.
+      error_handler: Provides a handle_error method to handle exceptions.
+
+    Returns:
+      ProjectConfig sharing data with this config.
+    """
+
+    shared_config = object.__new__(self.__class__)
+    shared_config.__dict__.update(self.__dict__)
+    shared_config.__dict__.pop('_frozen', None)
+    shared_config.__dict__.update({
+      'logger': logger,
+      'error_handler': error_handler,
+      # Keeps the config the data was built for alive as long as the data is used.
+      '_source_config': self.__dict__.get('_source_config', self)
+    })
+    return shared_config
+
+  def freeze(self):
+    """ Make the config read-only.
+
+    A frozen config rejects attribute assignment, which makes it safe to share between clients.
+    Call materialize first if it is to be shared with processes forked from this one.
+    """
+
+    self._frozen = True
+
+  def _get_running_experiments(self, experiment_ids):
+    """ Helper method to get the experiments with the given IDs which are running.
+
+    Args:
+      experiment_ids: List of experiment IDs. IDs of unknown experiments are ignored.
+
+    Returns:
+      List of the running experiments, in the order of the IDs.
+    """
+
+    experiments = [self.experiment_id_map.get(experiment_id) for experiment_id in experiment_ids]
+    return [experiment for experiment in experiments
+            if experiment and experiment_helper.is_experiment_running(experiment)]
+
+  def _build_variable_values(self, feature, previous_config=None):
+    """ Helper method to type-cast the values of the variables of a feature for every variation
+    of the experiments and rollout rules of the feature.
+
+    Args:
+      feature: Feature whose variable values are to be built.
+      previous_config: Optional ProjectConfig to reuse values from for experiments which are unchanged in it.
+                       Only to be given if the feature itself is unchanged.
+    """
+
+    experiments = [self.experiment_id_map[experiment_id] for experiment_id in feature.experimentIds]
+    rollout = self.rollout_id_map.get(feature.rolloutId)
+    if rollout:
+      experiments.extend(self.experiment_id_map[experiment['id']] for experiment in rollout.experiments)
+
+    for variable in feature.variables.values():
+      if previous_config:
+        if variable.id in previous_config.variable_default_value_map:
+          self.variable_default_value_map[variable.id] = previous_config.variable_default_value_map[variable.id]
+      else:
+        self._cast_variable_value(self.variable_default_value_map, variable.id, variable, variable.defaultValue)
+
+    for experiment in experiments:
+      is_experiment_reused = previous_config and previous_config.experiment_id_map.get(experiment.id) is experiment
+      for variation in experiment.variations:
+        usage_values = dict((usage['id'], usage['value']) for usage in variation.get('variables', []))
+        for variable in feature.variables.values():
+          key = (variation['id'], variable.id)
+          if is_experiment_reused:
+            if key in previous_config.variable_value_map:
+              self.variable_value_map[key] = previous_config.variable_value_map[key]
+          elif variable.id in usage_values:
+            self._cast_variable_value(self.variable_value_map, key, variable, usage_values[variable.id])
+          elif variable.id in self.variable_default_value_map:
+            self.variable_value_map[key] = self.variable_default_value_map[variable.id]
+
+  def _cast_variable_value(self, value_map, key, variable, value):
+    """ Helper method to type-cast a variable value into the given map. Values which can not be cast are
+    logged and left out of the map.
+
+    Args:
+      value_map: Dict to put the value into.
+      key: Key to put the value at.
+      variable: Variable the value is for.
+      value: Value in string form as it was parsed from datafile.
+    """
+
+    try:
+      value_map[key] = self.get_typecast_value(value, variable.type)
+    except (TypeError, ValueError):
+      self.logger.error('Unable to cast value "%s" of variable "%s" to type "%s".' % (
+        value,
+        variable.key,
+        variable.type
+      ))
+
+  def materialize(self):
+    """ Compile everything left to be compiled once asked for by a config built in lazy mode. """
+
+    for experiment_key in list(self._uncompiled_experiment_map.keys()):
+      self._materialize_experiment(experiment_key)
+
+    self._deserialize_audience(dict(
+      (audience_id, audience) for audience_id, audience in self.audience_id_map.items()
+      if audience.conditionList is None
+    ))
+
+  def _compile_experiment(self, experiment):
+    """ Helper method to build the maps of the variations of the given experiment.
+
+    Args:
+      experiment: Experiment whose variations are to be compiled.
+    """
+
+    variation_key_map = self._generate_key_map(experiment.variations, 'key', entities.Variation)
+    variation_id_map = {}
+    for variation in variation_key_map.values():
+      variation_id_map[variation.id] = variation
+      self.variation_variable_usage_map[variation.id] = self._generate_key_map(
+        variation.variables, 'id', entities.Variation.VariableUsage
+      )
+
+    # The key map is published last, so that concurrent readers finding it find everything else.
+    self.variation_id_map[experiment.key] = variation_id_map
+    self.variation_key_map[experiment.key] = variation_key_map
+
+  def _materialize_experiment(self, experiment_key):
+    """ Helper method to compile an experiment which was left uncompiled in lazy mode.
+
+    Args:
+      experiment_key: Key of the experiment.
+    """
+
+    experiment = self._uncompiled_experiment_map.get(experiment_key)
+    if experiment:
+      self._compile_experiment(experiment)
+      self._uncompiled_experiment_map.pop(experiment_key, None)
+
+  @staticmethod
+  def _get_audience_ids_in_conditions(audience_conditions):
+    """ Helper method to collect the audience IDs in audience conditions.
+
+    Args:
+      audience_conditions: Optional list representing a tree of operators and audience IDs.
+
+    Returns:
+      List of audience IDs.
+    """
+
+    if not isinstance(audience_conditions, list):
+      return [audience_conditions] if audience_conditions is not None else []
+
+    audience_ids = []
+    for condition in audience_conditions:
+      if isinstance(condition, list):
+        audience_ids.extend(ProjectConfig._get_audience_ids_in_conditions(condition))
+      elif condition not in AUDIENCE_CONDITION_OPERATORS:
+        audience_ids.append(condition)
+    return audience_ids
+
+  def is_frozen(self):
+    """ Check if the config is frozen.
+
+    Returns:
+      Boolean representing if the config is read-only.
+    """
+
+    return self.__dict__.get('_frozen', False)
+
+  @staticmethod
+  def _get_reusable_entities(previous_config):
+    """ Helper method to collect entities of a previous config along with the dicts they were built from.
+
+    Args:
+      previous_config: ProjectConfig built from an earlier revision of the datafile.
+
+    Returns:
+      Dict mapping entity type to a dict mapping key to a tuple of datafile dict and entity.
+    """
+
+    def index(entity_list, key, entity_map, is_experiment=False):
+      reusable_entities = {}
+      for obj in entity_list:
+        entity = entity_map.get(obj[key])
+        if entity is None:
+          continue
+        # Experiments of all kinds share a map, so make sure the entity is the one built from this dict.
+        if is_experiment and (entity.id != obj['id'] or entity.groupId is not None):
+          continue
+        reusable_entities[obj[key]] = (obj, entity)
+      return reusable_entities
+
+    return {
+      'groups': index(previous_config.groups, 'id', previous_config.group_id_map),
+      'experiments': index(previous_config.experiments, 'key', previous_config.experiment_key_map, True),
+      'events': index(previous_config.events, 'key', previous_config.event_key_map),
+      'attributes': index(previous_config.attributes, 'key', previous_config.attribute_key_map),
+      'audiences': index(previous_config.audiences + previous_config.typed_audiences, 'id',
+                         previous_config.audience_id_map),
+      'rollouts': index(previous_config.rollouts, 'id', previous_config.rollout_id_map),
+      'rollout_experiments': index(
+        [experiment for layer in previous_config.rollouts for experiment in layer['experiments']],
+        'key', previous_config.experiment_key_map, True
+      ),
+      'features': index(previous_config.feature_flags, 'key', previous_config.feature_key_map)
+    }
 
   @staticmethod
-  def _generate_key_map(entity_list, key, entity_class):
+  def _generate_key_map(entity_list, key, entity_class, reusable_entities=None):
     """ Helper method to generate map from key to entity object for given list of dicts.
 
     Args:
       entity_list: List consisting of dict.
       key: Key in each dict which will be key in the map.
       entity_class: Class representing the entity.
+      reusable_entities: Optional dict mapping key to a tuple of dict and entity built from it.
+                         The entity is reused if its dict is equal to the one in entity_list.
 
     Returns:
       Map mapping key to entity object.
@@ -138,6 +488,12 @@ class ProjectConfig(object):
 
     key_map = {}
     for obj in entity_list:
+      if reusable_entities:
+        reusable_entity = reusable_entities.get(obj[key])
+        if reusable_entity and reusable_entity[0] == obj:
+          key_map[obj[key]] = reusable_entity[1]
+          continue
+
       key_map[obj[key]] = entity_class(**obj)
 
     return key_map
@@ -287,6 +643,8 @@ class ProjectConfig(object):
 
     audience = self.audience_id_map.get(audience_id)
     if audience:
+      if audience.conditionList is None:
+        self._deserialize_audience({audience_id: audience})
       return audience
 
     self.logger.error('Audience ID "%s" is not in datafile.' % audience_id)
@@ -303,6 +661,9 @@ class ProjectConfig(object):
       Object representing the variation.
     """
 
+    if experiment_key in self._uncompiled_experiment_map:
+      self._materialize_experiment(experiment_key)
+
     variation_map = self.variation_key_map.get(experiment_key)
 
     if variation_map:
@@ -329,6 +690,9 @@ class ProjectConfig(object):
       Object representing the variation.
     """
 
+    if experiment_key in self._uncompiled_experiment_map:
+      self._materialize_experiment(experiment_key)
+
     variation_map = self.variation_id_map.get(experiment_key)
 
     if variation_map:
@@ -363,6 +727,18 @@ class ProjectConfig(object):
     self.error_handler.handle_error(exceptions.InvalidEventException(enums.Errors.INVALID_EVENT_KEY_ERROR))
     return None
 
+  def get_running_experiments_for_event(self, event):
+    """ Get the running experiments the given event is attached to.
+
+    Args:
+      event: Event for which experiments are to be determined.
+
+    Returns:
+      List of the running experiments of the event.
+    """
+
+    return self.event_running_experiments_map.get(event.key, [])
+
   def get_attribute_id(self, attribute_key):
     """ Get attribute ID for the provided attribute key.
 
@@ -468,6 +844,22 @@ class ProjectConfig(object):
 
     return variable_value
 
+  def get_typed_variable_value(self, variable, variation=None):
+    """ Get the value of the variable for the given variation, as type-cast when the config was built.
+
+    Args:
+      variable: The Variable for which we are getting the value.
+      variation: Optional Variation for which we are getting the value. If not given, the default value is returned.
+
+    Returns:
+      The typed variable value or None if the value could not be cast to the type of the variable.
+    """
+
+    if variation:
+      return self.variable_value_map.get((variation.id, variable.id))
+
+    return self.variable_default_value_map.get(variable.id)
+
   def get_variable_for_feature(self, feature_key, variable_key):
     """ Get the variable with the given variable key for the given feature.
 
@@ -489,109 +881,6 @@ class ProjectConfig(object):
 
     return feature.variables.get(variable_key)
 
-  def set_forced_variation(self, experiment_key, user_id, variation_key):
-    """ Sets users to a map of experiments to forced variations.
-
-      Args:
-        experiment_key: Key for experiment.
-        user_id: The user ID.
-        variation_key: Key for variation. If None, then clear the existing experiment-to-variation mapping.
-
-      Returns:
-        A boolean value that indicates if the set completed successfully.
-    """
-    experiment = self.get_experiment_from_key(experiment_key)
-    if not experiment:
-      # The invalid experiment key will be logged inside this call.
-      return False
-
-    experiment_id = experiment.id
-    if variation_key is None:
-      if user_id in self.forced_variation_map:
-        experiment_to_variation_map = self.forced_variation_map.get(user_id)
-        if experiment_id in experiment_to_variation_map:
-          del(self.forced_variation_map[user_id][experiment_id])
-          self.logger.debug('Variation mapped to experiment "%s" has been removed for user "%s".' % (
-            experiment_key,
-            user_id
-          ))
-        else:
-          self.logger.debug('Nothing to remove. Variation mapped to experiment "%s" for user "%s" does not exist.' % (
-            experiment_key,
-            user_id
-          ))
-      else:
-        self.logger.debug('Nothing to remove. User "%s" does not exist in the forced variation map.' % user_id)
-      return True
-
-    if not validator.is_non_empty_string(variation_key):
-      self.logger.debug('Variation key is invalid.')
-      return False
-
-    forced_variation = self.get_variation_from_key(experiment_key, variation_key)
-    if not forced_variation:
-      # The invalid variation key will be logged inside this call.
-      return False
-
-    variation_id = forced_variation.id
-
-    if user_id not in self.forced_variation_map:
-      self.forced_variation_map[user_id] = {experiment_id: variation_id}
-    else:
-      self.forced_variation_map[user_id][experiment_id] = variation_id
-
-    self.logger.debug('Set variation "%s" for experiment "%s" and user "%s" in the forced variation map.' % (
-      variation_id,
-      experiment_id,
-      user_id
-    ))
-    return True
-
-  def get_forced_variation(self, experiment_key, user_id):
-    """ Gets the forced variation key for the given user and experiment.
-
-      Args:
-        experiment_key: Key for experiment.
-        user_id: The user ID.
-
-      Returns:
-        The variation which the given user and experiment should be forced into.
-    """
-
-    if user_id not in self.forced_variation_map:
-      self.logger.debug('User "%s" is not in the forced variation map.' % user_id)
-      return None
-
-    experiment = self.get_experiment_from_key(experiment_key)
-    if not experiment:
-      # The invalid experiment key will be logged inside this call.
-      return None
-
-    experiment_to_variation_map = self.forced_variation_map.get(user_id)
-
-    if not experiment_to_variation_map:
-      self.logger.debug('No experiment "%s" mapped to user "%s" in the forced variation map.' % (
-        experiment_key,
-        user_id
-      ))
-      return None
-
-    variation_id = experiment_to_variation_map.get(experiment.id)
-    if variation_id is None:
-      self.logger.debug(
-        'No variation mapped to experiment "%s" in the forced variation map.' % experiment_key
-      )
-      return None
-
-    variation = self.get_variation_from_id(experiment_key, variation_id)
-
-    self.logger.debug('Variation "%s" is mapped to experiment "%s" and user "%s" in the forced variation map' % (
-      variation.key,
-      experiment_key,
-      user_id
-    ))
-    return variation
-
   def get_anonymize_ip_value(self):
     """ Gets the anonymize IP value.
 
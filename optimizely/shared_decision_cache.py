@@ -0,0 +1,365 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import namedtuple
+
+try:
+  from multiprocessing import resource_tracker
+  from multiprocessing import shared_memory
+except ImportError:
+  # Shared memory is only available from Python 3.8 on.
+  resource_tracker = shared_memory = None
+
+from . import decision_service
+from .helpers import enums
+
+SHARED_CACHE_MAGIC = b'OPTDCSH1'
+# Number of slots probed for a key, starting at the slot the key hashes to.
+MAX_PROBES = 4
+
+# Header layout: magic, number of slots.
+_HEADER = struct.Struct('<8sI')
+# Record layout: key digest, tag of the account, project and revision of the config,
+# experiment index, variation index, decision source, time saved at.
+# Indexes are -1 for no experiment or variation. Each record is followed by the CRC32 checksum of its bytes.
+_RECORD = struct.Struct('<16sQiiBd')
+_CHECKSUM = struct.Struct('<I')
+_SLOT_SIZE = _RECORD.size + _CHECKSUM.size
+
+_DECISION_SOURCES = (decision_service.DECISION_SOURCE_EXPERIMENT, decision_service.DECISION_SOURCE_ROLLOUT)
+
+SharedKey = namedtuple('SharedKey', 'config digest revision_tag')
+
+# From Python 3.13 on, blocks can be opened without being tracked by the resource tracker of multiprocessing.
+_CAN_DISABLE_TRACKING = sys.version_info >= (3, 13)
+# Before that, blocks opened are registered with it on POSIX systems.
+_IS_TRACKED = not _CAN_DISABLE_TRACKING and os.name == 'posix'
+
+
+def is_supported():
+  """ Determine if shared memory decision caches can be used with this Python version.
+
+  Returns:
+    Boolean True if multiprocessing.shared_memory is available. False otherwise.
+  """
+
+  return shared_memory is not None
+
+
+def _get_digest(value):
+  """ Helper method to hash a string the same way in every process. """
+
+  return hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+
+
+def _open_block(name, create, size=0):
+  """ Helper method to open a shared memory block without it being tracked by the resource tracker of
+  multiprocessing, which unlinks the blocks a process opened when it exits, even if it only attached to them. """
+
+  if _CAN_DISABLE_TRACKING:
+    return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+
+  shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+  if _IS_TRACKED:
+    resource_tracker.unregister(shm._name, 'shared_memory')
+  return shm
+
+
+class _ConfigIndex(object):
+  """ Positions of the experiments and variations of a project config, which are the same in every process
+  using the same datafile revision. """
+
+  def __init__(self, config):
+    self.experiment_ids = sorted(config.experiment_id_map.keys())
+    self.experiment_indexes = dict((experiment_id, idx) for idx, experiment_id in enumerate(self.experiment_ids))
+
+
+class SharedMemoryDecisionCache(object):
+  """ Class caching the decisions made for users in shared memory, so that all worker processes
+  of a deployment use and warm the same cache. It provides the methods of decision_cache.DecisionCache.
+
+  Decisions are kept in a fixed-size open-addressing hash table of records holding the hash of the
+  cache key and the positions of the experiment and variation decided on, tagged with the account, project
+  and revision of the config.
+  Records are written without locking. Each carries a checksum, so that records being written concurrently
+  are ignored rather than misread. Once the slots a key may be kept in are taken, the record in the slot the
+  key hashes to is overwritten.
+
+  One process creates the cache and others attach to it by name, or inherit it when forked. Instances can be
+  pickled to be handed to worker processes. The block is not unlinked when processes exit, so the creating
+  process is responsible for unlinking it.
+  Metrics other than the number of entries are counted per process.
+  """
+
+  def __init__(self,
+               name=None,
+               capacity=enums.DecisionCache.DEFAULT_CAPACITY,
+               timeout=enums.DecisionCache.DEFAULT_TIMEOUT,
+               create=True):
+    """ SharedMemoryDecisionCache init method.
+
+    Args:
+      name: Optional name of the shared memory block. By default a unique name is picked when creating it.
+      capacity: Optional number of slots, i.e. maximum number of decisions to cache, when creating it.
+      timeout: Optional number of seconds after which a decision expires. None for decisions which do not expire.
+      create: Optional boolean param which allows attaching to the existing block of the given name instead
+              of creating it. By default a new block is created.
+
+    Raises:
+      RuntimeError: If shared memory is not available with this Python version.
+      ValueError: If the block attached to is not a decision cache.
+    """
+
+    if not is_supported():
+      raise RuntimeError('Shared memory decision caches require Python 3.8 or later.')
+
+    self.timeout = timeout
+    if create:
+      self._shm = _open_block(name, True, _HEADER.size + capacity * _SLOT_SIZE)
+      _HEADER.pack_into(self._shm.buf, 0, SHARED_CACHE_MAGIC, capacity)
+    else:
+      self._shm = _open_block(name, False)
+      magic, capacity = _HEADER.unpack_from(self._shm.buf, 0)
+      if magic != SHARED_CACHE_MAGIC or self._shm.size < _HEADER.size + capacity * _SLOT_SIZE:
+        self._shm.close()
+        raise ValueError('Shared memory block "%s" is not a decision cache.' % name)
+
+    self.name = self._shm.name
+    self.capacity = capacity
+    self._config_indexes = weakref.WeakKeyDictionary()
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+
+  def __getstate__(self):
+    return {'name': self.name, 'timeout': self.timeout}
+
+  def __setstate__(self, state):
+    self.__init__(name=state['name'], timeout=state['timeout'], create=False)
+
+  def close(self):
+    """ Detach from the shared memory block. """
+
+    self._shm.close()
+
+  def unlink(self):
+    """ Destroy the shared memory block once all processes detached from it. """
+
+    if _IS_TRACKED:
+      # SharedMemory.unlink unregisters the block from the resource tracker, which it was removed from on opening.
+      resource_tracker.register(self._shm._name, 'shared_memory')
+    self._shm.unlink()
+
+  def get_key(self, config, kind, entity_key, user_id, attributes):
+    """ Get the key to cache the decision for a user with the given attributes under.
+
+    Args:
+      config: ProjectConfig the decision is made with.
+      kind: decision_cache.KIND_EXPERIMENT or decision_cache.KIND_FEATURE.
+      entity_key: Key of the experiment or feature.
+      user_id: ID for user.
+      attributes: Dict representing user attributes.
+
+    Returns:
+      SharedKey. None if the decision cannot be cached.
+    """
+
+    # Attributes are sorted by key and typed, as e.g. True and 1 may not match the same audience conditions.
+    attributes = sorted([key, type(value).__name__, value] for key, value in (attributes or {}).items())
+    try:
+      canonical_key = json.dumps([config.account_id, config.project_id, config.revision, kind, entity_key, user_id,
+                                  attributes])
+    except (TypeError, ValueError):
+      return None
+
+    # Records are decoded against the config looking them up, so they are tagged with its account and project too.
+    config_identity = json.dumps([config.account_id, config.project_id, config.revision])
+    revision_tag = struct.unpack('<Q', _get_digest(config_identity)[:8])[0]
+    return SharedKey(config, _get_digest(canonical_key), revision_tag)
+
+  def lookup(self, key):
+    """ Get the decision cached under the given key.
+
+    Args:
+      key: SharedKey as returned by get_key.
+
+    Returns:
+      Decision cached. None if there is none.
+    """
+
+    decision = None
+    for offset in self._get_slot_offsets(key.digest):
+      record = self._read_record(offset)
+      if record and record[0] == key.digest:
+        if record[1] == key.revision_tag and not self._is_expired(record):
+          decision = self._decode_decision(key.config, record)
+        break
+
+    with self._lock:
+      if decision is None:
+        self._misses += 1
+      else:
+        self._hits += 1
+
+    return decision
+
+  def save(self, key, decision):
+    """ Cache a decision under the given key.
+
+    Args:
+      key: SharedKey as returned by get_key.
+      decision: Decision to cache.
+    """
+
+    encoded_decision = self._encode_decision(key.config, decision)
+    if encoded_decision is None:
+      return
+
+    offsets = self._get_slot_offsets(key.digest)
+    target_offset = None
+    for offset in offsets:
+      record = self._read_record(offset)
+      if not record or record[0] == key.digest or record[1] != key.revision_tag or self._is_expired(record):
+        target_offset = offset
+        break
+
+    if target_offset is None:
+      target_offset = offsets[0]
+      with self._lock:
+        self._evictions += 1
+
+    data = _RECORD.pack(key.digest, key.revision_tag, encoded_decision[0], encoded_decision[1],
+                        encoded_decision[2], time.time())
+    self._shm.buf[target_offset:target_offset + _SLOT_SIZE] = data + _CHECKSUM.pack(zlib.crc32(data) & 0xffffffff)
+
+  def reset(self):
+    """ Remove all cached decisions. Metrics are kept. """
+
+    self._shm.buf[_HEADER.size:_HEADER.size + self.capacity * _SLOT_SIZE] = bytes(self.capacity * _SLOT_SIZE)
+
+  def get_metrics(self):
+    """ Get metrics of the decisions cached.
+
+    Returns:
+      Dict with the number of decisions cached by all processes which have not expired, and the number of hits,
+      misses and evictions so far and the ratio of hits to lookups in this process.
+    """
+
+    entries = 0
+    for slot in range(self.capacity):
+      record = self._read_record(_HEADER.size + slot * _SLOT_SIZE)
+      if record and not self._is_expired(record):
+        entries += 1
+
+    with self._lock:
+      lookups = self._hits + self._misses
+      return {
+        'entries': entries,
+        'hits': self._hits,
+        'misses': self._misses,
+        'evictions': self._evictions,
+        'hit_ratio': float(self._hits) / lookups if lookups else 0.0
+      }
+
+  def _get_slot_offsets(self, digest):
+    """ Helper method to get the offsets of the slots a key may be kept in, in probing order. """
+
+    slot = struct.unpack_from('<Q', digest)[0] % self.capacity
+    return [_HEADER.size + ((slot + probe) % self.capacity) * _SLOT_SIZE
+            for probe in range(min(MAX_PROBES, self.capacity))]
+
+  def _read_record(self, offset):
+    """ Helper method to read the record at the given offset.
+
+    Returns:
+      Tuple of record fields. None if the slot is empty or the record is being written.
+    """
+
+    data = bytes(self._shm.buf[offset:offset + _SLOT_SIZE])
+    if _CHECKSUM.unpack_from(data, _RECORD.size)[0] != zlib.crc32(data[:_RECORD.size]) & 0xffffffff:
+      return None
+
+    return _RECORD.unpack_from(data)
+
+  def _is_expired(self, record):
+    """ Helper method to determine if a record expired. """
+
+    return bool(self.timeout) and time.time() - record[5] > self.timeout
+
+  def _get_config_index(self, config):
+    """ Helper method to get the positions of the experiments of a config, indexing it on first use. """
+
+    with self._lock:
+      config_index = self._config_indexes.get(config)
+      if config_index is None:
+        config_index = self._config_indexes[config] = _ConfigIndex(config)
+      return config_index
+
+  def _encode_decision(self, config, decision):
+    """ Helper method to encode a decision as positions in the config.
+
+    Returns:
+      Tuple of experiment index, variation index and source index. None if it cannot be encoded.
+    """
+
+    if decision.source not in _DECISION_SOURCES:
+      return None
+
+    experiment_index = variation_index = -1
+    if decision.experiment:
+      experiment_index = self._get_config_index(config).experiment_indexes.get(decision.experiment.id)
+      if experiment_index is None:
+        return None
+
+    if decision.variation:
+      variation_ids = [variation.get('id') for variation in decision.experiment.variations]
+      if decision.variation.id not in variation_ids:
+        return None
+      variation_index = variation_ids.index(decision.variation.id)
+
+    return experiment_index, variation_index, _DECISION_SOURCES.index(decision.source)
+
+  def _decode_decision(self, config, record):
+    """ Helper method to decode the decision of a record into entities of the config.
+
+    Returns:
+      Decision. None if the record does not match the config.
+    """
+
+    experiment_index, variation_index, source_index = record[2], record[3], record[4]
+    if source_index >= len(_DECISION_SOURCES):
+      return None
+
+    experiment = variation = None
+    if experiment_index >= 0:
+      experiment_ids = self._get_config_index(config).experiment_ids
+      if experiment_index >= len(experiment_ids):
+        return None
+      experiment = config.experiment_id_map[experiment_ids[experiment_index]]
+
+    if variation_index >= 0:
+      if not experiment or variation_index >= len(experiment.variations):
+        return None
+      variation = config.get_variation_from_id(experiment.key, experiment.variations[variation_index]['id'])
+
+    return decision_service.Decision(experiment, variation, _DECISION_SOURCES[source_index])
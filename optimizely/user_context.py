@@ -0,0 +1,270 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from . import decision_service
+from . import entities
+from . import event_builder
+from .helpers import enums
+from .helpers import validator
+
+
+class UserContext(object):
+  """ Class binding a user and attributes to an Optimizely client, e.g. for the duration of a request.
+
+  It provides the decision methods of the client for the bound user. The user ID and attributes are
+  validated once, and the bucketing ID, the results of evaluating audiences, the user's profile and the
+  attributes sent with events are memoized for the lifetime of the context, as long as the client keeps
+  using the same project config. The user's profile is saved at most once per call, if decisions changed it.
+  Contexts are not thread-safe.
+  """
+
+  def __init__(self, client, user_id, attributes=None):
+    """ UserContext init method. Use Optimizely.create_user_context to create contexts for valid inputs.
+
+    Args:
+      client: Optimizely client making the decisions.
+      user_id: ID for user.
+      attributes: Optional dict representing user attributes. It is copied, so it may be mutated afterwards.
+    """
+
+    self.client = client
+    self.user_id = user_id
+    self.attributes = dict(attributes) if attributes is not None else None
+    self._client_config_bundle = None
+    self._config_bundle = None
+
+  def _get_config_bundle(self, api_name):
+    """ Helper method to get the config bundle of the client with components bound to the user.
+
+    Args:
+      api_name: Name of the API being called.
+
+    Returns:
+      _ConfigBundle with a UserDecisionService and UserEventBuilder. None if the client has no valid config.
+    """
+
+    client_config_bundle = self.client._get_config_bundle(api_name)
+    if not client_config_bundle:
+      return None
+
+    # Memoized results only hold for the config they were computed with
+    if client_config_bundle is not self._client_config_bundle:
+      self._config_bundle = client_config_bundle._replace(
+        decision_service=decision_service.UserDecisionService(client_config_bundle.decision_service,
+                                                              self.user_id,
+                                                              self.attributes),
+        event_builder=event_builder.UserEventBuilder(client_config_bundle.config, self.attributes)
+      )
+      self._client_config_bundle = client_config_bundle
+
+    return self._config_bundle
+
+  def _is_key_valid(self, key, key_name):
+    """ Helper method to validate a key passed in, logging an error if it is invalid.
+
+    Args:
+      key: Key to validate.
+      key_name: Name of the parameter, e.g. experiment_key.
+
+    Returns:
+      Boolean True if the key is a non-empty string. False otherwise.
+    """
+
+    if not validator.is_non_empty_string(key):
+      self.client.logger.error(enums.Errors.INVALID_INPUT_ERROR.format(key_name))
+      return False
+
+    return True
+
+  def activate(self, experiment_key):
+    """ Buckets the user and sends impression event to Optimizely.
+
+    Args:
+      experiment_key: Experiment which needs to be activated.
+
+    Returns:
+      Variation key representing the variation the user will be bucketed in.
+      None if user is not in experiment or if experiment is not Running.
+    """
+
+    config_bundle = self._get_config_bundle('activate')
+    if not config_bundle or not self._is_key_valid(experiment_key, 'experiment_key'):
+      return None
+
+    variation_key = self.client._activate(config_bundle, experiment_key, self.user_id, self.attributes)
+    config_bundle.decision_service.save_user_profile()
+    return variation_key
+
+  def track(self, event_key, event_tags=None):
+    """ Send conversion event of the user to Optimizely.
+
+    Args:
+      event_key: Event key representing the event which needs to be recorded.
+      event_tags: Dict representing metadata associated with the event.
+    """
+
+    config_bundle = self._get_config_bundle('track')
+    if not config_bundle or not self._is_key_valid(event_key, 'event_key'):
+      return
+
+    if not self.client._validate_user_inputs(event_tags=event_tags):
+      return
+
+    self.client._track(config_bundle, event_key, self.user_id, self.attributes, event_tags)
+    config_bundle.decision_service.save_user_profile()
+
+  def get_variation(self, experiment_key):
+    """ Gets variation where the user will be bucketed.
+
+    Args:
+      experiment_key: Experiment for which user variation needs to be determined.
+
+    Returns:
+      Variation key representing the variation the user will be bucketed in.
+      None if user is not in experiment or if experiment is not Running.
+    """
+
+    config_bundle = self._get_config_bundle('get_variation')
+    if not config_bundle or not self._is_key_valid(experiment_key, 'experiment_key'):
+      return None
+
+    variation_key = self.client._get_variation(config_bundle, experiment_key, self.user_id, self.attributes)
+    config_bundle.decision_service.save_user_profile()
+    return variation_key
+
+  def is_feature_enabled(self, feature_key):
+    """ Returns true if the feature is enabled for the user.
+
+    Args:
+      feature_key: The key of the feature for which we are determining if it is enabled or not for the user.
+
+    Returns:
+      True if the feature is enabled for the user. False otherwise.
+    """
+
+    config_bundle = self._get_config_bundle('is_feature_enabled')
+    if not config_bundle or not self._is_key_valid(feature_key, 'feature_key'):
+      return False
+
+    is_enabled = self.client._is_feature_enabled(config_bundle, feature_key, self.user_id, self.attributes)
+    config_bundle.decision_service.save_user_profile()
+    return is_enabled
+
+  def get_enabled_features(self):
+    """ Returns the list of features that are enabled for the user.
+
+    Returns:
+      A list of the keys of the features that are enabled for the user.
+    """
+
+    config_bundle = self._get_config_bundle('get_enabled_features')
+    if not config_bundle:
+      return []
+
+    enabled_features = self.client._get_enabled_features(config_bundle, self.user_id, self.attributes)
+    config_bundle.decision_service.save_user_profile()
+    return enabled_features
+
+  def get_all_feature_variables(self, feature_key):
+    """ Returns the values of all variables attached to a feature flag for the user, deciding once.
+
+    Args:
+      feature_key: Key of the feature whose variables' values are being accessed.
+
+    Returns:
+      decision_bundle.FeatureVariables mapping variable key to typed value. None if the feature is invalid.
+    """
+
+    config_bundle = self._get_config_bundle('get_all_feature_variables')
+    if not config_bundle or not self._is_key_valid(feature_key, 'feature_key'):
+      return None
+
+    variables = self.client._get_all_feature_variables(config_bundle, feature_key, self.user_id, self.attributes)
+    config_bundle.decision_service.save_user_profile()
+    return variables
+
+  def _get_feature_variable_for_type(self, feature_key, variable_key, variable_type):
+    """ Helper method to determine value for a certain variable attached to a feature flag for the user.
+
+    Args:
+      feature_key: Key of the feature whose variable's value is being accessed.
+      variable_key: Key of the variable whose value is to be accessed.
+      variable_type: Type of variable which could be one of boolean/double/integer/string.
+
+    Returns:
+      Value of the variable. None if the feature or variable is invalid or the type of the variable differs.
+    """
+
+    config_bundle = self._get_config_bundle('get_feature_variable_%s' % variable_type)
+    if not config_bundle:
+      return None
+
+    if not self._is_key_valid(feature_key, 'feature_key') or not self._is_key_valid(variable_key, 'variable_key'):
+      return None
+
+    value = self.client._get_feature_variable_value(config_bundle, feature_key, variable_key, variable_type,
+                                                    self.user_id, self.attributes)
+    config_bundle.decision_service.save_user_profile()
+    return value
+
+  def get_feature_variable_boolean(self, feature_key, variable_key):
+    """ Returns value for a certain boolean variable attached to a feature flag for the user.
+
+    Args:
+      feature_key: Key of the feature whose variable's value is being accessed.
+      variable_key: Key of the variable whose value is to be accessed.
+
+    Returns:
+      Boolean value of the variable. None if the feature or variable is invalid or of another type.
+    """
+
+    return self._get_feature_variable_for_type(feature_key, variable_key, entities.Variable.Type.BOOLEAN)
+
+  def get_feature_variable_double(self, feature_key, variable_key):
+    """ Returns value for a certain double variable attached to a feature flag for the user.
+
+    Args:
+      feature_key: Key of the feature whose variable's value is being accessed.
+      variable_key: Key of the variable whose value is to be accessed.
+
+    Returns:
+      Double value of the variable. None if the feature or variable is invalid or of another type.
+    """
+
+    return self._get_feature_variable_for_type(feature_key, variable_key, entities.Variable.Type.DOUBLE)
+
+  def get_feature_variable_integer(self, feature_key, variable_key):
+    """ Returns value for a certain integer variable attached to a feature flag for the user.
+
+    Args:
+      feature_key: Key of the feature whose variable's value is being accessed.
+      variable_key: Key of the variable whose value is to be accessed.
+
+    Returns:
+      Integer value of the variable. None if the feature or variable is invalid or of another type.
+    """
+
+    return self._get_feature_variable_for_type(feature_key, variable_key, entities.Variable.Type.INTEGER)
+
+  def get_feature_variable_string(self, feature_key, variable_key):
+    """ Returns value for a certain string variable attached to a feature flag for the user.
+
+    Args:
+      feature_key: Key of the feature whose variable's value is being accessed.
+      variable_key: Key of the variable whose value is to be accessed.
+
+    Returns:
+      String value of the variable. None if the feature or variable is invalid or of another type.
+    """
+
+    return self._get_feature_variable_for_type(feature_key, variable_key, entities.Variable.Type.STRING)
@@ -73,6 +73,18 @@ class UserProfileService(object):
     """
     return UserProfile(user_id).__dict__
 
+  def lookup_many(self, user_ids):
+    """ Fetch the user profile dicts corresponding to many user IDs at once.
+    Override to retrieve them in a single round trip, e.g. with a multi-get on the underlying store.
+
+    Args:
+      user_ids: List of IDs for users whose profiles need to be retrieved.
+
+    Returns:
+      Dict mapping user ID to dict representing the user's profile. Users without a profile may be left out.
+    """
+    return dict((user_id, self.lookup(user_id)) for user_id in user_ids)
+
   def save(self, user_profile):
     """ Save the user profile dict sent to this method.
 
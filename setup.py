@@ -17,6 +17,9 @@ with open(os.path.join(here, 'requirements', 'test.txt')) as _file:
   TEST_REQUIREMENTS = _file.read().splitlines()
   TEST_REQUIREMENTS = list(set(REQUIREMENTS + TEST_REQUIREMENTS))
 
+with open(os.path.join(here, 'requirements', 'dataframe.txt')) as _file:
+  DATAFRAME_REQUIREMENTS = _file.read().splitlines()
+
 with open(os.path.join(here, 'README.rst')) as _file:
   README = _file.read()
 
@@ -51,7 +54,7 @@ setup(
     packages=find_packages(
       exclude=['tests']
     ),
-    extras_require={'test': TEST_REQUIREMENTS},
+    extras_require={'test': TEST_REQUIREMENTS, 'dataframe': DATAFRAME_REQUIREMENTS},
     install_requires=REQUIREMENTS,
     tests_require=TEST_REQUIREMENTS,
     test_suite='tests'
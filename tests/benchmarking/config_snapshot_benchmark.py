@@ -0,0 +1,85 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Compares building ProjectConfig from the JSON datafile with restoring it from a compiled snapshot,
+both for the config alone and for constructing an Optimizely client with default options. """
+
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+from optimizely import config_snapshot
+from optimizely import error_handler
+from optimizely import logger
+from optimizely import optimizely
+from optimizely import project_config
+
+from datafile_generator import generate_datafile
+
+
+ITERATIONS = 10
+EXPERIMENT_COUNTS = [100, 1000, 5000]
+
+
+def cold_json_load(datafile, snapshot_path):
+  project_config.ProjectConfig(datafile, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+
+def snapshot_restore(datafile, snapshot_path):
+  config_snapshot.load(snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+
+def client_from_datafile(datafile, snapshot_path):
+  optimizely.Optimizely(datafile)
+
+
+def client_from_snapshot(datafile, snapshot_path):
+  optimizely.Optimizely(datafile, config_snapshot=snapshot_path)
+
+
+def time_in_milliseconds(test_method, datafile, snapshot_path):
+  values = []
+  for _ in range(ITERATIONS):
+    start_time = timeit.default_timer()
+    test_method(datafile, snapshot_path)
+    values.append(1000 * (timeit.default_timer() - start_time))
+
+  values.sort()
+  return sum(values) / len(values), values[len(values) // 2]
+
+
+def run_benchmark():
+  snapshot_dir = tempfile.mkdtemp()
+  try:
+    print('%-20s %-22s %12s %12s' % ('Experiment Count', 'Test Name', 'Average ms', 'Median ms'))
+    for experiment_count in EXPERIMENT_COUNTS:
+      datafile = json.dumps(generate_datafile(experiment_count))
+      config = project_config.ProjectConfig(datafile, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+      snapshot_path = config_snapshot.get_snapshot_path(snapshot_dir, config.get_revision())
+      config_snapshot.dump(config, snapshot_path)
+
+      for test_method in (cold_json_load, snapshot_restore, client_from_datafile, client_from_snapshot):
+        average, median = time_in_milliseconds(test_method, datafile, snapshot_path)
+        print('%-20s %-22s %12.3f %12.3f' % (experiment_count, test_method.__name__, average, median))
+
+      print('%-20s %-22s %12d bytes' % (experiment_count, 'snapshot size', os.path.getsize(snapshot_path)))
+  finally:
+    shutil.rmtree(snapshot_dir)
+
+
+if __name__ == '__main__':
+  run_benchmark()
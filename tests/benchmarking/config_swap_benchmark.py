@@ -0,0 +1,121 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Measures API call latency under concurrent load, first with a static config and then while
+new datafile revisions are continuously swapped in through a config manager.
+
+Usage: python config_swap_benchmark.py [experiment count] [thread count] [seconds per phase] [seconds between swaps]
+"""
+
+from __future__ import print_function
+
+import json
+import sys
+import threading
+import timeit
+
+from optimizely import config_manager
+from optimizely import optimizely
+
+from datafile_generator import NoOpEventDispatcher
+from datafile_generator import generate_datafile
+
+
+def run_readers(client, experiment_count, thread_count, duration):
+  """ Call is_feature_enabled from several threads for the given duration and collect latencies in microseconds. """
+
+  latencies = []
+  errors = []
+  stop = threading.Event()
+
+  def reader(thread_index):
+    thread_latencies = []
+    index = 0
+    while not stop.is_set():
+      feature_key = 'feature_%d' % (index % experiment_count)
+      start_time = timeit.default_timer()
+      try:
+        client.is_feature_enabled(feature_key, 'user_%d_%d' % (thread_index, index), {'browser': 'browser_1'})
+      except Exception as error:
+        errors.append(error)
+      thread_latencies.append(1000000 * (timeit.default_timer() - start_time))
+      index += 1
+    latencies.extend(thread_latencies)
+
+  threads = [threading.Thread(target=reader, args=(thread_index,)) for thread_index in range(thread_count)]
+  for thread in threads:
+    thread.start()
+  stop.wait(duration)
+  stop.set()
+  for thread in threads:
+    thread.join()
+
+  return latencies, errors
+
+
+def percentile(sorted_values, fraction):
+  return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def print_phase(name, latencies, errors, swap_count):
+  latencies.sort()
+  print('%-10s %10d %10.1f %10.1f %10.1f %10.1f %8d %8d' % (
+    name, len(latencies), percentile(latencies, 0.5), percentile(latencies, 0.99),
+    percentile(latencies, 0.999), latencies[-1], swap_count, len(errors)
+  ))
+
+
+def run_benchmark(experiment_count, thread_count, duration, swap_interval):
+  datafiles = []
+  for revision in range(2):
+    datafile = generate_datafile(experiment_count, revision=str(revision))
+    # Make every swap change some experiments so that part of the config is rebuilt.
+    for experiment in datafile['experiments'][revision::10]:
+      experiment['trafficAllocation'][0]['endOfRange'] -= 1
+    datafiles.append(json.dumps(datafile))
+
+  manager = config_manager.StaticConfigManager(datafiles[0], skip_json_validation=True)
+  client = optimizely.Optimizely(config_manager=manager, event_dispatcher=NoOpEventDispatcher)
+
+  print('experiments=%d threads=%d seconds per phase=%d seconds between swaps=%.2f' % (
+    experiment_count, thread_count, duration, swap_interval
+  ))
+  print('%-10s %10s %10s %10s %10s %10s %8s %8s' % (
+    'Phase', 'Calls', 'p50 us', 'p99 us', 'p99.9 us', 'max us', 'Swaps', 'Errors'
+  ))
+
+  latencies, errors = run_readers(client, experiment_count, thread_count, duration)
+  print_phase('steady', latencies, errors, 0)
+
+  swap_count = [0]
+  stop_swapping = threading.Event()
+
+  def swapper():
+    while not stop_swapping.is_set():
+      if manager.set_datafile(datafiles[(swap_count[0] + 1) % 2]):
+        swap_count[0] += 1
+      stop_swapping.wait(swap_interval)
+
+  swap_thread = threading.Thread(target=swapper)
+  swap_thread.start()
+  latencies, errors = run_readers(client, experiment_count, thread_count, duration)
+  stop_swapping.set()
+  swap_thread.join()
+  print_phase('swapping', latencies, errors, swap_count[0])
+
+
+if __name__ == '__main__':
+  run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+                int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+                int(sys.argv[3]) if len(sys.argv) > 3 else 5,
+                float(sys.argv[4]) if len(sys.argv) > 4 else 0.5)
@@ -0,0 +1,149 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Generates synthetic version 4 datafiles of arbitrary size for benchmarking, along with an event dispatcher
+sending nothing for the clients benchmarked. """
+
+import json
+
+STATUSES = ['Running', 'Paused', 'Archived', 'Not started']
+
+
+class NoOpEventDispatcher(object):
+
+  @staticmethod
+  def dispatch_event(event):
+    pass
+
+
+def _variations(prefix, count, with_variables=None):
+  variations = []
+  for index in range(count):
+    variation = {
+      'id': '%s%d' % (prefix, index),
+      'key': 'variation_%d' % index,
+      'featureEnabled': index > 0,
+      'variables': []
+    }
+    for variable in with_variables or []:
+      variation['variables'].append({'id': variable['id'], 'value': variable['defaultValue']})
+    variations.append(variation)
+  return variations
+
+
+def _traffic_allocation(variations):
+  step = 10000 // len(variations)
+  return [{'entityId': variation['id'], 'endOfRange': step * (index + 1)}
+          for index, variation in enumerate(variations)]
+
+
+def generate_datafile(num_experiments, num_audiences=None, num_features=None, experiments_per_event=5,
+                      running_ratio=1.0, revision='1'):
+  """ Generate a datafile.
+
+  Args:
+    num_experiments: Number of A/B experiments.
+    num_audiences: Number of audiences. Defaults to half the number of experiments.
+    num_features: Number of feature flags, each with a rollout. Defaults to the number of experiments.
+    experiments_per_event: Number of experiments each event is attached to.
+    running_ratio: Fraction of experiments with status "Running". The rest cycle through other statuses.
+    revision: Revision of the datafile.
+
+  Returns:
+    Dict representing the datafile.
+  """
+
+  num_audiences = num_experiments // 2 if num_audiences is None else num_audiences
+  num_features = num_experiments if num_features is None else num_features
+  running_count = int(num_experiments * running_ratio)
+
+  audiences = []
+  attributes = [{'id': 'attr_browser', 'key': 'browser'}, {'id': 'attr_plan', 'key': 'plan'}]
+  for index in range(num_audiences):
+    audiences.append({
+      'id': 'aud_%d' % index,
+      'name': 'audience_%d' % index,
+      'conditions': json.dumps(['and', ['or', ['or', {
+        'name': 'browser', 'type': 'custom_attribute', 'value': 'browser_%d' % (index % 5)
+      }]]])
+    })
+
+  experiments = []
+  for index in range(num_experiments):
+    variations = _variations('var_%d_' % index, 3)
+    experiments.append({
+      'id': 'exp_%d' % index,
+      'key': 'experiment_%d' % index,
+      'status': 'Running' if index < running_count else STATUSES[1 + index % 3],
+      'layerId': 'layer_%d' % index,
+      'audienceIds': ['aud_%d' % (index % num_audiences)] if num_audiences and index % 2 else [],
+      'forcedVariations': {},
+      'variations': variations,
+      'trafficAllocation': _traffic_allocation(variations)
+    })
+
+  rollouts = []
+  feature_flags = []
+  for index in range(num_features):
+    variables = [
+      {'id': 'fvar_%d_bool' % index, 'key': 'enabled_flag', 'type': 'boolean', 'defaultValue': 'true'},
+      {'id': 'fvar_%d_int' % index, 'key': 'count', 'type': 'integer', 'defaultValue': '10'},
+      {'id': 'fvar_%d_double' % index, 'key': 'ratio', 'type': 'double', 'defaultValue': '0.5'},
+      {'id': 'fvar_%d_string' % index, 'key': 'label', 'type': 'string', 'defaultValue': 'label'},
+    ]
+    rules = []
+    for rule_index in range(2):
+      variations = _variations('rvar_%d_%d_' % (index, rule_index), 1, with_variables=variables)
+      rules.append({
+        'id': 'rule_%d_%d' % (index, rule_index),
+        'key': 'rule_%d_%d' % (index, rule_index),
+        'status': 'Running',
+        'layerId': 'rollout_%d' % index,
+        'audienceIds': ['aud_%d' % (index % num_audiences)] if num_audiences and rule_index == 0 else [],
+        'forcedVariations': {},
+        'variations': variations,
+        'trafficAllocation': [{'entityId': variations[0]['id'], 'endOfRange': 5000 + 5000 * rule_index}]
+      })
+    rollouts.append({'id': 'rollout_%d' % index, 'experiments': rules})
+    feature_flags.append({
+      'id': 'feature_%d' % index,
+      'key': 'feature_%d' % index,
+      'experimentIds': ['exp_%d' % index] if index < num_experiments else [],
+      'rolloutId': 'rollout_%d' % index,
+      'variables': variables
+    })
+
+  events = []
+  for index in range(max(1, num_experiments // experiments_per_event)):
+    events.append({
+      'id': 'event_%d' % index,
+      'key': 'event_%d' % index,
+      'experimentIds': ['exp_%d' % ((index * experiments_per_event + offset) % num_experiments)
+                        for offset in range(experiments_per_event)]
+    })
+
+  return {
+    'version': '4',
+    'revision': revision,
+    'projectId': '111001',
+    'accountId': '12001',
+    'anonymizeIP': False,
+    'botFiltering': False,
+    'attributes': attributes,
+    'audiences': audiences,
+    'experiments': experiments,
+    'groups': [],
+    'events': events,
+    'rollouts': rollouts,
+    'featureFlags': feature_flags
+  }
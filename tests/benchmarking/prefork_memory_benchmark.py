@@ -0,0 +1,100 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Measures memory per worker when an Optimizely client built in a master process is inherited by
+forked workers, with and without Optimizely.freeze_for_fork. Linux only, as it reads /proc/<pid>/smaps.
+
+Usage: python prefork_memory_benchmark.py [plain|frozen] [experiment count] [worker count]
+"""
+
+from __future__ import print_function
+
+import gc
+import json
+import os
+import random
+import sys
+
+from optimizely import optimizely
+
+from datafile_generator import NoOpEventDispatcher
+from datafile_generator import generate_datafile
+
+DECISIONS_PER_WORKER = 20000
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Dirty', 'Private_Dirty')
+
+
+def read_memory_usage(pid):
+  """ Sum memory usage fields over all mappings of the process, in kB. """
+
+  usage = dict((field, 0) for field in SMAPS_FIELDS)
+  with open('/proc/%d/smaps' % pid) as smaps:
+    for line in smaps:
+      field, _, value = line.partition(':')
+      if field in usage:
+        usage[field] += int(value.split()[0])
+  return usage
+
+
+def run_worker(client, experiment_count, result_fd):
+  gc.enable()
+  randomizer = random.Random(os.getpid())
+  for index in range(DECISIONS_PER_WORKER):
+    user_id = 'user_%d' % randomizer.randint(0, 1000000)
+    feature_key = 'feature_%d' % randomizer.randint(0, experiment_count - 1)
+    client.is_feature_enabled(feature_key, user_id, {'browser': 'browser_%d' % (index % 5)})
+  gc.collect()
+
+  os.write(result_fd, (json.dumps(read_memory_usage(os.getpid())) + '\n').encode('utf-8'))
+  os._exit(0)
+
+
+def run_benchmark(mode, experiment_count, worker_count):
+  gc.disable()
+  client = optimizely.Optimizely(json.dumps(generate_datafile(experiment_count)),
+                                 event_dispatcher=NoOpEventDispatcher,
+                                 skip_json_validation=True)
+  if mode == 'frozen':
+    client.freeze_for_fork()
+
+  master_usage = read_memory_usage(os.getpid())
+  read_fd, write_fd = os.pipe()
+  pids = []
+  for _ in range(worker_count):
+    pid = os.fork()
+    if pid == 0:
+      os.close(read_fd)
+      run_worker(client, experiment_count, write_fd)
+    pids.append(pid)
+
+  os.close(write_fd)
+  with os.fdopen(read_fd) as results:
+    worker_usages = [json.loads(line) for line in results]
+  for pid in pids:
+    os.waitpid(pid, 0)
+
+  print('mode=%s experiments=%d workers=%d master_rss=%d kB' % (
+    mode, experiment_count, worker_count, master_usage['Rss']
+  ))
+  print('%-16s %s' % ('per worker (kB)', ' '.join('%14s' % field for field in SMAPS_FIELDS)))
+  for field_index, label in enumerate(['average', 'max']):
+    aggregate = (lambda values: sum(values) // len(values)) if field_index == 0 else max
+    print('%-16s %s' % (label, ' '.join(
+      '%14d' % aggregate([usage[field] for usage in worker_usages]) for field in SMAPS_FIELDS
+    )))
+
+
+if __name__ == '__main__':
+  run_benchmark(sys.argv[1] if len(sys.argv) > 1 else 'frozen',
+                int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+                int(sys.argv[3]) if len(sys.argv) > 3 else 4)
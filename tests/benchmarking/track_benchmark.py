@@ -0,0 +1,88 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Measures track latency for events attached to many experiments, half of which are running,
+against deciding for each experiment of the event through the public get_variation.
+
+Usage: python track_benchmark.py [iterations]
+"""
+
+from __future__ import print_function
+
+import json
+import sys
+import timeit
+
+from optimizely import optimizely
+from optimizely import user_profile
+
+from datafile_generator import NoOpEventDispatcher
+from datafile_generator import generate_datafile
+
+
+ITERATIONS = 200
+EXPERIMENTS_PER_EVENT = [50, 100, 200]
+
+
+class InMemoryUserProfileService(user_profile.UserProfileService):
+
+  def __init__(self):
+    self.user_profiles = {}
+
+  def lookup(self, user_id):
+    return self.user_profiles.get(user_id)
+
+  def save(self, user_profile):
+    self.user_profiles[user_profile['user_id']] = user_profile
+
+
+def track(client, config, index):
+  client.track('event_0', 'user_%d' % index, {'browser': 'browser_1'})
+
+
+def get_variation_per_experiment(client, config, index):
+  """ Decide for every experiment of the event as tracking did before running experiments were indexed. """
+
+  for experiment_id in config.get_event('event_0').experimentIds:
+    experiment = config.get_experiment_from_id(experiment_id)
+    client.get_variation(experiment.key, 'user_%d' % index, {'browser': 'browser_1'})
+
+
+def time_in_microseconds(test_method, client, iterations):
+  values = []
+  for index in range(iterations):
+    start_time = timeit.default_timer()
+    test_method(client, client.config, index)
+    values.append(1000000 * (timeit.default_timer() - start_time))
+
+  values.sort()
+  return sum(values) / len(values), values[len(values) // 2]
+
+
+def run_benchmark(iterations):
+  print('%-20s %-8s %-30s %12s %12s' % ('Experiments/Event', 'UPS', 'Test Name', 'Average us', 'Median us'))
+  for experiments_per_event in EXPERIMENTS_PER_EVENT:
+    datafile = json.dumps(generate_datafile(experiments_per_event, experiments_per_event=experiments_per_event,
+                                            running_ratio=0.5))
+    for with_user_profile_service in (False, True):
+      user_profile_service = InMemoryUserProfileService() if with_user_profile_service else None
+      client = optimizely.Optimizely(datafile, event_dispatcher=NoOpEventDispatcher,
+                                     user_profile_service=user_profile_service)
+      for test_method in (track, get_variation_per_experiment):
+        average, median = time_in_microseconds(test_method, client, iterations)
+        print('%-20s %-8s %-30s %12.1f %12.1f' % (experiments_per_event, with_user_profile_service,
+                                                  test_method.__name__, average, median))
+
+
+if __name__ == '__main__':
+  run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS)
@@ -135,6 +135,24 @@ class AudienceTest(base.BaseTest):
       mock.call().evaluate(0)
     ], any_order=True)
 
+  def test_is_user_in_experiment__audience_results(self):
+    """ Test that is_user_in_experiment records the audiences it evaluates and reuses recorded results. """
+
+    user_attributes = {'test_attribute': 'test_value_1'}
+    experiment = self.project_config.get_experiment_from_key('test_experiment')
+    experiment.audienceIds = ['11154', '11159']
+    experiment.audienceConditions = ['or', '11159', '11154']
+    audience_results = {'11159': False}
+
+    with mock.patch('optimizely.helpers.condition.CustomAttributeConditionEvaluator') as custom_attr_eval:
+      custom_attr_eval.return_value.evaluate.return_value = True
+      self.assertStrictTrue(audience.is_user_in_experiment(self.project_config, experiment, user_attributes,
+                                                           audience_results))
+
+    custom_attr_eval.assert_called_once_with(self.project_config.get_audience('11154').conditionList,
+                                             user_attributes)
+    self.assertEqual({'11159': False, '11154': True}, audience_results)
+
   def test_is_user_in_experiment__evaluates_audience_conditions(self):
     """ Test that is_user_in_experiment correctly evaluates audienceConditions and
         calls custom attribute evaluator for leaf nodes. """
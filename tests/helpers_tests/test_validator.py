@@ -149,6 +149,18 @@ class ValidatorTest(base.BaseTest):
     self.assertTrue(validator.is_non_empty_string('0'))
     self.assertTrue(validator.is_non_empty_string('test_user'))
 
+  def test_is_secret_key_valid(self):
+    """ Test that the method returns True only for a non-empty string or bytes. """
+
+    self.assertFalse(validator.is_secret_key_valid(None))
+    self.assertFalse(validator.is_secret_key_valid(123))
+    self.assertFalse(validator.is_secret_key_valid(''))
+    self.assertFalse(validator.is_secret_key_valid(b''))
+    self.assertFalse(validator.is_secret_key_valid(['secret']))
+
+    self.assertTrue(validator.is_secret_key_valid('secret'))
+    self.assertTrue(validator.is_secret_key_valid(b'secret'))
+
   def test_is_attribute_valid(self):
     """ Test that non-string attribute key or unsupported attribute value returns False."""
 
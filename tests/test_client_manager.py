@@ -0,0 +1,147 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+import threading
+
+from optimizely import client_manager
+
+from . import base
+
+
+class ClientManagerTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.datafiles = {}
+    for project_key in ['a', 'b', 'c']:
+      self.datafiles[project_key] = json.dumps(dict(self.config_dict, projectId=project_key))
+    self.loader = mock.MagicMock(side_effect=lambda project_key: self.datafiles[project_key])
+    self.config_size = client_manager.get_approximate_size(self.project_config)
+
+  def get_size(self, client):
+    return client_manager.get_approximate_size(client.config)
+
+  def test_get_approximate_size(self):
+    """ Test that the approximate size grows with the config. """
+
+    features_config = self.optimizely.__class__(json.dumps(self.config_dict_with_features)).config
+    self.assertTrue(self.config_size > 0)
+    self.assertTrue(client_manager.get_approximate_size(features_config) > self.config_size)
+
+  def test_get_client(self):
+    """ Test that clients are loaded on first use only. """
+
+    manager = client_manager.ClientManager(self.loader)
+    client = manager.get_client('a')
+
+    self.assertEqual('a', client.config.project_id)
+    self.assertIs(client, manager.get_client('a'))
+    self.loader.assert_called_once_with('a')
+
+    metrics = manager.get_metrics()
+    self.assertEqual(1, metrics['clients'])
+    self.assertEqual(1, metrics['loads'])
+    self.assertAlmostEqual(self.get_size(client), metrics['resident_bytes'], delta=0.05 * self.config_size)
+    self.assertTrue(metrics['load_time_ms'] > 0)
+
+  def test_get_client__load_fails(self):
+    """ Test that failed loads are logged, counted and retried on next use. """
+
+    self.datafiles['a'] = 'invalid_datafile'
+    manager = client_manager.ClientManager(self.loader)
+    with mock.patch.object(manager, 'logger') as mock_manager_logging:
+      self.assertIsNone(manager.get_client('a'))
+      self.assertIsNone(manager.get_client('a'))
+
+    mock_manager_logging.error.assert_called_with('Unable to create client for project "a".')
+    self.assertEqual(2, self.loader.call_count)
+    self.assertEqual(2, manager.get_metrics()['load_failures'])
+
+  def test_get_client__loader_raises(self):
+    """ Test that exceptions raised by the loader are logged. """
+
+    manager = client_manager.ClientManager(self.loader)
+    with mock.patch.object(manager, 'logger') as mock_manager_logging:
+      self.assertIsNone(manager.get_client('unknown'))
+
+    mock_manager_logging.error.assert_called_once_with('Unable to load datafile for project "unknown": \'unknown\'')
+
+  def test_get_client__evicts_least_recently_used(self):
+    """ Test that least recently used clients are evicted once the memory budget is exceeded. """
+
+    manager = client_manager.ClientManager(self.loader, memory_budget=int(2.5 * self.config_size))
+    client_a = manager.get_client('a')
+    manager.get_client('b')
+    self.assertIs(client_a, manager.get_client('a'))
+    client_c = manager.get_client('c')
+
+    metrics = manager.get_metrics()
+    self.assertEqual(2, metrics['clients'])
+    self.assertEqual(1, metrics['evictions'])
+    self.assertAlmostEqual(self.get_size(client_a) + self.get_size(client_c), metrics['resident_bytes'],
+                           delta=0.05 * self.config_size)
+
+    # b was least recently used and has to be loaded again
+    self.assertIs(client_a, manager.get_client('a'))
+    manager.get_client('b')
+    self.assertEqual(4, self.loader.call_count)
+
+  def test_get_client__over_budget_keeps_latest(self):
+    """ Test that the most recently loaded client is kept even if it alone exceeds the memory budget. """
+
+    manager = client_manager.ClientManager(self.loader, memory_budget=1)
+    manager.get_client('a')
+    client_b = manager.get_client('b')
+
+    self.assertIs(client_b, manager.get_client('b'))
+    self.assertEqual(1, manager.get_metrics()['clients'])
+
+  def test_get_client__concurrent_loads_coalesced(self):
+    """ Test that concurrent requests for a project being loaded wait for that load. """
+
+    load_started = threading.Event()
+    finish_load = threading.Event()
+
+    def slow_loader(project_key):
+      load_started.set()
+      finish_load.wait(5)
+      return self.datafiles[project_key]
+
+    loader = mock.MagicMock(side_effect=slow_loader)
+    manager = client_manager.ClientManager(loader)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(manager.get_client('a'))) for _ in range(3)]
+    threads[0].start()
+    load_started.wait(5)
+    for thread in threads[1:]:
+      thread.start()
+    finish_load.set()
+    for thread in threads:
+      thread.join()
+
+    loader.assert_called_once_with('a')
+    self.assertEqual(3, len(clients))
+    self.assertTrue(all(client is clients[0] for client in clients))
+
+  def test_remove_client(self):
+    """ Test that removed clients are loaded again on next use. """
+
+    manager = client_manager.ClientManager(self.loader)
+    manager.get_client('a')
+    manager.remove_client('a')
+
+    self.assertEqual(0, manager.get_metrics()['resident_bytes'])
+    manager.get_client('a')
+    self.assertEqual(2, self.loader.call_count)
@@ -11,6 +11,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import json
 import mock
 
@@ -19,6 +20,7 @@ from optimizely import error_handler
 from optimizely import exceptions
 from optimizely import logger
 from optimizely import optimizely
+from optimizely import project_config
 from optimizely.helpers import enums
 
 from . import base
@@ -844,6 +846,19 @@ class ConfigTest(base.BaseTest):
 
     self.assertIsNone(self.project_config.get_event('invalid_key'))
 
+  def test_get_running_experiments_for_event(self):
+    """ Test that only the running experiments of an event are indexed, skipping unknown ones. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['groups'][0]['experiments'][0]['status'] = 'Paused'
+    config_dict['events'][0]['experimentIds'] = ['111127', '32222', '32223', '42']
+    project_config = optimizely.Optimizely(json.dumps(config_dict)).config
+
+    self.assertEqual([project_config.get_experiment_from_key('test_experiment'),
+                      project_config.get_experiment_from_key('group_exp_2')],
+                     project_config.get_running_experiments_for_event(project_config.get_event('test_event')))
+    self.assertEqual([], project_config.get_running_experiments_for_event(entities.Event('42', 'unknown_event', [])))
+
   def test_get_attribute_id__valid_key(self):
     """ Test that attribute ID is retrieved correctly for valid attribute key. """
 
@@ -1005,6 +1020,42 @@ class ConfigTest(base.BaseTest):
                                                                               'variable_without_usage')
     self.assertEqual('45', project_config.get_variable_value_for_variation(variable_without_usage_variable, variation))
 
+  def test_get_typed_variable_value(self):
+    """ Test that variable values are type-cast with default values filled in for unused variables. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    project_config = opt_obj.config
+
+    variation = project_config.get_variation_from_id('test_experiment', '111128')
+    expected_values = {
+      'is_working': (False, True),
+      'environment': ('prod', 'devel'),
+      'cost': (10.01, 10.99),
+      'count': (4242, 999),
+      'variable_without_usage': (45, 45)
+    }
+    for variable_key, (value, default_value) in expected_values.items():
+      variable = project_config.get_variable_for_feature('test_feature_in_experiment', variable_key)
+      self.assertEqual(value, project_config.get_typed_variable_value(variable, variation))
+      self.assertEqual(default_value, project_config.get_typed_variable_value(variable))
+
+  def test_get_typed_variable_value__invalid_value(self):
+    """ Test that values which can not be cast are reported once when the config is built and returned as None. """
+
+    config_dict = copy.deepcopy(self.config_dict_with_features)
+    config_dict['featureFlags'][0]['variables'][3]['defaultValue'] = 'many'
+    config_logger = logger.adapt_logger(logger.NoOpLogger())
+    with mock.patch.object(config_logger, 'error') as mock_config_logging:
+      config = project_config.ProjectConfig(json.dumps(config_dict), config_logger, error_handler.NoOpErrorHandler)
+
+    mock_config_logging.assert_called_once_with('Unable to cast value "many" of variable "count" to type "integer".')
+    count_variable = config.get_variable_for_feature('test_feature_in_experiment', 'count')
+    self.assertIsNone(config.get_typed_variable_value(count_variable))
+    # Variations using a valid value are unaffected
+    self.assertEqual(4242, config.get_typed_variable_value(
+      count_variable, config.get_variation_from_id('test_experiment', '111128')
+    ))
+
   def test_get_variable_for_feature__returns_valid_variable(self):
     """ Test that the feature variable is returned. """
 
@@ -1030,111 +1081,192 @@ class ConfigTest(base.BaseTest):
 
     self.assertIsNone(project_config.get_variable_for_feature('test_feature_in_experiment', 'invalid_variable_key'))
 
-  # get_forced_variation tests
-  def test_get_forced_variation__invalid_user_id(self):
-    """ Test invalid user IDs return a null variation. """
-    self.project_config.forced_variation_map['test_user'] = {}
-    self.project_config.forced_variation_map['test_user']['test_experiment'] = 'test_variation'
-
-    self.assertIsNone(self.project_config.get_forced_variation('test_experiment', None))
-    self.assertIsNone(self.project_config.get_forced_variation('test_experiment', ''))
-
-  def test_get_forced_variation__invalid_experiment_key(self):
-    """ Test invalid experiment keys return a null variation. """
-    self.project_config.forced_variation_map['test_user'] = {}
-    self.project_config.forced_variation_map['test_user']['test_experiment'] = 'test_variation'
+  def test_freeze(self):
+    """ Test that a frozen config rejects attribute assignment but remains readable. """
 
-    self.assertIsNone(self.project_config.get_forced_variation('test_experiment_not_in_datafile', 'test_user'))
-    self.assertIsNone(self.project_config.get_forced_variation(None, 'test_user'))
-    self.assertIsNone(self.project_config.get_forced_variation('', 'test_user'))
+    self.assertFalse(self.project_config.is_frozen())
+    self.project_config.freeze()
 
-  def test_get_forced_variation_with_none_set_for_user(self):
-    """ Test get_forced_variation when none set for user ID in forced variation map. """
-    self.project_config.forced_variation_map = {}
-    self.project_config.forced_variation_map['test_user'] = {}
+    self.assertTrue(self.project_config.is_frozen())
+    with self.assertRaisesRegexp(AttributeError, 'Project config is frozen. Can not set "revision".'):
+      self.project_config.revision = '43'
+    self.assertEqual('42', self.project_config.get_revision())
+    self.assertEqual('test_experiment', self.project_config.get_experiment_from_key('test_experiment').key)
 
-    with mock.patch.object(self.project_config, 'logger') as mock_config_logging:
-      self.assertIsNone(self.project_config.get_forced_variation('test_experiment', 'test_user'))
-    mock_config_logging.debug.assert_called_once_with(
-      'No experiment "test_experiment" mapped to user "test_user" in the forced variation map.'
-    )
+  def test_freeze__not_pickled(self):
+    """ Test that the frozen state is not part of the pickled state. """
 
-  def test_get_forced_variation_missing_variation_mapped_to_experiment(self):
-    """ Test get_forced_variation when no variation found against given experiment for the user. """
-    self.project_config.forced_variation_map = {}
-    self.project_config.forced_variation_map['test_user'] = {}
-    self.project_config.forced_variation_map['test_user']['test_experiment'] = None
+    self.project_config.freeze()
+    self.assertNotIn('_frozen', self.project_config.__getstate__())
 
-    with mock.patch.object(self.project_config, 'logger') as mock_config_logging:
-      self.assertIsNone(self.project_config.get_forced_variation('test_experiment', 'test_user'))
+  def test_share(self):
+    """ Test that a shared config uses its own logger and error handler but shares all data. """
 
-    mock_config_logging.debug.assert_called_once_with(
-      'No variation mapped to experiment "test_experiment" in the forced variation map.'
-    )
+    self.project_config.freeze()
+    config_logger = logger.adapt_logger(logger.SimpleLogger())
+    shared_config = self.project_config.share(config_logger, error_handler.RaiseExceptionErrorHandler)
 
-  def test_set_forced_variation__invalid_experiment_key(self):
-    """ Test invalid experiment keys set fail to set a forced variation """
+    self.assertIs(config_logger, shared_config.logger)
+    self.assertIs(error_handler.RaiseExceptionErrorHandler, shared_config.error_handler)
+    self.assertIs(self.project_config.experiment_key_map, shared_config.experiment_key_map)
+    self.assertFalse(shared_config.is_frozen())
+    self.assertNotIn('_source_config', shared_config.__getstate__())
 
-    self.assertFalse(self.project_config.set_forced_variation('test_experiment_not_in_datafile',
-                                                              'test_user', 'variation'))
-    self.assertFalse(self.project_config.set_forced_variation('', 'test_user', 'variation'))
-    self.assertFalse(self.project_config.set_forced_variation(None, 'test_user', 'variation'))
+  def test_init__previous_config__reuses_unchanged_entities(self):
+    """ Test that building from a new datafile revision reuses entities unchanged since the previous config. """
 
-  def test_set_forced_variation__invalid_variation_key(self):
-    """ Test invalid variation keys set fail to set a forced variation """
+    previous_config = project_config.ProjectConfig(json.dumps(self.config_dict_with_features),
+                                                   logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+    new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    new_config_dict['revision'] = '43'
+    new_config_dict['experiments'][0]['trafficAllocation'][0]['endOfRange'] = 4000
 
-    self.assertFalse(self.project_config.set_forced_variation('test_experiment', 'test_user',
-                                                              'variation_not_in_datafile'))
-    self.assertTrue(self.project_config.set_forced_variation('test_experiment', 'test_user', None))
+    config_logger = logger.adapt_logger(logger.NoOpLogger())
+    with mock.patch.object(config_logger, 'debug') as mock_config_logging:
+      new_config = project_config.ProjectConfig(json.dumps(new_config_dict), config_logger,
+                                                error_handler.NoOpErrorHandler, previous_config=previous_config)
 
-    with mock.patch.object(self.project_config, 'logger') as mock_config_logging:
-      self.assertIs(self.project_config.set_forced_variation('test_experiment', 'test_user', ''), False)
-    mock_config_logging.debug.assert_called_once_with('Variation key is invalid.')
-
-  def test_set_forced_variation__multiple_sets(self):
-    """ Test multiple sets of experiments for one and multiple users work """
-
-    self.assertTrue(self.project_config.set_forced_variation('test_experiment', 'test_user_1', 'variation'))
-    self.assertEqual(self.project_config.get_forced_variation('test_experiment', 'test_user_1').key, 'variation')
-    # same user, same experiment, different variation
-    self.assertTrue(self.project_config.set_forced_variation('test_experiment', 'test_user_1', 'control'))
-    self.assertEqual(self.project_config.get_forced_variation('test_experiment', 'test_user_1').key, 'control')
-    # same user, different experiment
-    self.assertTrue(self.project_config.set_forced_variation('group_exp_1', 'test_user_1', 'group_exp_1_control'))
-    self.assertEqual(self.project_config.get_forced_variation('group_exp_1', 'test_user_1').key, 'group_exp_1_control')
-
-    # different user
-    self.assertTrue(self.project_config.set_forced_variation('test_experiment', 'test_user_2', 'variation'))
-    self.assertEqual(self.project_config.get_forced_variation('test_experiment', 'test_user_2').key, 'variation')
-    # different user, different experiment
-    self.assertTrue(self.project_config.set_forced_variation('group_exp_1', 'test_user_2', 'group_exp_1_control'))
-    self.assertEqual(self.project_config.get_forced_variation('group_exp_1', 'test_user_2').key, 'group_exp_1_control')
-
-    # make sure the first user forced variations are still valid
-    self.assertEqual(self.project_config.get_forced_variation('test_experiment', 'test_user_1').key, 'control')
-    self.assertEqual(self.project_config.get_forced_variation('group_exp_1', 'test_user_1').key, 'group_exp_1_control')
-
-  def test_set_forced_variation_when_called_to_remove_forced_variation(self):
-    """ Test set_forced_variation when no variation is given. """
-    # Test case where both user and experiment are present in the forced variation map
-    self.project_config.forced_variation_map = {}
-    self.project_config.set_forced_variation('test_experiment', 'test_user', 'variation')
-
-    with mock.patch.object(self.project_config, 'logger') as mock_config_logging:
-      self.assertTrue(self.project_config.set_forced_variation('test_experiment', 'test_user', None))
-    mock_config_logging.debug.assert_called_once_with(
-      'Variation mapped to experiment "test_experiment" has been removed for user "test_user".'
+    mock_config_logging.assert_called_once_with(
+      'Built config for revision "43" from revision "1", reusing 5 of 6 experiments.'
     )
 
-    # Test case where user is present in the forced variation map, but the given experiment isn't
-    self.project_config.forced_variation_map = {}
-    self.project_config.set_forced_variation('test_experiment', 'test_user', 'variation')
-
-    with mock.patch.object(self.project_config, 'logger') as mock_config_logging:
-      self.assertTrue(self.project_config.set_forced_variation('group_exp_1', 'test_user', None))
-    mock_config_logging.debug.assert_called_once_with(
-      'Nothing to remove. Variation mapped to experiment "group_exp_1" for user "test_user" does not exist.'
-    )
+    # Changed experiment and the features using it are rebuilt
+    self.assertIsNot(previous_config.get_experiment_from_key('test_experiment'),
+                     new_config.get_experiment_from_key('test_experiment'))
+    self.assertEqual(4000, new_config.get_experiment_from_key('test_experiment').trafficAllocation[0]['endOfRange'])
+    self.assertIsNot(previous_config.get_variation_from_key('test_experiment', 'control'),
+                     new_config.get_variation_from_key('test_experiment', 'control'))
+    self.assertIsNot(previous_config.get_feature_from_key('test_feature_in_experiment'),
+                     new_config.get_feature_from_key('test_feature_in_experiment'))
+    self.assertIsNot(previous_config.get_feature_from_key('test_feature_in_experiment_and_rollout'),
+                     new_config.get_feature_from_key('test_feature_in_experiment_and_rollout'))
+
+    # Everything else is shared with the previous config
+    for experiment_key in ['group_exp_1', 'group_exp_2', '211127', '211137', '211147']:
+      self.assertIs(previous_config.get_experiment_from_key(experiment_key),
+                    new_config.get_experiment_from_key(experiment_key))
+      self.assertIs(previous_config.variation_key_map[experiment_key], new_config.variation_key_map[experiment_key])
+    self.assertIs(previous_config.get_group('19228'), new_config.get_group('19228'))
+    self.assertIs(previous_config.get_rollout_from_id('211111'), new_config.get_rollout_from_id('211111'))
+    self.assertIs(previous_config.get_event('test_event'), new_config.get_event('test_event'))
+    self.assertIs(previous_config.get_attribute_id('test_attribute'), new_config.get_attribute_id('test_attribute'))
+    self.assertIs(previous_config.get_audience('11154'), new_config.get_audience('11154'))
+    for feature_key in ['test_feature_in_rollout', 'test_feature_in_group']:
+      self.assertIs(previous_config.get_feature_from_key(feature_key), new_config.get_feature_from_key(feature_key))
+    self.assertEqual('19228', new_config.get_feature_from_key('test_feature_in_group').groupId)
+
+    # Result is the same as building from scratch
+    fresh_config = project_config.ProjectConfig(json.dumps(new_config_dict), logger.NoOpLogger(),
+                                                error_handler.NoOpErrorHandler)
+    for map_name in ['group_id_map', 'experiment_key_map', 'experiment_id_map', 'event_key_map', 'attribute_key_map',
+                     'audience_id_map', 'rollout_id_map', 'variation_key_map', 'variation_id_map',
+                     'variation_variable_usage_map', 'feature_key_map', 'variable_value_map',
+                     'variable_default_value_map']:
+      self.assertEqual(getattr(fresh_config, map_name), getattr(new_config, map_name))
+
+  def test_init__previous_config__rebuilds_changed_typed_audience(self):
+    """ Test that a changed typed audience is rebuilt and deserialized while unchanged ones are reused. """
+
+    previous_config = project_config.ProjectConfig(json.dumps(self.config_dict_with_typed_audiences),
+                                                   logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+    new_config_dict = copy.deepcopy(self.config_dict_with_typed_audiences)
+    changed_audience = new_config_dict['typedAudiences'][0]
+    changed_audience['conditions'] = ['and', {'name': 'house', 'type': 'custom_attribute',
+                                              'match': 'substring', 'value': 'Hufflepuff'}]
+
+    new_config = project_config.ProjectConfig(json.dumps(new_config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                              error_handler.NoOpErrorHandler, previous_config=previous_config)
+
+    new_audience = new_config.get_audience(changed_audience['id'])
+    self.assertIsNot(previous_config.get_audience(changed_audience['id']), new_audience)
+    self.assertEqual(['and', 0], new_audience.conditionStructure)
+    self.assertEqual([['house', 'Hufflepuff', 'custom_attribute', 'substring']], new_audience.conditionList)
+    for typed_audience in new_config_dict['typedAudiences'][1:]:
+      self.assertIs(previous_config.get_audience(typed_audience['id']), new_config.get_audience(typed_audience['id']))
+
+  def test_init__lazy__compiles_experiments_on_demand(self):
+    """ Test that in lazy mode experiments which are not running are only compiled once asked for. """
+
+    config_dict = copy.deepcopy(self.config_dict_with_features)
+    config_dict['experiments'][0]['status'] = 'Paused'
+    lazy_config = project_config.ProjectConfig(json.dumps(config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                               error_handler.NoOpErrorHandler, lazy=True)
+
+    self.assertNotIn('test_experiment', lazy_config.variation_key_map)
+    self.assertNotIn('test_experiment', lazy_config.variation_id_map)
+    self.assertIn('test_experiment', lazy_config._uncompiled_experiment_map)
+    # Running experiments and experiments of rollouts are compiled upfront
+    for experiment_key in ['group_exp_1', '211127', '211137']:
+      self.assertIn(experiment_key, lazy_config.variation_key_map)
+
+    self.assertEqual('111129', lazy_config.get_variation_from_key('test_experiment', 'variation').id)
+    self.assertEqual({}, lazy_config._uncompiled_experiment_map)
+    self.assertEqual(lazy_config.get_variation_from_key('test_experiment', 'control'),
+                     lazy_config.get_variation_from_id('test_experiment', '111128'))
+
+    full_config = project_config.ProjectConfig(json.dumps(config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                               error_handler.NoOpErrorHandler)
+    for map_name in ['variation_key_map', 'variation_id_map', 'variation_variable_usage_map']:
+      self.assertEqual(getattr(full_config, map_name), getattr(lazy_config, map_name))
+
+  def test_init__lazy__deserializes_unreferenced_audiences_on_demand(self):
+    """ Test that in lazy mode audiences not referenced by compiled experiments are deserialized once asked for. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    unused_audience = dict(config_dict['audiences'][0], id='99', name='Unused audience')
+    config_dict['audiences'].append(unused_audience)
+    lazy_config = project_config.ProjectConfig(json.dumps(config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                               error_handler.NoOpErrorHandler, lazy=True)
+
+    self.assertIsNotNone(lazy_config.audience_id_map['11154'].conditionList)
+    self.assertIsNone(lazy_config.audience_id_map['99'].conditionList)
+
+    audience = lazy_config.get_audience('99')
+    self.assertEqual(lazy_config.get_audience('11154').conditionStructure, audience.conditionStructure)
+    self.assertEqual(lazy_config.get_audience('11154').conditionList, audience.conditionList)
+
+  def test_materialize(self):
+    """ Test that materialize compiles everything a config in lazy mode left uncompiled. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['experiments'][0]['status'] = 'Paused'
+    config_dict['audiences'].append(dict(config_dict['audiences'][0], id='99', name='Unused audience'))
+    lazy_config = project_config.ProjectConfig(json.dumps(config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                               error_handler.NoOpErrorHandler, lazy=True)
+
+    lazy_config.materialize()
+
+    self.assertEqual({}, lazy_config._uncompiled_experiment_map)
+    self.assertIn('test_experiment', lazy_config.variation_key_map)
+    self.assertIsNotNone(lazy_config.audience_id_map['99'].conditionList)
+
+  def test_init__lazy_previous_config(self):
+    """ Test that building from a previous config in lazy mode compiles what the previous config left uncompiled. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['experiments'][0]['status'] = 'Paused'
+    previous_config = project_config.ProjectConfig(json.dumps(config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                                   error_handler.NoOpErrorHandler, lazy=True)
+    config_dict['revision'] = '43'
+
+    new_config = project_config.ProjectConfig(json.dumps(config_dict), logger.adapt_logger(logger.NoOpLogger()),
+                                              error_handler.NoOpErrorHandler, previous_config=previous_config)
+
+    self.assertEqual('control', new_config.get_variation_from_key('test_experiment', 'control').key)
+    self.assertNotIn('test_experiment', previous_config.variation_key_map)
+
+  def test_get_datafile_revision(self):
+    """ Test that the revision of a datafile is read, even with strings quoting members named revision. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['events'][0]['key'] = '"revision": "7"'
+
+    self.assertEqual('42', project_config.get_datafile_revision(json.dumps(config_dict)))
+    self.assertEqual('42', project_config.get_datafile_revision(json.dumps(config_dict).encode('utf-8')))
+    self.assertEqual('42', project_config.get_datafile_revision(json.dumps({'revision': '42', 'x': {'revision': '7'}})))
+    self.assertIsNone(project_config.get_datafile_revision(json.dumps({'projectId': '111001'})))
+    self.assertIsNone(project_config.get_datafile_revision('invalid datafile'))
+    self.assertIsNone(project_config.get_datafile_revision(None))
 
 
 class ConfigLoggingTest(base.BaseTest):
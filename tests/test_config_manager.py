@@ -0,0 +1,483 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import gzip
+import io
+import json
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import time
+from six.moves import BaseHTTPServer
+
+from optimizely import config_manager
+from optimizely import exceptions
+from optimizely import optimizely
+from optimizely import project_config
+
+from . import base
+
+
+class StaticConfigManagerTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self, 'config_dict_with_features')
+    self.new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    self.new_config_dict['revision'] = '2'
+    self.new_config_dict['events'][0]['experimentIds'] = []
+    self.manager = config_manager.StaticConfigManager(json.dumps(self.config_dict_with_features))
+
+  def test_init(self):
+    """ Test that a config is built from the given datafile. """
+
+    self.assertIsInstance(self.manager.get_config(), project_config.ProjectConfig)
+    self.assertEqual('1', self.manager.get_config().get_revision())
+
+  def test_init__no_datafile(self):
+    """ Test that no config is available if no datafile is given. """
+
+    self.assertIsNone(config_manager.StaticConfigManager().get_config())
+
+  def test_set_datafile(self):
+    """ Test that a config with a new revision is published, reusing unchanged entities of the previous config. """
+
+    previous_config = self.manager.get_config()
+    self.assertStrictTrue(self.manager.set_datafile(json.dumps(self.new_config_dict)))
+
+    new_config = self.manager.get_config()
+    self.assertEqual('2', new_config.get_revision())
+    self.assertEqual([], new_config.get_event('test_event').experimentIds)
+    self.assertIs(previous_config.get_experiment_from_key('test_experiment'),
+                  new_config.get_experiment_from_key('test_experiment'))
+
+  def test_set_datafile__timings(self):
+    """ Test that the datafile is parsed once and the parse stage is timed on parsing it. """
+
+    parse = json.loads
+    datafile = json.dumps(self.new_config_dict)
+
+    def slow_parse(document, *args, **kwargs):
+      if document == datafile:
+        time.sleep(0.05)
+      return parse(document, *args, **kwargs)
+
+    with mock.patch('json.loads', side_effect=slow_parse) as mock_parse:
+      self.assertStrictTrue(self.manager.set_datafile(datafile))
+
+    self.assertEqual(1, [call[0][0] for call in mock_parse.call_args_list].count(datafile))
+    self.assertEqual(['build', 'parse', 'validate'], sorted(self.manager.last_update_timings.keys()))
+    self.assertGreaterEqual(self.manager.last_update_timings['parse'], 50)
+    self.assertLess(self.manager.last_update_timings['build'], 50)
+
+  def test_set_datafile__same_revision(self):
+    """ Test that a config with the revision already in use is not published. """
+
+    previous_config = self.manager.get_config()
+    with mock.patch.object(self.manager, 'logger') as mock_manager_logging:
+      self.assertStrictFalse(self.manager.set_datafile(json.dumps(self.config_dict_with_features)))
+
+    self.assertIs(previous_config, self.manager.get_config())
+    mock_manager_logging.debug.assert_called_once_with('Config revision "1" is already in use. Not updating config.')
+
+  def test_set_datafile__concurrent_same_revision(self):
+    """ Test that concurrent updates to the same new revision build a single config. """
+
+    build_config = project_config.ProjectConfig
+
+    def slow_build_config(*args, **kwargs):
+      time.sleep(0.05)
+      return build_config(*args, **kwargs)
+
+    datafile = json.dumps(self.new_config_dict)
+    with mock.patch('optimizely.project_config.ProjectConfig', side_effect=slow_build_config) as mock_config:
+      threads = [threading.Thread(target=self.manager.set_datafile, args=(datafile,)) for _ in range(2)]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+
+    self.assertEqual(1, mock_config.call_count)
+    self.assertEqual('2', self.manager.get_config().get_revision())
+
+  def test_set_datafile__invalid_datafile(self):
+    """ Test that an invalid datafile is logged and handled, keeping the previous config. """
+
+    previous_config = self.manager.get_config()
+    with mock.patch.object(self.manager, 'logger') as mock_manager_logging, \
+            mock.patch.object(self.manager, 'error_handler') as mock_error_handler:
+      self.assertStrictFalse(self.manager.set_datafile('invalid_datafile'))
+
+    self.assertIs(previous_config, self.manager.get_config())
+    mock_manager_logging.error.assert_called_once_with('Provided "datafile" is in an invalid format.')
+    self.assertIsInstance(mock_error_handler.handle_error.call_args[0][0], exceptions.InvalidInputException)
+
+  def test_set_datafile__unsupported_version(self):
+    """ Test that a datafile of an unsupported version is logged and handled, keeping the previous config. """
+
+    manager = config_manager.StaticConfigManager(json.dumps(self.config_dict_with_features),
+                                                 skip_json_validation=True)
+    previous_config = manager.get_config()
+    with mock.patch.object(manager, 'logger') as mock_manager_logging, \
+            mock.patch.object(manager, 'error_handler') as mock_error_handler:
+      self.assertStrictFalse(manager.set_datafile(json.dumps(self.config_dict_with_unsupported_version)))
+
+    self.assertIs(previous_config, manager.get_config())
+    mock_manager_logging.error.assert_called_once_with('This version of the Python SDK does not support the given '
+                                                       'datafile version: "5".')
+    self.assertIsInstance(mock_error_handler.handle_error.call_args[0][0],
+                          exceptions.UnsupportedDatafileVersionException)
+
+  def test_set_config(self):
+    """ Test that an already built config is published. """
+
+    new_config = project_config.ProjectConfig(json.dumps(self.new_config_dict), self.manager.logger,
+                                              self.manager.error_handler)
+    self.assertStrictTrue(self.manager.set_config(new_config))
+    self.assertIs(new_config, self.manager.get_config())
+
+  def test_add_config_listener(self):
+    """ Test that listeners are called with the current config and every config published later on. """
+
+    listener = mock.MagicMock()
+    self.manager.add_config_listener(listener)
+    self.manager.add_config_listener(listener)
+    listener.assert_called_once_with(self.manager.get_config())
+
+    self.manager.set_datafile(json.dumps(self.new_config_dict))
+    self.assertEqual(2, listener.call_count)
+    listener.assert_called_with(self.manager.get_config())
+
+  def test_add_config_listener__no_config(self):
+    """ Test that listeners are only called once a config is published if there is none yet. """
+
+    manager = config_manager.StaticConfigManager()
+    listener = mock.MagicMock()
+    manager.add_config_listener(listener)
+    self.assertEqual(0, listener.call_count)
+
+    manager.set_datafile(json.dumps(self.new_config_dict))
+    listener.assert_called_once_with(manager.get_config())
+
+  def test_remove_config_listener(self):
+    """ Test that removed listeners are no longer called. """
+
+    listener = mock.MagicMock()
+    self.manager.add_config_listener(listener)
+    self.manager.remove_config_listener(listener)
+    self.manager.set_datafile(json.dumps(self.new_config_dict))
+
+    self.assertEqual(1, listener.call_count)
+
+  def test_add_config_listener__calls_back_into_manager(self):
+    """ Test that listeners may publish configs and add listeners while being called, without deadlocking. """
+
+    other_listener = mock.MagicMock()
+
+    def listener(config):
+      if config.get_revision() == '1':
+        self.manager.add_config_listener(other_listener)
+        self.manager.set_datafile(json.dumps(self.new_config_dict))
+
+    thread = threading.Thread(target=self.manager.add_config_listener, args=(listener,))
+    thread.daemon = True
+    thread.start()
+    thread.join(5)
+
+    self.assertFalse(thread.is_alive())
+    self.assertEqual('2', self.manager.get_config().get_revision())
+    other_listener.assert_called_with(self.manager.get_config())
+
+  def test_set_datafile__listener_exception(self):
+    """ Test that a listener raising an exception is logged and does not keep other listeners from being called. """
+
+    failing_listener = mock.MagicMock()
+    listener = mock.MagicMock()
+    self.manager.add_config_listener(failing_listener)
+    self.manager.add_config_listener(listener)
+    failing_listener.side_effect = Exception('Failed')
+
+    with mock.patch.object(self.manager, 'logger') as mock_manager_logging:
+      self.assertStrictTrue(self.manager.set_datafile(json.dumps(self.new_config_dict)))
+
+    mock_manager_logging.exception.assert_called_once_with('Problem calling config listener.')
+    listener.assert_called_with(self.manager.get_config())
+
+
+class FileConfigManagerTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self, 'config_dict_with_features')
+    self.datafile_dir = tempfile.mkdtemp()
+    self.datafile_path = os.path.join(self.datafile_dir, 'datafile.json')
+    self.write_datafile(self.config_dict_with_features)
+    self.managers = []
+
+  def tearDown(self):
+    for manager in self.managers:
+      manager.stop()
+    shutil.rmtree(self.datafile_dir)
+
+  def write_datafile(self, config_dict):
+    """ Replace the datafile the way distribution agents do, by renaming a new file over it. """
+
+    temp_path = os.path.join(self.datafile_dir, 'datafile.json.tmp')
+    with open(temp_path, 'w') as datafile:
+      datafile.write(json.dumps(config_dict))
+    os.rename(temp_path, self.datafile_path)
+
+  def create_manager(self, poll_interval=3600, **kwargs):
+    manager = config_manager.FileConfigManager(self.datafile_path, poll_interval=poll_interval, **kwargs)
+    self.managers.append(manager)
+    return manager
+
+  def test_init(self):
+    """ Test that the datafile is loaded on init. """
+
+    manager = self.create_manager()
+    self.assertEqual('1', manager.get_config().get_revision())
+
+  def test_init__invalid_poll_interval(self):
+    """ Test that an invalid poll interval is logged and replaced by the default. """
+
+    mock_logger = mock.MagicMock()
+    manager = self.create_manager(poll_interval=-1, logger=mock_logger)
+
+    self.assertEqual(1, manager.poll_interval)
+    mock_logger.warning.assert_called_once_with('Invalid interval -1. Defaulting to 1 seconds.')
+
+  def test_check_for_update__file_replaced(self):
+    """ Test that a replaced datafile with a new revision is published. """
+
+    manager = self.create_manager()
+    new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    new_config_dict['revision'] = '2'
+    self.write_datafile(new_config_dict)
+
+    self.assertStrictTrue(manager.check_for_update())
+    self.assertEqual('2', manager.get_config().get_revision())
+
+  def test_check_for_update__file_unchanged(self):
+    """ Test that an unchanged datafile is not read again. """
+
+    manager = self.create_manager()
+    with mock.patch.object(manager, 'set_datafile') as mock_set_datafile:
+      self.assertStrictFalse(manager.check_for_update())
+
+    self.assertEqual(0, mock_set_datafile.call_count)
+
+  def test_check_for_update__same_revision(self):
+    """ Test that no config is built if a rewritten datafile has the revision already in use. """
+
+    manager = self.create_manager()
+    config = manager.get_config()
+    new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    new_config_dict['experiments'][0]['status'] = 'Paused'
+    self.write_datafile(new_config_dict)
+
+    with mock.patch('optimizely.project_config.ProjectConfig') as mock_project_config:
+      self.assertStrictFalse(manager.check_for_update())
+
+    self.assertEqual(0, mock_project_config.call_count)
+    self.assertIs(config, manager.get_config())
+
+  def test_check_for_update__missing_file(self):
+    """ Test that a missing datafile is logged and the config in use is kept. """
+
+    mock_logger = mock.MagicMock()
+    manager = self.create_manager(logger=mock_logger)
+    config = manager.get_config()
+    os.remove(self.datafile_path)
+
+    self.assertStrictFalse(manager.check_for_update())
+    self.assertIs(config, manager.get_config())
+    self.assertTrue(mock_logger.error.call_args[0][0].startswith(
+      'Unable to read datafile "%s": ' % self.datafile_path
+    ))
+
+  def test_background_reload(self):
+    """ Test that the datafile is reloaded from the background thread and the client is updated. """
+
+    manager = self.create_manager(poll_interval=0.01)
+    opt_obj = optimizely.Optimizely(config_manager=manager)
+    new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    new_config_dict['revision'] = '2'
+    self.write_datafile(new_config_dict)
+
+    deadline = time.time() + 5
+    while opt_obj.config.get_revision() != '2' and time.time() < deadline:
+      time.sleep(0.01)
+
+    self.assertEqual('2', opt_obj.config.get_revision())
+
+  def test_stop(self):
+    """ Test that the datafile is no longer watched once stopped. """
+
+    manager = self.create_manager(poll_interval=0.01)
+    manager.stop()
+    self.assertFalse(manager._thread.is_alive())
+
+
+class DatafileRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  """ Request handler standing in for the datafile CDN. Serves the server's datafile, gzipped if accepted. """
+
+  def do_GET(self):
+    self.server.requests.append(dict(self.headers.items()))
+    if self.server.status != 200:
+      self.send_response(self.server.status)
+      self.end_headers()
+      return
+
+    if self.headers.get('If-None-Match') == self.server.etag:
+      self.send_response(304)
+      self.end_headers()
+      return
+
+    body = self.server.datafile.encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('ETag', self.server.etag)
+    self.send_header('Last-Modified', 'Mon, 01 Oct 2018 00:00:00 GMT')
+    if 'gzip' in self.headers.get('Accept-Encoding', ''):
+      compressed = io.BytesIO()
+      with gzip.GzipFile(fileobj=compressed, mode='wb') as gzip_file:
+        gzip_file.write(body)
+      body = compressed.getvalue()
+      self.send_header('Content-Encoding', 'gzip')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):
+    pass
+
+
+class PollingConfigManagerTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self, 'config_dict_with_features')
+    self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), DatafileRequestHandler)
+    self.server.requests = []
+    self.server.status = 200
+    self.set_server_datafile(self.config_dict_with_features)
+    self.server_thread = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+    self.server_thread.daemon = True
+    self.server_thread.start()
+    self.url = 'http://127.0.0.1:%d/datafile.json' % self.server.server_address[1]
+    self.cache_dir = tempfile.mkdtemp()
+    self.managers = []
+
+  def tearDown(self):
+    for manager in self.managers:
+      manager.stop()
+    self.server.shutdown()
+    self.server.server_close()
+    shutil.rmtree(self.cache_dir)
+
+  def set_server_datafile(self, config_dict):
+    self.server.datafile = json.dumps(config_dict)
+    self.server.etag = '"%s"' % config_dict['revision']
+
+  def create_manager(self, wait_for_first_request=True, **kwargs):
+    """ Create a manager which does not poll again during the test. """
+
+    manager = config_manager.PollingConfigManager(url=kwargs.pop('url', self.url), update_interval=3600, **kwargs)
+    self.managers.append(manager)
+    deadline = time.time() + 5
+    while wait_for_first_request and not manager.last_update_timings and time.time() < deadline:
+      time.sleep(0.01)
+    return manager
+
+  def test_init__no_sdk_key_or_url(self):
+    """ Test that an exception is raised if neither SDK key nor URL are given. """
+
+    self.assertRaisesRegexp(exceptions.InvalidInputException, 'Provided "sdk_key or url" is in an invalid format.',
+                            config_manager.PollingConfigManager)
+
+  def test_init__sdk_key(self):
+    """ Test that the datafile URL is derived from the SDK key. """
+
+    with mock.patch('optimizely.config_manager.PollingConfigManager._start'):
+      manager = config_manager.PollingConfigManager(sdk_key='some_key')
+
+    self.assertEqual('https://cdn.optimizely.com/datafiles/some_key.json', manager.url)
+
+  def test_init__fetches_datafile(self):
+    """ Test that the datafile is fetched right away in the background, accepting gzip, and timings are recorded. """
+
+    manager = self.create_manager()
+
+    self.assertEqual('1', manager.get_config().get_revision())
+    self.assertEqual(1, len(self.server.requests))
+    self.assertEqual('gzip', self.server.requests[0]['Accept-Encoding'])
+    self.assertEqual(['build', 'fetch', 'parse', 'validate'], sorted(manager.last_update_timings.keys()))
+
+  def test_check_for_update__conditional_requests(self):
+    """ Test that requests are conditional on the last response and only modified datafiles are published. """
+
+    manager = self.create_manager()
+    config = manager.get_config()
+
+    self.assertStrictFalse(manager.check_for_update())
+    self.assertIs(config, manager.get_config())
+    self.assertEqual('"1"', self.server.requests[1]['If-None-Match'])
+    self.assertEqual('Mon, 01 Oct 2018 00:00:00 GMT', self.server.requests[1]['If-Modified-Since'])
+
+    new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    new_config_dict['revision'] = '2'
+    self.set_server_datafile(new_config_dict)
+    self.assertStrictTrue(manager.check_for_update())
+    self.assertEqual('2', manager.get_config().get_revision())
+
+  def test_check_for_update__invalid_datafile_fetched_again(self):
+    """ Test that requests are not made conditional on a datafile which could not be published. """
+
+    manager = self.create_manager()
+    self.server.datafile = 'invalid datafile'
+    self.server.etag = '"invalid"'
+
+    self.assertStrictFalse(manager.check_for_update())
+    self.assertStrictFalse(manager.check_for_update())
+    self.assertEqual('"1"', self.server.requests[2]['If-None-Match'])
+
+    new_config_dict = copy.deepcopy(self.config_dict_with_features)
+    new_config_dict['revision'] = '2'
+    self.set_server_datafile(new_config_dict)
+    self.assertStrictTrue(manager.check_for_update())
+    self.assertEqual('2', manager.get_config().get_revision())
+
+  def test_check_for_update__server_error(self):
+    """ Test that a failed request is logged and the config in use is kept. """
+
+    mock_logger = mock.MagicMock()
+    manager = self.create_manager(logger=mock_logger)
+    config = manager.get_config()
+    self.server.status = 500
+
+    self.assertStrictFalse(manager.check_for_update())
+    self.assertIs(config, manager.get_config())
+    self.assertTrue(mock_logger.error.call_args[0][0].startswith('Fetching datafile from %s failed.' % self.url))
+
+  def test_cache(self):
+    """ Test that the last good datafile is cached and used on start before any request completes. """
+
+    cache_path = os.path.join(self.cache_dir, 'datafile.json')
+    self.create_manager(cache_path=cache_path)
+    with open(cache_path) as cache_file:
+      self.assertEqual(self.server.datafile, cache_file.read())
+
+    self.server.status = 500
+    manager = self.create_manager(wait_for_first_request=False, cache_path=cache_path)
+    self.assertEqual('1', manager.get_config().get_revision())
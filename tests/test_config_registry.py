@@ -0,0 +1,91 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import json
+import mock
+
+from optimizely import config_registry
+from optimizely import error_handler
+from optimizely import logger
+from optimizely import optimizely
+from optimizely import project_config
+
+from . import base
+
+
+class ConfigRegistryTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    # Registry state must not leak in from other tests
+    gc.collect()
+    self.datafile = json.dumps(self.config_dict)
+
+  def test_get_project_config__same_datafile(self):
+    """ Test that configs for the same datafile share data, are frozen and keep their own logger. """
+
+    first_logger = logger.adapt_logger(logger.SimpleLogger())
+    second_logger = logger.adapt_logger(logger.NoOpLogger())
+    with mock.patch('optimizely.project_config.ProjectConfig', wraps=project_config.ProjectConfig) as mock_config:
+      first_config = config_registry.get_project_config(self.datafile, first_logger, error_handler.NoOpErrorHandler)
+      second_config = config_registry.get_project_config(self.datafile, second_logger,
+                                                         error_handler.RaiseExceptionErrorHandler)
+
+    self.assertEqual(1, mock_config.call_count)
+    self.assertIsNot(first_config, second_config)
+    self.assertIs(first_config.experiment_key_map, second_config.experiment_key_map)
+    self.assertIs(first_logger, first_config.logger)
+    self.assertIs(second_logger, second_config.logger)
+    self.assertIs(error_handler.RaiseExceptionErrorHandler, second_config.error_handler)
+    self.assertTrue(first_config.is_frozen())
+    self.assertTrue(second_config.is_frozen())
+
+  def test_get_project_config__different_datafile(self):
+    """ Test that configs for different datafiles do not share data. """
+
+    other_config_dict = dict(self.config_dict, revision='43')
+    first_config = config_registry.get_project_config(self.datafile, logger.adapt_logger(logger.NoOpLogger()),
+                                                      error_handler.NoOpErrorHandler)
+    second_config = config_registry.get_project_config(json.dumps(other_config_dict),
+                                                       logger.adapt_logger(logger.NoOpLogger()),
+                                                       error_handler.NoOpErrorHandler)
+
+    self.assertIsNot(first_config.experiment_key_map, second_config.experiment_key_map)
+    self.assertEqual('43', second_config.get_revision())
+
+  def test_get_project_config__config_released(self):
+    """ Test that a datafile is parsed again once no config sharing its data is referenced anymore. """
+
+    config = config_registry.get_project_config(self.datafile, logger.adapt_logger(logger.NoOpLogger()),
+                                                error_handler.NoOpErrorHandler)
+    del config
+    gc.collect()
+
+    with mock.patch('optimizely.project_config.ProjectConfig', wraps=project_config.ProjectConfig) as mock_config:
+      config_registry.get_project_config(self.datafile, logger.adapt_logger(logger.NoOpLogger()),
+                                         error_handler.NoOpErrorHandler)
+
+    self.assertEqual(1, mock_config.call_count)
+
+  def test_optimizely__share_config(self):
+    """ Test that clients created with share_config share config data and others do not. """
+
+    first_client = optimizely.Optimizely(self.datafile, share_config=True)
+    second_client = optimizely.Optimizely(self.datafile, logger=logger.SimpleLogger(), share_config=True)
+    unshared_client = optimizely.Optimizely(self.datafile)
+
+    self.assertIs(first_client.config.experiment_key_map, second_client.config.experiment_key_map)
+    self.assertIsNot(first_client.config.experiment_key_map, unshared_client.config.experiment_key_map)
+    self.assertIs(second_client.logger, second_client.config.logger)
+    self.assertEqual('control', second_client.get_variation('test_experiment', 'user_1'))
@@ -0,0 +1,160 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+import os
+import shutil
+import tempfile
+
+from optimizely import config_snapshot
+from optimizely import error_handler
+from optimizely import exceptions
+from optimizely import logger
+from optimizely import optimizely
+
+from . import base
+
+
+class ConfigSnapshotTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self, 'config_dict_with_features')
+    self.snapshot_dir = tempfile.mkdtemp()
+    self.snapshot_path = config_snapshot.get_snapshot_path(self.snapshot_dir, self.project_config.revision)
+
+  def tearDown(self):
+    shutil.rmtree(self.snapshot_dir)
+
+  def test_get_snapshot_path(self):
+    """ Test that snapshot path is keyed by revision. """
+
+    self.assertEqual(os.path.join('/tmp', 'optimizely-config-42.snapshot'),
+                     config_snapshot.get_snapshot_path('/tmp', '42'))
+
+  def test_dump_and_load(self):
+    """ Test that a restored config is equivalent to the config it was compiled from. """
+
+    config_snapshot.dump(self.project_config, self.snapshot_path)
+    restored_logger = logger.NoOpLogger()
+    restored_config = config_snapshot.load(self.snapshot_path, restored_logger, error_handler.NoOpErrorHandler,
+                                           revision=self.project_config.revision)
+
+    self.assertEqual(restored_logger, restored_config.logger)
+    self.assertEqual(error_handler.NoOpErrorHandler, restored_config.error_handler)
+    self.assertEqual(self.project_config.experiment_key_map, restored_config.experiment_key_map)
+    self.assertEqual(self.project_config.variation_id_map, restored_config.variation_id_map)
+    self.assertEqual(self.project_config.audience_id_map, restored_config.audience_id_map)
+    self.assertEqual(self.project_config.feature_key_map, restored_config.feature_key_map)
+    self.assertEqual(self.project_config.rollout_id_map, restored_config.rollout_id_map)
+
+    # Entities shared between maps stay shared after restoring
+    experiment = restored_config.get_experiment_from_key('test_experiment')
+    self.assertIs(experiment, restored_config.get_experiment_from_id(experiment.id))
+
+  def test_dump__does_not_serialize_logger(self):
+    """ Test that logger and error handler of the compiling process are not part of the snapshot. """
+
+    config_snapshot.dump(self.project_config, self.snapshot_path)
+    self.assertIsNotNone(self.project_config.logger)
+
+    with open(self.snapshot_path, 'rb') as snapshot_file:
+      self.assertNotIn(b'NoOpLogger', snapshot_file.read())
+
+  def test_load__revision_mismatch(self):
+    """ Test that loading a snapshot compiled from another revision raises. """
+
+    config_snapshot.dump(self.project_config, self.snapshot_path)
+
+    with self.assertRaisesRegexp(exceptions.InvalidConfigSnapshotException, 'compiled from revision 1'):
+      config_snapshot.load(self.snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler, revision='43')
+
+  def test_load__sdk_version_mismatch(self):
+    """ Test that loading a snapshot compiled by another SDK version raises. """
+
+    with mock.patch('optimizely.version.__version__', '0.0.1'):
+      config_snapshot.dump(self.project_config, self.snapshot_path)
+
+    with self.assertRaisesRegexp(exceptions.InvalidConfigSnapshotException, 'compiled by SDK version 0.0.1'):
+      config_snapshot.load(self.snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+  def test_load__invalid_file(self):
+    """ Test that loading a missing, empty or corrupt file raises. """
+
+    with self.assertRaises(exceptions.InvalidConfigSnapshotException):
+      config_snapshot.load(self.snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+    open(self.snapshot_path, 'wb').close()
+    with self.assertRaises(exceptions.InvalidConfigSnapshotException):
+      config_snapshot.load(self.snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+    with open(self.snapshot_path, 'wb') as snapshot_file:
+      snapshot_file.write(b'not a snapshot at all')
+    with self.assertRaisesRegexp(exceptions.InvalidConfigSnapshotException, 'unsupported snapshot format'):
+      config_snapshot.load(self.snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+    config_snapshot.dump(self.project_config, self.snapshot_path)
+    with open(self.snapshot_path, 'rb') as snapshot_file:
+      truncated = snapshot_file.read()[:-20]
+    with open(self.snapshot_path, 'wb') as snapshot_file:
+      snapshot_file.write(truncated)
+    with self.assertRaises(exceptions.InvalidConfigSnapshotException):
+      config_snapshot.load(self.snapshot_path, logger.NoOpLogger(), error_handler.NoOpErrorHandler)
+
+  def test_optimizely__init_from_snapshot(self):
+    """ Test that Optimizely restores its config from a snapshot without validating or parsing the datafile. """
+
+    config_snapshot.dump(self.project_config, self.snapshot_path)
+
+    with mock.patch('optimizely.helpers.validator.is_datafile_valid') as mock_datafile_validation, \
+         mock.patch('optimizely.project_config.ProjectConfig.__init__') as mock_config_init:
+      opt_obj = optimizely.Optimizely(None, config_snapshot=self.snapshot_path)
+
+    self.assertTrue(opt_obj.is_valid)
+    self.assertEqual(0, mock_datafile_validation.call_count)
+    self.assertEqual(0, mock_config_init.call_count)
+    self.assertEqual(opt_obj.logger, opt_obj.config.logger)
+    self.assertIs(opt_obj.config, opt_obj.decision_service.config)
+    self.assertIs(opt_obj.config, opt_obj.event_builder.config)
+    self.assertEqual('control', opt_obj.get_variation('test_experiment', 'test_user'))
+
+  def test_optimizely__init_from_invalid_snapshot(self):
+    """ Test that Optimizely falls back to the datafile if the snapshot can not be restored. """
+
+    client_logger = logger.NoOpLogger().logger
+    with mock.patch.object(client_logger, 'warning') as mock_client_warning:
+      opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                      logger=client_logger,
+                                      config_snapshot=self.snapshot_path)
+
+    self.assertTrue(opt_obj.is_valid)
+    self.assertEqual(self.project_config.experiment_key_map, opt_obj.config.experiment_key_map)
+    self.assertEqual(1, mock_client_warning.call_count)
+    self.assertIn('Falling back to datafile.', mock_client_warning.call_args[0][0])
+
+  def test_optimizely__init_from_snapshot_of_other_revision(self):
+    """ Test that Optimizely falls back to the datafile if the snapshot was compiled from another revision. """
+
+    config_snapshot.dump(self.project_config, self.snapshot_path)
+    newer_config_dict = dict(self.config_dict_with_features, revision='99')
+
+    client_logger = logger.NoOpLogger().logger
+    with mock.patch.object(client_logger, 'warning') as mock_client_warning:
+      opt_obj = optimizely.Optimizely(json.dumps(newer_config_dict),
+                                      logger=client_logger,
+                                      config_snapshot=self.snapshot_path)
+
+    self.assertTrue(opt_obj.is_valid)
+    self.assertEqual('99', opt_obj.config.get_revision())
+    self.assertEqual(1, mock_client_warning.call_count)
+    self.assertIn('Falling back to datafile.', mock_client_warning.call_args[0][0])
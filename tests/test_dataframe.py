@@ -0,0 +1,134 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+import unittest
+
+from optimizely import dataframe
+from optimizely import optimizely
+from optimizely.helpers import enums
+
+from . import base
+
+
+class DataFrameTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict))
+    self.user_ids = ['test_user_%s' % idx for idx in range(6)] + ['user_1']
+    self.test_attribute = ['test_value_1', 'test_value_2', None, 'test_value_1', float('nan'), 'test_value_1',
+                           'test_value_2']
+
+  def _get_expected(self, experiment_key):
+    """ Helper method to get the variations get_variation buckets the users into. """
+
+    expected = []
+    for user_id, test_attribute in zip(self.user_ids, self.test_attribute):
+      attributes = {'test_attribute': test_attribute} if test_attribute in ('test_value_1', 'test_value_2') else {}
+      expected.append(self.optimizely.get_variation(experiment_key, user_id, attributes))
+    return expected
+
+  def test_get_users(self):
+    """ Test that missing values are left out of the attributes of the users. """
+
+    self.assertEqual([('user_1', {'test_attribute': 'test_value_1', 'boolean_key': False}),
+                      ('user_2', {}),
+                      ('user_3', {'boolean_key': True})],
+                     dataframe.get_users(['user_1', 'user_2', 'user_3'],
+                                         {'test_attribute': ['test_value_1', None, float('nan')],
+                                          'boolean_key': [False, None, True]}))
+
+  def test_assign_variations_to_users(self):
+    """ Test that users are assigned the variations get_variation buckets them into. """
+
+    users = dataframe.get_users(self.user_ids, {'test_attribute': self.test_attribute})
+    with mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      columns = dataframe.assign_variations_to_users(self.optimizely, users + [(None, None)],
+                                                     ['test_experiment', 'group_exp_1', 'unknown_experiment'])
+
+    self.assertEqual(self._get_expected('test_experiment') + [None], columns['test_experiment'])
+    self.assertEqual(self._get_expected('group_exp_1') + [None], columns['group_exp_1'])
+    self.assertEqual([None] * 8, columns['unknown_experiment'])
+    self.assertEqual('control', columns['test_experiment'][-2])
+    self.assertEqual(0, mock_dispatch_event.call_count)
+
+  def test_assign_variations_to_users__user_profiles_looked_up_once(self):
+    """ Test that user profiles are looked up once for all experiments and saved once. """
+
+    user_profile_service = mock.Mock(spec=['lookup', 'lookup_many', 'save'], lookup_many=mock.Mock(return_value={}))
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict), user_profile_service=user_profile_service)
+    variation = opt_obj.config.get_variation_from_key('test_experiment', 'variation')
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=variation):
+      dataframe.assign_variations_to_users(opt_obj, [('test_user', {'test_attribute': 'test_value_1'})],
+                                           ['test_experiment', 'group_exp_1'])
+
+    user_profile_service.lookup_many.assert_called_once_with(['test_user'])
+    self.assertEqual(1, user_profile_service.save.call_count)
+
+  def test_assign_variations__unsupported(self):
+    """ Test that assign_variations returns None for objects other than DataFrames and tables. """
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertIsNone(dataframe.assign_variations(self.optimizely, [{'user_id': 'test_user'}], 'user_id', [],
+                                                    ['test_experiment']))
+
+    mock_client_logging.error.assert_called_once_with(enums.Errors.INVALID_INPUT_ERROR.format('df'))
+
+  @unittest.skipIf(dataframe.pandas is None, 'pandas is not installed.')
+  def test_assign_variations__pandas(self):
+    """ Test that assign_variations returns a DataFrame of variation keys with the index of the given one. """
+
+    df = dataframe.pandas.DataFrame({'id': self.user_ids, 'test_attribute': self.test_attribute},
+                                    index=range(10, 10 + len(self.user_ids)))
+
+    result = dataframe.assign_variations(self.optimizely, df, 'id', ['test_attribute'],
+                                         ['test_experiment', 'group_exp_1'])
+
+    self.assertEqual(['test_experiment', 'group_exp_1'], list(result.columns))
+    self.assertEqual(list(df.index), list(result.index))
+    self.assertEqual(self._get_expected('test_experiment'), result['test_experiment'].tolist())
+    self.assertEqual(self._get_expected('group_exp_1'), result['group_exp_1'].tolist())
+
+  @unittest.skipIf(dataframe.pandas is None, 'pandas is not installed.')
+  def test_assign_variations__pandas_invalid_columns(self):
+    """ Test that assign_variations returns None for unknown columns. """
+
+    df = dataframe.pandas.DataFrame({'id': self.user_ids, 'test_attribute': self.test_attribute})
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertIsNone(dataframe.assign_variations(self.optimizely, df, 'user_id', [], ['test_experiment']))
+      self.assertIsNone(dataframe.assign_variations(self.optimizely, df, 'id', ['unknown'], ['test_experiment']))
+      self.assertIsNone(dataframe.assign_variations(self.optimizely, df, 'id', [], 'test_experiment'))
+
+    self.assertEqual([mock.call(enums.Errors.INVALID_INPUT_ERROR.format('user_id_col')),
+                      mock.call(enums.Errors.INVALID_INPUT_ERROR.format('attribute_cols')),
+                      mock.call(enums.Errors.INVALID_INPUT_ERROR.format('experiment_keys'))],
+                     mock_client_logging.error.call_args_list)
+
+  @unittest.skipIf(dataframe.pyarrow is None, 'pyarrow is not installed.')
+  def test_assign_variations__arrow(self):
+    """ Test that assign_variations returns a table of variation keys for a table. """
+
+    table = dataframe.pyarrow.Table.from_arrays(
+      [dataframe.pyarrow.array(self.user_ids),
+       dataframe.pyarrow.array([value if value == value else None for value in self.test_attribute])],
+      names=['id', 'test_attribute']
+    )
+
+    result = dataframe.assign_variations(self.optimizely, table, 'id', ['test_attribute'], ['test_experiment'])
+
+    self.assertEqual(['test_experiment'], result.column_names)
+    self.assertEqual(self._get_expected('test_experiment'), result.column('test_experiment').to_pylist())
@@ -0,0 +1,142 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import json
+import mock
+
+from optimizely import decision_service
+from optimizely import optimizely
+from optimizely import user_profile
+
+from . import base
+
+
+class DecisionAnalysisTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.config_dict = copy.deepcopy(self.config_dict_with_features)
+    # Every user is in variation "variation" of test_experiment
+    self.config_dict['experiments'][0]['trafficAllocation'] = [{'entityId': '111129', 'endOfRange': 10000}]
+    # First rule of the rollout takes every user
+    first_rule = self.config_dict['rollouts'][1]['experiments'][0]
+    first_rule['audienceIds'] = []
+    first_rule['trafficAllocation'] = [{'entityId': '211129', 'endOfRange': 10000}]
+
+  def _get_client(self, config_dict=None, **kwargs):
+    return optimizely.Optimizely(json.dumps(config_dict or self.config_dict), **kwargs)
+
+  def test_analysis(self):
+    """ Test that experiments, rollouts and features whose decisions do not depend on the user are found. """
+
+    config = self._get_client().config
+    analysis = config.decision_analysis
+
+    self.assertEqual(config.get_variation_from_key('test_experiment', 'variation'),
+                     analysis.experiment_variations['test_experiment'][1])
+    # Experiments in groups are not analyzed
+    self.assertNotIn('group_exp_1', analysis.experiment_variations)
+
+    self.assertEqual(
+      decision_service.Decision(config.get_experiment_from_key('211127'),
+                                config.get_variation_from_id('211127', '211129'),
+                                decision_service.DECISION_SOURCE_ROLLOUT),
+      analysis.rollout_decisions['211111'][1]
+    )
+
+    self.assertEqual(
+      decision_service.Decision(config.get_experiment_from_key('test_experiment'),
+                                config.get_variation_from_key('test_experiment', 'variation'),
+                                decision_service.DECISION_SOURCE_EXPERIMENT),
+      analysis.feature_decisions['test_feature_in_experiment'][1]
+    )
+    self.assertEqual(analysis.rollout_decisions['211111'][1],
+                     analysis.feature_decisions['test_feature_in_rollout'][1])
+
+    report = analysis.get_report()
+    self.assertEqual(
+      ['test_feature_in_experiment', 'test_feature_in_experiment_and_rollout', 'test_feature_in_rollout'],
+      report['features']
+    )
+    self.assertEqual(['201111', '211111'], report['rollouts'])
+    self.assertEqual(4, report['total_features'])
+
+  def test_analysis__user_dependent(self):
+    """ Test that decisions depending on audiences, traffic allocation or whitelisting are not considered constant. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['experiments'][0]['forcedVariations'] = {'test_user': 'control'}
+    config_dict['rollouts'][1]['experiments'][0]['trafficAllocation'][0]['endOfRange'] = 5000
+    analysis = self._get_client(config_dict).config.decision_analysis
+
+    self.assertNotIn('test_experiment', analysis.experiment_variations)
+    self.assertNotIn('211111', analysis.rollout_decisions)
+    self.assertEqual({}, analysis.feature_decisions)
+
+    analysis = self._get_client(self.config_dict_with_features).config.decision_analysis
+    self.assertNotIn('test_experiment', analysis.experiment_variations)
+    self.assertNotIn('211111', analysis.rollout_decisions)
+
+  def test_analysis__not_running(self):
+    """ Test that experiments which are not running give no variation to every user. """
+
+    config_dict = copy.deepcopy(self.config_dict_with_features)
+    config_dict['experiments'][0]['status'] = 'Paused'
+    config = self._get_client(config_dict).config
+
+    self.assertIsNone(config.decision_analysis.experiment_variations['test_experiment'][1])
+    self.assertEqual(
+      decision_service.Decision(config.get_experiment_from_key('test_experiment'), None,
+                                decision_service.DECISION_SOURCE_EXPERIMENT),
+      config.decision_analysis.feature_decisions['test_feature_in_experiment'][1]
+    )
+
+  def test_is_feature_enabled__constant_decision(self):
+    """ Test that constant decisions are returned without bucketing and match the bucketed decisions. """
+
+    opt_obj = self._get_client()
+    with mock.patch('optimizely.bucketer.Bucketer.bucket') as mock_bucket, \
+         mock.patch('optimizely.helpers.audience.is_user_in_experiment') as mock_audience_check:
+      for feature_key in ['test_feature_in_experiment', 'test_feature_in_rollout']:
+        constant_decision = opt_obj.decision_service.get_variation_for_feature(
+          opt_obj.config.get_feature_from_key(feature_key), 'test_user'
+        )
+        self.assertTrue(constant_decision.variation.featureEnabled)
+
+    self.assertEqual(0, mock_bucket.call_count)
+    self.assertEqual(0, mock_audience_check.call_count)
+
+    opt_obj.config.decision_analysis.feature_decisions.clear()
+    opt_obj.config.decision_analysis.experiment_variations.clear()
+    opt_obj.config.decision_analysis.rollout_decisions.clear()
+    for feature_key in ['test_feature_in_experiment', 'test_feature_in_rollout']:
+      feature = opt_obj.config.get_feature_from_key(feature_key)
+      self.assertEqual(
+        self._get_client().decision_service.get_variation_for_feature(feature, 'test_user'),
+        opt_obj.decision_service.get_variation_for_feature(feature, 'test_user')
+      )
+
+  def test_get_variation__forced_variation_or_user_profile(self):
+    """ Test that constant decisions of experiments do not apply once forced variations or stored decisions may. """
+
+    opt_obj = self._get_client()
+    self.assertTrue(opt_obj.set_forced_variation('test_experiment', 'test_user', 'control'))
+    self.assertEqual('control', opt_obj.get_variation('test_experiment', 'test_user'))
+    self.assertEqual('variation', opt_obj.get_variation('test_experiment', 'other_user'))
+
+    profile_service = user_profile.UserProfileService()
+    stored_profile = {'user_id': 'test_user', 'experiment_bucket_map': {'111127': {'variation_id': '111128'}}}
+    with mock.patch.object(profile_service, 'lookup', return_value=stored_profile):
+      opt_obj = self._get_client(user_profile_service=profile_service)
+      self.assertEqual('control', opt_obj.get_variation('test_experiment', 'test_user'))
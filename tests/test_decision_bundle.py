@@ -0,0 +1,223 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+import six
+import unittest
+
+from optimizely import decision_bundle
+from optimizely import decision_service
+from optimizely import optimizely
+from optimizely.helpers import enums
+
+from . import base
+
+
+class DecisionBundleTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    self.project_config = self.optimizely.config
+    self.attributes = {'test_attribute': 'test_value_1'}
+
+  def test_create_feature_decision(self):
+    """ Test that feature decisions hold the typed values of all variables for the variation decided on. """
+
+    feature = self.project_config.get_feature_from_key('test_feature_in_experiment')
+    experiment = self.project_config.get_experiment_from_key('test_experiment')
+    variation = self.project_config.get_variation_from_key('test_experiment', 'variation')
+
+    feature_decision = decision_bundle.create_feature_decision(
+      self.project_config, feature,
+      decision_service.Decision(experiment, variation, decision_service.DECISION_SOURCE_EXPERIMENT)
+    )
+
+    self.assertEqual('test_feature_in_experiment', feature_decision.feature_key)
+    self.assertTrue(feature_decision.enabled)
+    self.assertEqual('variation', feature_decision.variation_key)
+    self.assertEqual('test_experiment', feature_decision.experiment_key)
+    self.assertEqual(decision_service.DECISION_SOURCE_EXPERIMENT, feature_decision.source)
+    self.assertEqual(dict((variable_key, self.project_config.get_typed_variable_value(variable, variation))
+                          for variable_key, variable in feature.variables.items()),
+                     dict(feature_decision.variables))
+
+  def test_create_feature_decision__no_variation(self):
+    """ Test that features without a variation for the user are disabled with the default variable values. """
+
+    feature = self.project_config.get_feature_from_key('test_feature_in_experiment')
+    feature_decision = decision_bundle.create_feature_decision(
+      self.project_config, feature, decision_service.Decision(None, None, decision_service.DECISION_SOURCE_ROLLOUT)
+    )
+
+    self.assertFalse(feature_decision.enabled)
+    self.assertIsNone(feature_decision.variation_key)
+    self.assertIsNone(feature_decision.experiment_key)
+    self.assertEqual(dict((variable_key, self.project_config.get_typed_variable_value(variable))
+                          for variable_key, variable in feature.variables.items()),
+                     dict(feature_decision.variables))
+
+  def test_create_feature_variables(self):
+    """ Test that feature variables hold typed values with accessors checking their type. """
+
+    feature = self.project_config.get_feature_from_key('test_feature_in_experiment')
+    variation = self.project_config.get_variation_from_key('test_experiment', 'variation')
+    variables = decision_bundle.create_feature_variables(self.project_config, feature, variation)
+
+    self.assertEqual(dict((variable_key, self.project_config.get_typed_variable_value(variable, variation))
+                          for variable_key, variable in feature.variables.items()), variables)
+    self.assertEqual(variables['is_working'], variables.get_boolean('is_working'))
+    self.assertEqual(variables['cost'], variables.get_double('cost'))
+    self.assertEqual(variables['count'], variables.get_integer('count'))
+    self.assertEqual(variables['environment'], variables.get_string('environment'))
+    self.assertIsNone(variables.get_string('count'))
+    self.assertIsNone(variables.get_boolean('unknown_variable'))
+
+  @unittest.skipIf(six.PY2, 'Read-only mappings are not available on Python 2.')
+  def test_decide_all__immutable(self):
+    """ Test that bundles can not be modified. """
+
+    bundle = self.optimizely.decide_all('test_user', self.attributes)
+
+    with self.assertRaises(TypeError):
+      bundle.feature_decisions['test_feature_in_rollout'] = None
+    with self.assertRaises(TypeError):
+      bundle.feature_decisions['test_feature_in_experiment'].variables['count'] = 0
+    with self.assertRaises(AttributeError):
+      bundle.user_id = 'other_user'
+
+  def test_decide_all__same_as_separate_calls(self):
+    """ Test that decide_all decides as is_feature_enabled and get_feature_variable_* do. """
+
+    with mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'):
+      bundle = self.optimizely.decide_all('test_user', self.attributes)
+      enabled_features = self.optimizely.get_enabled_features('test_user', self.attributes)
+
+    self.assertEqual('test_user', bundle.user_id)
+    self.assertEqual(self.project_config.revision, bundle.revision)
+    self.assertEqual(set(self.project_config.feature_key_map.keys()), set(bundle.feature_decisions.keys()))
+    self.assertEqual(sorted(enabled_features), bundle.get_enabled_features())
+    self.assertEqual(self.optimizely.is_feature_enabled('test_feature_in_rollout', 'test_user', self.attributes),
+                     bundle.is_feature_enabled('test_feature_in_rollout'))
+    self.assertEqual(
+      self.optimizely.get_feature_variable_double('test_feature_in_experiment', 'cost', 'test_user', self.attributes),
+      bundle.get_feature_variable('test_feature_in_experiment', 'cost')
+    )
+    self.assertFalse(bundle.is_feature_enabled('unknown_feature'))
+    self.assertIsNone(bundle.get_feature_variable('test_feature_in_experiment', 'unknown_variable'))
+
+  def test_decide_all__each_feature_decided_once(self):
+    """ Test that each feature is decided once and impressions are dispatched together. """
+
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
+                    wraps=self.optimizely.decision_service.get_variation_for_feature) as mock_decision, \
+            mock.patch('optimizely.event_builder.EventBuilder.create_impression_event_batch',
+                       return_value=mock.Mock(url='url', params={})) as mock_create_event, \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event, \
+            mock.patch('optimizely.notification_center.NotificationCenter.send_notifications') as mock_broadcast:
+      bundle = self.optimizely.decide_all('test_user', self.attributes)
+
+    self.assertEqual(len(self.project_config.feature_key_map), mock_decision.call_count)
+    mock_dispatch_event.assert_called_once_with(mock_create_event.return_value)
+
+    # Both features going through test_experiment record an impression
+    impressions = mock_create_event.call_args[0][0]
+    experiment = self.project_config.get_experiment_from_key('test_experiment')
+    variation = self.project_config.get_variation_from_key(
+      'test_experiment', bundle.feature_decisions['test_feature_in_experiment'].variation_key
+    )
+    self.assertEqual([(experiment, variation.id, 'test_user', self.attributes)] * 2, impressions)
+    self.assertEqual([mock.call(enums.NotificationTypes.ACTIVATE, experiment, 'test_user', self.attributes,
+                                variation, mock_create_event.return_value)] * 2,
+                     mock_broadcast.call_args_list)
+
+  def test_decide_all__invalid_inputs(self):
+    """ Test that decide_all returns None for an invalid client, user ID or attributes. """
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertIsNone(self.optimizely.decide_all(42))
+      self.assertIsNone(self.optimizely.decide_all('test_user', attributes='invalid'))
+
+    mock_client_logging.error.assert_any_call(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+    mock_client_logging.error.assert_any_call('Provided attributes are in an invalid format.')
+
+    opt_obj = optimizely.Optimizely('invalid_datafile')
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertIsNone(opt_obj.decide_all('test_user'))
+
+    mock_client_logging.error.assert_called_once_with('Datafile has invalid format. Failing "decide_all".')
+
+  def test_decide_stream(self):
+    """ Test that decide_stream decides as decide_all does, in the order of users. """
+
+    users = [('user_%s' % idx, self.attributes if idx % 2 else None) for idx in range(5)] + [(42, None)]
+
+    with mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'):
+      expected = [self.optimizely.decide_all(user_id, attributes) for user_id, attributes in users]
+      bundles = list(self.optimizely.decide_stream(iter(users), ['test_feature_in_experiment', 'unknown_feature'],
+                                                   chunk_size=2))
+
+    self.assertEqual(6, len(bundles))
+    self.assertIsNone(bundles[-1])
+    for bundle, expected_bundle in zip(bundles[:-1], expected[:-1]):
+      self.assertEqual(expected_bundle.user_id, bundle.user_id)
+      self.assertEqual(['test_feature_in_experiment'], list(bundle.feature_decisions.keys()))
+      self.assertEqual(expected_bundle.feature_decisions['test_feature_in_experiment'],
+                       bundle.feature_decisions['test_feature_in_experiment'])
+
+  def test_decide_stream__lazy(self):
+    """ Test that decide_stream consumes users a chunk at a time and sends the impressions of each chunk
+    together through the sink. """
+
+    consumed = []
+
+    def users():
+      for idx in range(5):
+        consumed.append(idx)
+        yield 'user_%s' % idx, None
+
+    impression_sink = mock.Mock()
+    variation = self.project_config.get_variation_from_key('test_experiment', 'variation')
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      bundles = self.optimizely.decide_stream(users(), ['test_feature_in_experiment'], chunk_size=2,
+                                              impression_sink=impression_sink)
+      self.assertEqual([], consumed)
+
+      self.assertEqual('user_0', next(bundles).user_id)
+      self.assertEqual([0, 1], consumed)
+      self.assertEqual(1, impression_sink.call_count)
+
+      self.assertEqual(['user_1', 'user_2', 'user_3', 'user_4'], [bundle.user_id for bundle in bundles])
+
+    self.assertEqual(0, mock_dispatch_event.call_count)
+    self.assertEqual([2, 2, 1], [len(call[0][0].params['visitors']) for call in impression_sink.call_args_list])
+
+  def test_decide_stream__invalid_inputs(self):
+    """ Test that decide_stream yields nothing for invalid features or chunk size,
+    and None for each user while the client is invalid. """
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertEqual([], list(self.optimizely.decide_stream([('test_user', None)], 'test_feature_in_rollout')))
+      self.assertEqual([], list(self.optimizely.decide_stream([('test_user', None)], ['test_feature_in_rollout'],
+                                                              chunk_size=0)))
+
+    self.assertEqual([mock.call(enums.Errors.INVALID_INPUT_ERROR.format('feature_keys')),
+                      mock.call(enums.Errors.INVALID_INPUT_ERROR.format('chunk_size'))],
+                     mock_client_logging.error.call_args_list)
+
+    opt_obj = optimizely.Optimizely('invalid_datafile')
+    with mock.patch.object(opt_obj, 'logger'):
+      self.assertEqual([None, None], list(opt_obj.decide_stream([('user_1', None), ('user_2', None)],
+                                                                ['test_feature_in_rollout'])))
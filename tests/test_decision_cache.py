@@ -0,0 +1,153 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+
+from optimizely import decision_cache
+from optimizely import decision_service
+from optimizely import optimizely
+
+from . import base
+
+
+class DecisionCacheTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.decision_cache = decision_cache.DecisionCache()
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                            decision_cache=self.decision_cache)
+    self.project_config = self.optimizely.config
+
+  def test_get_attributes_fingerprint(self):
+    """ Test that attributes fingerprints ignore the order of attributes but not the type of values. """
+
+    self.assertEqual(decision_cache.get_attributes_fingerprint({'a': 'x', 'b': 1}),
+                     decision_cache.get_attributes_fingerprint({'b': 1, 'a': 'x'}))
+    self.assertNotEqual(decision_cache.get_attributes_fingerprint({'a': True}),
+                        decision_cache.get_attributes_fingerprint({'a': 1}))
+    self.assertEqual(decision_cache.get_attributes_fingerprint(None), decision_cache.get_attributes_fingerprint({}))
+    self.assertIsNone(decision_cache.get_attributes_fingerprint({'a': ['x']}))
+
+  def test_get_key(self):
+    """ Test that keys identify the project and revision, the experiment or feature, the user and the attributes. """
+
+    key = self.decision_cache.get_key(self.project_config, decision_cache.KIND_EXPERIMENT, 'test_experiment',
+                                      'test_user', {'$opt_bucketing_id': 'bucket_1'})
+
+    self.assertEqual(key, self.decision_cache.get_key(self.project_config, decision_cache.KIND_EXPERIMENT,
+                                                      'test_experiment', 'test_user',
+                                                      {'$opt_bucketing_id': 'bucket_1'}))
+    self.assertNotEqual(key, self.decision_cache.get_key(self.project_config, decision_cache.KIND_EXPERIMENT,
+                                                         'test_experiment', 'test_user',
+                                                         {'$opt_bucketing_id': 'bucket_2'}))
+    self.assertNotEqual(key, self.decision_cache.get_key(self.project_config, decision_cache.KIND_FEATURE,
+                                                         'test_experiment', 'test_user',
+                                                         {'$opt_bucketing_id': 'bucket_1'}))
+    self.assertIsNone(self.decision_cache.get_key(self.project_config, decision_cache.KIND_EXPERIMENT,
+                                                  'test_experiment', 'test_user', {'a': ['x']}))
+
+  def test_get_metrics(self):
+    """ Test that hits, misses and evictions are counted. """
+
+    cache = decision_cache.DecisionCache(capacity=1)
+    self.assertIsNone(cache.lookup('a'))
+    cache.save('a', 'decision_a')
+    self.assertEqual('decision_a', cache.lookup('a'))
+    cache.save('b', 'decision_b')
+
+    self.assertEqual({
+      'entries': 1,
+      'hits': 1,
+      'misses': 1,
+      'evictions': 1,
+      'hit_ratio': 0.5
+    }, cache.get_metrics())
+
+  def test_get_variation__cached(self):
+    """ Test that a user asking again for an experiment with the same attributes is not bucketed again. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', wraps=self.optimizely.decision_service.bucketer.bucket) \
+            as mock_bucket:
+      variation_key = self.optimizely.get_variation('test_experiment', 'test_user')
+      self.assertEqual(variation_key, self.optimizely.get_variation('test_experiment', 'test_user'))
+      self.assertEqual(1, mock_bucket.call_count)
+
+      # Other attributes are decided on again
+      self.assertEqual(variation_key, self.optimizely.get_variation('test_experiment', 'test_user',
+                                                                    {'test_attribute': 'test_value'}))
+      self.assertEqual(2, mock_bucket.call_count)
+
+    self.assertEqual(1, self.decision_cache.get_metrics()['hits'])
+
+  def test_get_variation_for_feature__cached(self):
+    """ Test that a user asking again for a feature with the same attributes gets the cached decision. """
+
+    feature = self.project_config.get_feature_from_key('test_feature_in_experiment')
+    decision = self.optimizely.decision_service.get_variation_for_feature(feature, 'test_user')
+
+    with mock.patch('optimizely.decision_service.DecisionService._get_decision_for_user') as mock_decide:
+      self.assertEqual(decision, self.optimizely.decision_service.get_variation_for_feature(feature, 'test_user'))
+
+    self.assertEqual(0, mock_decide.call_count)
+
+  def test_get_variation__bypassed_for_forced_variations(self):
+    """ Test that the cache is not used while users are forced into variations. """
+
+    self.optimizely.set_forced_variation('test_experiment', 'other_user', 'control')
+    self.optimizely.get_variation('test_experiment', 'test_user')
+    self.optimizely.get_variation('test_experiment', 'test_user')
+
+    self.assertEqual(0, self.decision_cache.get_metrics()['entries'])
+    self.assertEqual(0, self.decision_cache.get_metrics()['misses'])
+
+  def test_get_variation__bypassed_for_user_profile_service(self):
+    """ Test that the cache is not used with a user profile service, unless it is ignored. """
+
+    service = decision_service.DecisionService(self.project_config, mock.Mock(lookup=mock.Mock(return_value=None)),
+                                               decision_cache=self.decision_cache)
+    experiment = self.project_config.get_experiment_from_key('test_experiment')
+    service.get_variation(experiment, 'test_user', None)
+    self.assertEqual(0, self.decision_cache.get_metrics()['entries'])
+
+    service.get_variation(experiment, 'test_user', None, ignore_user_profile=True)
+    self.assertEqual(1, self.decision_cache.get_metrics()['entries'])
+
+  def test_get_variation__revision_changed(self):
+    """ Test that decisions cached for a config revision are not used with another revision. """
+
+    self.optimizely.get_variation('test_experiment', 'test_user')
+
+    config_dict = dict(self.config_dict_with_features, revision='43')
+    optimizely_instance = optimizely.Optimizely(json.dumps(config_dict), decision_cache=self.decision_cache)
+    optimizely_instance.get_variation('test_experiment', 'test_user')
+
+    self.assertEqual(0, self.decision_cache.get_metrics()['hits'])
+    self.assertEqual(2, self.decision_cache.get_metrics()['entries'])
+
+  def test_get_variation__other_project_same_revision(self):
+    """ Test that decisions cached for a project are not used for another project at the same revision. """
+
+    config_dict = dict(self.config_dict_with_features, projectId='999')
+    optimizely_instance = optimizely.Optimizely(json.dumps(config_dict), decision_cache=self.decision_cache)
+    control = self.project_config.get_variation_from_key('test_experiment', 'control')
+    variation = optimizely_instance.config.get_variation_from_key('test_experiment', 'variation')
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=control):
+      self.assertEqual('control', self.optimizely.get_variation('test_experiment', 'test_user'))
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=variation):
+      self.assertEqual('variation', optimizely_instance.get_variation('test_experiment', 'test_user'))
+
+    self.assertEqual(0, self.decision_cache.get_metrics()['hits'])
+    self.assertEqual(2, self.decision_cache.get_metrics()['entries'])
@@ -0,0 +1,94 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+
+from optimizely import decision_plan
+from optimizely import entities
+from optimizely import optimizely
+
+from . import base
+
+
+class DecisionPlanTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    self.project_config = self.optimizely.config
+
+  def test_compile_feature(self):
+    """ Test that the entities a feature decision goes through are resolved. """
+
+    feature_plan = self.project_config.feature_plan_map['test_feature_in_experiment_and_rollout']
+
+    self.assertIs(self.project_config.get_feature_from_key('test_feature_in_experiment_and_rollout'),
+                  feature_plan.feature)
+    self.assertIsNone(feature_plan.group)
+    self.assertEqual(frozenset(['111127']), feature_plan.experiment_ids)
+    self.assertIs(self.project_config.get_experiment_from_key('test_experiment'), feature_plan.experiment)
+    self.assertIs(self.project_config.get_rollout_from_id('211111'), feature_plan.rollout)
+
+    feature_plan = self.project_config.feature_plan_map['test_feature_in_group']
+    self.assertIs(self.project_config.get_group('19228'), feature_plan.group)
+    self.assertIsNone(feature_plan.rollout)
+
+  def test_compile_feature__missing_entities(self):
+    """ Test that entities which are not in the datafile are left to be looked up again. """
+
+    feature = entities.FeatureFlag('91115', 'unknown_feature', ['42'], '43', {})
+    feature_plan = decision_plan.compile_feature(self.project_config, feature)
+
+    self.assertIsNone(feature_plan.experiment)
+    self.assertIsNone(feature_plan.rollout)
+
+  def test_compile_rollout(self):
+    """ Test that the targeting rules of a rollout are resolved in order. """
+
+    rollout_plan = self.project_config.rollout_plan_map['211111']
+
+    self.assertEqual((self.project_config.get_experiment_from_key('211127'),
+                      self.project_config.get_experiment_from_key('211137')), rollout_plan.rules)
+    self.assertIs(self.project_config.get_experiment_from_key('211147'), rollout_plan.everyone_else_rule)
+
+    rollout_plan = self.project_config.rollout_plan_map['201111']
+    self.assertEqual((), rollout_plan.rules)
+    self.assertIsNone(rollout_plan.everyone_else_rule)
+
+  def test_get_variation_for_feature__uses_plan(self):
+    """ Test that deciding on a feature does not look up the entities it goes through again. """
+
+    feature = self.project_config.get_feature_from_key('test_feature_in_experiment_and_rollout')
+    with mock.patch.object(self.project_config, 'get_experiment_from_key') as mock_get_experiment_from_key, \
+         mock.patch.object(self.project_config, 'get_experiment_from_id') as mock_get_experiment_from_id, \
+         mock.patch.object(self.project_config, 'get_rollout_from_id') as mock_get_rollout_from_id:
+      decision = self.optimizely.decision_service.get_variation_for_feature(feature, 'test_user',
+                                                                            {'test_attribute': 'test_value_1'})
+
+    self.assertIsNotNone(decision.variation)
+    self.assertEqual(0, mock_get_experiment_from_key.call_count)
+    self.assertEqual(0, mock_get_experiment_from_id.call_count)
+    self.assertEqual(0, mock_get_rollout_from_id.call_count)
+
+  def test_get_variation_for_rollout__rollout_not_in_config(self):
+    """ Test that a rollout which is not the one in the config is compiled when deciding on it. """
+
+    rollout = entities.Layer('211111', self.config_dict_with_features['rollouts'][1]['experiments'][2:])
+    everyone_else_rule = self.project_config.get_experiment_from_key('211147')
+    variation = self.project_config.get_variation_from_id('211147', '211149')
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=variation) as mock_bucket:
+      decision = self.optimizely.decision_service.get_variation_for_rollout(rollout, 'test_user')
+
+    mock_bucket.assert_called_once_with(everyone_else_rule, 'test_user', 'test_user')
+    self.assertEqual(everyone_else_rule, decision.experiment)
@@ -16,6 +16,7 @@ import mock
 
 from optimizely import decision_service
 from optimizely import entities
+from optimizely import forced_variation_store
 from optimizely import optimizely
 from optimizely import user_profile
 from optimizely.helpers import enums
@@ -71,28 +72,132 @@ class DecisionServiceTest(base.BaseTest):
       mock_decision_logging.warning.assert_called_once_with(
         'Bucketing ID attribute is not a string. Defaulted to user_id.')
 
-  def test_get_forced_variation__user_in_forced_variation(self):
+  def test_get_whitelisted_variation__user_in_forced_variation(self):
     """ Test that expected variation is returned if user is forced in a variation. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
     with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
       self.assertEqual(entities.Variation('111128', 'control'),
-                       self.decision_service.get_forced_variation(experiment, 'user_1'))
+                       self.decision_service.get_whitelisted_variation(experiment, 'user_1'))
 
     mock_decision_logging.info.assert_called_once_with(
       'User "user_1" is forced in variation "control".'
     )
 
-  def test_get_forced_variation__user_in_forced_variation__invalid_variation_id(self):
-    """ Test that get_forced_variation returns None when variation user is forced in is invalid. """
+  def test_get_whitelisted_variation__user_in_forced_variation__invalid_variation_id(self):
+    """ Test that get_whitelisted_variation returns None when variation user is forced in is invalid. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
     with mock.patch('optimizely.project_config.ProjectConfig.get_variation_from_key',
                     return_value=None) as mock_get_variation_id:
-      self.assertIsNone(self.decision_service.get_forced_variation(experiment, 'user_1'))
+      self.assertIsNone(self.decision_service.get_whitelisted_variation(experiment, 'user_1'))
 
     mock_get_variation_id.assert_called_once_with('test_experiment', 'control')
 
+  # get_forced_variation tests
+  def test_get_forced_variation__invalid_user_id(self):
+    """ Test invalid user IDs return a null variation. """
+    self.decision_service.set_forced_variation('test_experiment', 'test_user', 'variation')
+
+    self.assertIsNone(self.decision_service.get_forced_variation('test_experiment', None))
+    self.assertIsNone(self.decision_service.get_forced_variation('test_experiment', ''))
+
+  def test_get_forced_variation__invalid_experiment_key(self):
+    """ Test invalid experiment keys return a null variation. """
+    self.decision_service.set_forced_variation('test_experiment', 'test_user', 'variation')
+
+    self.assertIsNone(self.decision_service.get_forced_variation('test_experiment_not_in_datafile', 'test_user'))
+    self.assertIsNone(self.decision_service.get_forced_variation(None, 'test_user'))
+    self.assertIsNone(self.decision_service.get_forced_variation('', 'test_user'))
+
+  def test_get_forced_variation_with_none_set_for_user(self):
+    """ Test get_forced_variation when none set for user ID in forced variation map. """
+    with mock.patch.object(self.decision_service.forced_variation_store, 'get_forced_variations',
+                           return_value={}), \
+         mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      self.assertIsNone(self.decision_service.get_forced_variation('test_experiment', 'test_user'))
+    mock_decision_logging.debug.assert_called_once_with(
+      'No experiment "test_experiment" mapped to user "test_user" in the forced variation map.'
+    )
+
+  def test_get_forced_variation_missing_variation_mapped_to_experiment(self):
+    """ Test get_forced_variation when no variation found against given experiment for the user. """
+    self.decision_service.set_forced_variation('group_exp_1', 'test_user', 'group_exp_1_control')
+
+    with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      self.assertIsNone(self.decision_service.get_forced_variation('test_experiment', 'test_user'))
+
+    mock_decision_logging.debug.assert_called_once_with(
+      'No variation mapped to experiment "test_experiment" in the forced variation map.'
+    )
+
+  def test_set_forced_variation__invalid_experiment_key(self):
+    """ Test invalid experiment keys set fail to set a forced variation """
+
+    self.assertFalse(self.decision_service.set_forced_variation('test_experiment_not_in_datafile',
+                                                                'test_user', 'variation'))
+    self.assertFalse(self.decision_service.set_forced_variation('', 'test_user', 'variation'))
+    self.assertFalse(self.decision_service.set_forced_variation(None, 'test_user', 'variation'))
+
+  def test_set_forced_variation__invalid_variation_key(self):
+    """ Test invalid variation keys set fail to set a forced variation """
+
+    self.assertFalse(self.decision_service.set_forced_variation('test_experiment', 'test_user',
+                                                                'variation_not_in_datafile'))
+    self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user', None))
+
+    with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      self.assertIs(self.decision_service.set_forced_variation('test_experiment', 'test_user', ''), False)
+    mock_decision_logging.debug.assert_called_once_with('Variation key is invalid.')
+
+  def test_set_forced_variation__multiple_sets(self):
+    """ Test multiple sets of experiments for one and multiple users work """
+
+    self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user_1', 'variation'))
+    self.assertEqual(self.decision_service.get_forced_variation('test_experiment', 'test_user_1').key, 'variation')
+    # same user, same experiment, different variation
+    self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user_1', 'control'))
+    self.assertEqual(self.decision_service.get_forced_variation('test_experiment', 'test_user_1').key, 'control')
+    # same user, different experiment
+    self.assertTrue(self.decision_service.set_forced_variation('group_exp_1', 'test_user_1', 'group_exp_1_control'))
+    self.assertEqual(self.decision_service.get_forced_variation('group_exp_1', 'test_user_1').key,
+                     'group_exp_1_control')
+
+    # different user
+    self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user_2', 'variation'))
+    self.assertEqual(self.decision_service.get_forced_variation('test_experiment', 'test_user_2').key, 'variation')
+    # different user, different experiment
+    self.assertTrue(self.decision_service.set_forced_variation('group_exp_1', 'test_user_2', 'group_exp_1_control'))
+    self.assertEqual(self.decision_service.get_forced_variation('group_exp_1', 'test_user_2').key,
+                     'group_exp_1_control')
+
+    # make sure the first user forced variations are still valid
+    self.assertEqual(self.decision_service.get_forced_variation('test_experiment', 'test_user_1').key, 'control')
+    self.assertEqual(self.decision_service.get_forced_variation('group_exp_1', 'test_user_1').key,
+                     'group_exp_1_control')
+
+  def test_set_forced_variation_when_called_to_remove_forced_variation(self):
+    """ Test set_forced_variation when no variation is given. """
+    # Test case where both user and experiment are present in the forced variation map
+    self.decision_service.forced_variation_store = forced_variation_store.ForcedVariationStore()
+    self.decision_service.set_forced_variation('test_experiment', 'test_user', 'variation')
+
+    with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user', None))
+    mock_decision_logging.debug.assert_called_once_with(
+      'Variation mapped to experiment "test_experiment" has been removed for user "test_user".'
+    )
+
+    # Test case where user is present in the forced variation map, but the given experiment isn't
+    self.decision_service.forced_variation_store = forced_variation_store.ForcedVariationStore()
+    self.decision_service.set_forced_variation('test_experiment', 'test_user', 'variation')
+
+    with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      self.assertTrue(self.decision_service.set_forced_variation('group_exp_1', 'test_user', None))
+    mock_decision_logging.debug.assert_called_once_with(
+      'Nothing to remove. Variation mapped to experiment "group_exp_1" for user "test_user" does not exist.'
+    )
+
   def test_get_stored_variation__stored_decision_available(self):
     """ Test that stored decision is retrieved as expected. """
 
@@ -119,7 +224,8 @@ class DecisionServiceTest(base.BaseTest):
     experiment = self.project_config.get_experiment_from_key('test_experiment')
     # Mark experiment paused
     experiment.status = 'Paused'
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation') as mock_get_forced_variation, \
+    with mock.patch.object(decision_service.DecisionService,
+                           'get_whitelisted_variation') as mock_get_whitelisted_variation, \
       mock.patch.object(self.decision_service, 'logger') as mock_decision_logging, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation') as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment') as mock_audience_check, \
@@ -130,7 +236,7 @@ class DecisionServiceTest(base.BaseTest):
 
     mock_decision_logging.info.assert_called_once_with('Experiment "test_experiment" is not running.')
     # Assert no calls are made to other services
-    self.assertEqual(0, mock_get_forced_variation.call_count)
+    self.assertEqual(0, mock_get_whitelisted_variation.call_count)
     self.assertEqual(0, mock_get_stored_variation.call_count)
     self.assertEqual(0, mock_audience_check.call_count)
     self.assertEqual(0, mock_bucket.call_count)
@@ -141,7 +247,7 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that get_variation calls bucket with correct bucketing ID if provided. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation', return_value=None), \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation', return_value=None), \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation', return_value=None), \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True), \
       mock.patch('optimizely.bucketer.Bucketer.bucket') as mock_bucket:
@@ -157,8 +263,8 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that get_variation returns forced variation if user is forced in a variation. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=entities.Variation('111128', 'control')) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=entities.Variation('111128', 'control')) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation') as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment') as mock_audience_check, \
       mock.patch('optimizely.bucketer.Bucketer.bucket') as mock_bucket, \
@@ -168,19 +274,35 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that forced variation is returned and stored decision or bucketing service are not involved
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     self.assertEqual(0, mock_get_stored_variation.call_count)
     self.assertEqual(0, mock_audience_check.call_count)
     self.assertEqual(0, mock_bucket.call_count)
     self.assertEqual(0, mock_lookup.call_count)
     self.assertEqual(0, mock_save.call_count)
 
+  def test_get_variation__set_forced_variation(self):
+    """ Test that get_variation returns the variation set through set_forced_variation
+    and only looks up forced variations while there are any. """
+
+    experiment = self.project_config.get_experiment_from_key('test_experiment')
+    with mock.patch.object(self.decision_service, 'get_forced_variation') as mock_get_forced_variation:
+      self.decision_service.get_variation(experiment, 'test_user', None)
+
+    self.assertEqual(0, mock_get_forced_variation.call_count)
+
+    self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user', 'variation'))
+    self.assertEqual('variation', self.decision_service.get_variation(experiment, 'test_user', None).key)
+
+    self.assertTrue(self.decision_service.set_forced_variation('test_experiment', 'test_user', None))
+    self.assertFalse(self.decision_service.forced_variation_store.has_forced_variations())
+
   def test_get_variation__user_has_stored_decision(self):
     """ Test that get_variation returns stored decision if user has variation available for given experiment. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation',
                  return_value=entities.Variation('111128', 'control')) as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment') as mock_audience_check, \
@@ -194,7 +316,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that stored variation is returned and bucketing service is not involved
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_lookup.assert_called_once_with('test_user')
     mock_get_stored_variation.assert_called_once_with(
       experiment, user_profile.UserProfile('test_user', {'111127': {'variation_id': '111128'}})
@@ -208,8 +330,8 @@ class DecisionServiceTest(base.BaseTest):
     Also, stores decision if user profile service is available. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation',
                  return_value=None) as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True) as mock_audience_check, \
@@ -222,7 +344,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that user is bucketed and new decision is stored
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_lookup.assert_called_once_with('test_user')
     self.assertEqual(1, mock_get_stored_variation.call_count)
     mock_audience_check.assert_called_once_with(self.project_config, experiment, None)
@@ -238,8 +360,8 @@ class DecisionServiceTest(base.BaseTest):
     self.decision_service.user_profile_service = None
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation') as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True) as mock_audience_check, \
       mock.patch('optimizely.bucketer.Bucketer.bucket',
@@ -250,7 +372,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that user is bucketed and new decision is not stored as user profile service is not available
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     self.assertEqual(0, mock_lookup.call_count)
     self.assertEqual(0, mock_get_stored_variation.call_count)
     mock_audience_check.assert_called_once_with(self.project_config, experiment, None)
@@ -261,8 +383,8 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that get_variation returns None if user is not in experiment. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation',
                  return_value=None) as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=False) as mock_audience_check, \
@@ -273,7 +395,7 @@ class DecisionServiceTest(base.BaseTest):
       self.assertIsNone(self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that user is bucketed and new decision is stored
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_lookup.assert_called_once_with('test_user')
     mock_get_stored_variation.assert_called_once_with(experiment, user_profile.UserProfile('test_user'))
     mock_audience_check.assert_called_once_with(self.project_config, experiment, None)
@@ -284,8 +406,8 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that get_variation handles invalid user profile gracefully. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation') as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True) as mock_audience_check, \
       mock.patch('optimizely.bucketer.Bucketer.bucket',
@@ -298,7 +420,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that user is bucketed and new decision is stored
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_lookup.assert_called_once_with('test_user')
     # Stored decision is not consulted as user profile is invalid
     self.assertEqual(0, mock_get_stored_variation.call_count)
@@ -312,8 +434,8 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that get_variation acts gracefully when lookup fails. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation') as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True) as mock_audience_check, \
       mock.patch('optimizely.bucketer.Bucketer.bucket',
@@ -326,7 +448,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that user is bucketed and new decision is stored
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_lookup.assert_called_once_with('test_user')
     # Stored decision is not consulted as lookup failed
     self.assertEqual(0, mock_get_stored_variation.call_count)
@@ -342,8 +464,8 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that get_variation acts gracefully when save fails. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.decision_service.DecisionService.get_stored_variation') as mock_get_stored_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True) as mock_audience_check, \
       mock.patch('optimizely.bucketer.Bucketer.bucket',
@@ -356,7 +478,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None))
 
     # Assert that user is bucketed and new decision is stored
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_lookup.assert_called_once_with('test_user')
     self.assertEqual(0, mock_get_stored_variation.call_count)
     mock_audience_check.assert_called_once_with(self.project_config, experiment, None)
@@ -371,8 +493,8 @@ class DecisionServiceTest(base.BaseTest):
     """ Test that we ignore the user profile service if specified. """
 
     experiment = self.project_config.get_experiment_from_key('test_experiment')
-    with mock.patch('optimizely.decision_service.DecisionService.get_forced_variation',
-                    return_value=None) as mock_get_forced_variation, \
+    with mock.patch('optimizely.decision_service.DecisionService.get_whitelisted_variation',
+                    return_value=None) as mock_get_whitelisted_variation, \
       mock.patch('optimizely.helpers.audience.is_user_in_experiment', return_value=True) as mock_audience_check, \
       mock.patch('optimizely.bucketer.Bucketer.bucket',
                  return_value=entities.Variation('111129', 'variation')) as mock_bucket, \
@@ -382,7 +504,7 @@ class DecisionServiceTest(base.BaseTest):
                        self.decision_service.get_variation(experiment, 'test_user', None, ignore_user_profile=True))
 
     # Assert that user is bucketed and new decision is NOT stored
-    mock_get_forced_variation.assert_called_once_with(experiment, 'test_user')
+    mock_get_whitelisted_variation.assert_called_once_with(experiment, 'test_user')
     mock_audience_check.assert_called_once_with(self.project_config, experiment, None)
     mock_bucket.assert_called_once_with(experiment, 'test_user', 'test_user')
     self.assertEqual(0, mock_lookup.call_count)
@@ -694,3 +816,122 @@ class FeatureFlagDecisionTests(base.BaseTest):
     mock_decision_logging.info.assert_called_once_with(
       'User with bucketing ID "test_user" is not in any experiments of group 19228.'
     )
+
+
+class UserDecisionServiceTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.user_profile_service = mock.Mock(lookup=mock.Mock(return_value={'user_id': 'test_user',
+                                                                         'experiment_bucket_map': {}}))
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                    user_profile_service=self.user_profile_service)
+    self.decision_service = decision_service.UserDecisionService(opt_obj.decision_service, 'test_user', None)
+    self.experiment = opt_obj.config.get_experiment_from_key('test_experiment')
+    self.other_experiment = opt_obj.config.get_experiment_from_key('group_exp_1')
+    self.variation = opt_obj.config.get_variation_from_key('test_experiment', 'variation')
+    self.other_variation = opt_obj.config.get_variation_from_key('group_exp_1', 'group_exp_1_variation')
+
+  def test_get_variation__user_profile_saved_once(self):
+    """ Test that the user's profile is looked up once and decisions are saved to it once. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', side_effect=[self.variation, self.other_variation]):
+      self.decision_service.get_variation(self.experiment, 'test_user', None)
+      self.decision_service.get_variation(self.other_experiment, 'test_user', None)
+    self.assertEqual(0, self.user_profile_service.save.call_count)
+
+    self.decision_service.save_user_profile()
+
+    self.user_profile_service.lookup.assert_called_once_with('test_user')
+    self.user_profile_service.save.assert_called_once_with({
+      'user_id': 'test_user',
+      'experiment_bucket_map': {
+        self.experiment.id: {'variation_id': self.variation.id},
+        self.other_experiment.id: {'variation_id': self.other_variation.id}
+      }
+    })
+
+  def test_save_user_profile__unchanged(self):
+    """ Test that the user's profile is not saved if no decision changed it. """
+
+    self.decision_service.save_user_profile()
+    self.assertEqual(0, self.user_profile_service.save.call_count)
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation):
+      self.decision_service.get_variation(self.experiment, 'test_user', None)
+      self.decision_service.save_user_profile()
+      # The stored decision is found, so there is nothing new to save
+      self.decision_service.get_variation(self.experiment, 'test_user', None)
+      self.decision_service.save_user_profile()
+
+    self.assertEqual(1, self.user_profile_service.save.call_count)
+
+  def test_get_variation__other_user(self):
+    """ Test that decisions for another user than the bound one are looked up and saved right away. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation):
+      self.decision_service.get_variation(self.experiment, 'other_user', None)
+
+    self.user_profile_service.lookup.assert_called_once_with('other_user')
+    self.assertEqual(1, self.user_profile_service.save.call_count)
+
+  def test_lookup_user_profiles(self):
+    """ Test that user profiles are looked up with a single call to lookup_many, skipping invalid ones. """
+
+    user_profile_service = mock.Mock(spec=['lookup', 'lookup_many', 'save'])
+    user_profile_service.lookup_many.return_value = {
+      'user_1': {'user_id': 'user_1', 'experiment_bucket_map': {'111127': {'variation_id': '111129'}}},
+      'user_2': {'user_id': 'user_2'},
+      'user_3': None
+    }
+    self.decision_service.user_profile_service = user_profile_service
+
+    with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      user_profiles = self.decision_service.lookup_user_profiles(['user_1', 'user_2', 'user_3'])
+
+    user_profile_service.lookup_many.assert_called_once_with(['user_1', 'user_2', 'user_3'])
+    self.assertEqual(0, user_profile_service.lookup.call_count)
+    self.assertEqual({'user_1': user_profile.UserProfile('user_1', {'111127': {'variation_id': '111129'}})},
+                     user_profiles)
+    mock_decision_logging.warning.assert_called_once_with('User profile has invalid format.')
+
+  def test_lookup_user_profiles__no_lookup_many(self):
+    """ Test that user profiles are looked up one by one if the service has no lookup_many method. """
+
+    user_profile_service = mock.Mock(spec=['lookup', 'save'])
+    user_profile_service.lookup.side_effect = lambda user_id: {'user_id': user_id, 'experiment_bucket_map': {}}
+    self.decision_service.user_profile_service = user_profile_service
+
+    self.assertEqual({'user_1': user_profile.UserProfile('user_1'), 'user_2': user_profile.UserProfile('user_2')},
+                     self.decision_service.lookup_user_profiles(['user_1', 'user_2']))
+    self.assertEqual([mock.call('user_1'), mock.call('user_2')], user_profile_service.lookup.call_args_list)
+
+  def test_lookup_user_profiles__lookup_many_fails(self):
+    """ Test that no user profile is returned if lookup_many fails. """
+
+    self.decision_service.user_profile_service = mock.Mock(
+      spec=['lookup', 'lookup_many', 'save'], lookup_many=mock.Mock(side_effect=Exception('major problem'))
+    )
+
+    with mock.patch.object(self.decision_service, 'logger') as mock_decision_logging:
+      self.assertEqual({}, self.decision_service.lookup_user_profiles(['user_1', 'user_2']))
+
+    mock_decision_logging.exception.assert_called_once_with(
+      'Unable to retrieve user profiles for 2 users as lookup failed.'
+    )
+
+  def test_user_profile_and_audience_results_passed_in(self):
+    """ Test that a profile looked up beforehand is used and audience results can be shared between services. """
+
+    profile = user_profile.UserProfile('test_user', {self.experiment.id: {'variation_id': self.variation.id}})
+    audience_results = {}
+    user_decision_service = decision_service.UserDecisionService(self.decision_service, 'test_user', None,
+                                                                 profile, audience_results)
+
+    self.assertEqual(self.variation, user_decision_service.get_variation(self.experiment, 'test_user', None))
+    self.assertEqual(0, self.user_profile_service.lookup.call_count)
+
+    user_decision_service.save_user_profile()
+    self.assertEqual(0, self.user_profile_service.save.call_count)
+
+    self.assertIs(audience_results, user_decision_service._audience_results)
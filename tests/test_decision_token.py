@@ -0,0 +1,186 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import copy
+import json
+import mock
+
+from optimizely import decision_token
+from optimizely import exceptions
+from optimizely import optimizely
+
+from . import base
+
+
+class DecisionTokenTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    self.project_config = self.optimizely.config
+    self.key = 'secret'
+    variation = self.project_config.get_variation_from_key('test_experiment', 'variation')
+    with mock.patch('optimizely.bucketer.Bucketer.bucket',
+                    side_effect=lambda experiment, *args: variation if experiment.key == 'test_experiment' else None), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'):
+      self.bundle = self.optimizely.decide_all('test_user', {'test_attribute': 'test_value_1'})
+
+  def test_dump_and_load(self):
+    """ Test that decisions loaded from a token are the ones dumped. """
+
+    token = decision_token.dump(self.project_config, self.bundle, self.key)
+
+    self.assertEqual(self.bundle, decision_token.load(self.project_config, token, self.key, 'test_user'))
+    self.assertTrue(self.bundle.is_feature_enabled('test_feature_in_experiment'))
+
+  def test_dump__compact(self):
+    """ Test that tokens hold IDs rather than keys of experiments and variations, and no variable values. """
+
+    token = decision_token.dump(self.project_config, self.bundle, self.key)
+    payload = token.split('.')[0]
+    decoded = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)).decode('utf-8'))
+
+    self.assertEqual([decision_token.TOKEN_FORMAT_VERSION, self.project_config.revision, 'test_user'], decoded[:3])
+    self.assertIn(['test_feature_in_experiment', 1, '111127', '111129', 0], decoded[3])
+
+  def test_dump__revision_mismatch(self):
+    """ Test that decisions made with another revision can not be dumped. """
+
+    with mock.patch.object(self.project_config, 'revision', '2'):
+      with self.assertRaisesRegexp(exceptions.InvalidDecisionTokenException, 'decided with revision 1'):
+        decision_token.dump(self.project_config, self.bundle, self.key)
+
+  def test_load__invalid(self):
+    """ Test that tokens which are malformed, tampered with or issued for another user are rejected. """
+
+    token = decision_token.dump(self.project_config, self.bundle, self.key)
+    payload, signature = token.split('.')
+
+    with self.assertRaisesRegexp(exceptions.InvalidDecisionTokenException, 'malformed token'):
+      decision_token.load(self.project_config, 'garbage', self.key)
+    with self.assertRaisesRegexp(exceptions.InvalidDecisionTokenException, 'signature mismatch'):
+      decision_token.load(self.project_config, token, 'other_secret')
+    with self.assertRaisesRegexp(exceptions.InvalidDecisionTokenException, 'signature mismatch'):
+      decision_token.load(self.project_config, payload[:-2] + 'AA.' + signature, self.key)
+    with self.assertRaisesRegexp(exceptions.InvalidDecisionTokenException, 'issued for another user'):
+      decision_token.load(self.project_config, token, self.key, 'other_user')
+
+  def test_load__malformed_payload(self):
+    """ Test that correctly signed tokens with malformed payloads are rejected. """
+
+    revision = self.project_config.revision
+    payloads = [
+      'not json',
+      [decision_token.TOKEN_FORMAT_VERSION, revision, 'test_user'],
+      [decision_token.TOKEN_FORMAT_VERSION, revision, 'test_user', 42],
+      [decision_token.TOKEN_FORMAT_VERSION, revision, 'test_user', [['test_feature_in_experiment', 1]]],
+      [decision_token.TOKEN_FORMAT_VERSION, revision, 'test_user', [[['unhashable'], 0, None, None, 0]]],
+      [decision_token.TOKEN_FORMAT_VERSION, revision, 'test_user', [['test_feature_in_experiment', 1, '111127',
+                                                                     '111129', -1]]],
+      [decision_token.TOKEN_FORMAT_VERSION, revision, 'test_user', [['test_feature_in_experiment', 1, '111127',
+                                                                     '111129', '0']]]
+    ]
+
+    for payload in payloads:
+      encoded_payload = decision_token._encode(json.dumps(payload).encode('utf-8'))
+      token = (encoded_payload + b'.' + decision_token._encode(decision_token._sign(encoded_payload, self.key)))
+      with self.assertRaises(exceptions.InvalidDecisionTokenException):
+        decision_token.load(self.project_config, token.decode('ascii'), self.key)
+
+  def test_load__revision_mismatch(self):
+    """ Test that tokens issued with another revision are rejected. """
+
+    token = decision_token.dump(self.project_config, self.bundle, self.key)
+
+    with mock.patch.object(self.project_config, 'revision', '2'):
+      with self.assertRaisesRegexp(exceptions.InvalidDecisionTokenException, 'issued for revision 1'):
+        decision_token.load(self.project_config, token, self.key)
+
+  def test_decide_all_from_token(self):
+    """ Test that decide_all_from_token reuses the decisions of a valid token without deciding again
+    or sending impressions. """
+
+    token = self.optimizely.create_decision_token(self.bundle, self.key)
+
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature') as mock_decision, \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      self.assertEqual(self.bundle, self.optimizely.decide_all_from_token(token, self.key, 'test_user'))
+
+    self.assertEqual(0, mock_decision.call_count)
+    self.assertEqual(0, mock_dispatch_event.call_count)
+
+  def test_decide_all_from_token__falls_back(self):
+    """ Test that decide_all_from_token decides again if the token was issued with another revision. """
+
+    token = self.optimizely.create_decision_token(self.bundle, self.key)
+    config_dict = copy.deepcopy(self.config_dict_with_features)
+    config_dict['revision'] = '2'
+    opt_obj = optimizely.Optimizely(json.dumps(config_dict))
+
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging, \
+            mock.patch.object(opt_obj, 'decide_all') as mock_decide_all:
+      self.assertEqual(mock_decide_all.return_value,
+                       opt_obj.decide_all_from_token(token, self.key, 'test_user', {'test_attribute': 'test_value_1'}))
+
+    mock_decide_all.assert_called_once_with('test_user', {'test_attribute': 'test_value_1'})
+    mock_client_logging.warning.assert_called_once_with(
+      'Provided decision token is invalid: issued for revision 1. Falling back to local evaluation.'
+    )
+
+  def test_decide_all_from_token__malformed_payload(self):
+    """ Test that decide_all_from_token decides again if the payload of a correctly signed token is malformed. """
+
+    payload = [decision_token.TOKEN_FORMAT_VERSION, self.project_config.revision, 'test_user',
+               [['test_feature_in_experiment', 1]]]
+    encoded_payload = decision_token._encode(json.dumps(payload).encode('utf-8'))
+    token = (encoded_payload + b'.' + decision_token._encode(decision_token._sign(encoded_payload, self.key)))
+
+    with mock.patch.object(self.optimizely, 'decide_all') as mock_decide_all:
+      self.assertEqual(mock_decide_all.return_value,
+                       self.optimizely.decide_all_from_token(token.decode('ascii'), self.key, 'test_user'))
+
+    mock_decide_all.assert_called_once_with('test_user', None)
+
+  def test_create_decision_token__invalid_inputs(self):
+    """ Test that create_decision_token returns None for invalid bundles. """
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertIsNone(self.optimizely.create_decision_token({}, self.key))
+      with mock.patch.object(self.project_config, 'revision', '2'):
+        self.assertIsNone(self.optimizely.create_decision_token(self.bundle, self.key))
+
+    self.assertEqual([mock.call('Provided "bundle" is in an invalid format.'),
+                      mock.call('Provided decision token is invalid: decided with revision 1.')],
+                     mock_client_logging.error.call_args_list)
+
+  def test_create_decision_token__invalid_key(self):
+    """ Test that create_decision_token returns None for keys which are not non-empty strings or bytes. """
+
+    for key in [None, 123, '', b'']:
+      with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+        self.assertIsNone(self.optimizely.create_decision_token(self.bundle, key))
+
+      mock_client_logging.error.assert_called_once_with('Provided "key" is in an invalid format.')
+
+  def test_decide_all_from_token__invalid_key(self):
+    """ Test that decide_all_from_token returns None for keys which are not non-empty strings or bytes. """
+
+    token = self.optimizely.create_decision_token(self.bundle, self.key)
+    for key in [None, 123, '', b'']:
+      with mock.patch.object(self.optimizely, 'logger') as mock_client_logging, \
+              mock.patch.object(self.optimizely, 'decide_all') as mock_decide_all:
+        self.assertIsNone(self.optimizely.decide_all_from_token(token, key, 'test_user'))
+
+      self.assertEqual(0, mock_decide_all.call_count)
+      mock_client_logging.error.assert_called_once_with('Provided "key" is in an invalid format.')
@@ -100,6 +100,66 @@ class EventBuilderTest(base.BaseTest):
                                 event_builder.EventBuilder.HTTP_VERB,
                                 event_builder.EventBuilder.HTTP_HEADERS)
 
+  def test_create_impression_event_batch(self):
+    """ Test that create_impression_event_batch creates one Event with a visitor per user
+    and a snapshot per impression. """
+
+    def get_snapshot(experiment_id, variation_id, campaign_id):
+      return {
+        'decisions': [{
+          'variation_id': variation_id,
+          'experiment_id': experiment_id,
+          'campaign_id': campaign_id
+        }],
+        'events': [{
+          'timestamp': 42123,
+          'entity_id': campaign_id,
+          'uuid': 'a68cf1ad-0393-4e18-af87-efe8f01a7c9c',
+          'key': 'campaign_activated'
+        }]
+      }
+
+    expected_params = {
+      'account_id': '12001',
+      'project_id': '111001',
+      'visitors': [{
+        'visitor_id': 'test_user',
+        'attributes': [],
+        'snapshots': [get_snapshot('111127', '111129', '111182'), get_snapshot('32222', '28901', '111183')]
+      }, {
+        'visitor_id': 'other_user',
+        'attributes': [{
+          'type': 'custom',
+          'value': 'test_value',
+          'entity_id': '111094',
+          'key': 'test_attribute'
+        }],
+        'snapshots': [get_snapshot('111127', '111128', '111182')]
+      }],
+      'client_name': 'python-sdk',
+      'client_version': version.__version__,
+      'anonymize_ip': False,
+      'revision': '42'
+    }
+
+    test_experiment = self.project_config.get_experiment_from_key('test_experiment')
+    group_experiment = self.project_config.get_experiment_from_key('group_exp_1')
+    attributes = {'test_attribute': 'test_value'}
+    with mock.patch('time.time', return_value=42.123), \
+         mock.patch('uuid.uuid4', return_value='a68cf1ad-0393-4e18-af87-efe8f01a7c9c'):
+      event_obj = self.event_builder.create_impression_event_batch([
+        (test_experiment, '111129', 'test_user', None),
+        (test_experiment, '111128', 'other_user', attributes),
+        (group_experiment, '28901', 'test_user', None)
+      ])
+
+    self._validate_event_object(event_obj,
+                                event_builder.EventBuilder.EVENTS_URL,
+                                expected_params,
+                                event_builder.EventBuilder.HTTP_VERB,
+                                event_builder.EventBuilder.HTTP_HEADERS)
+    self.assertIsNone(self.event_builder.create_impression_event_batch([]))
+
   def test_create_impression_event__with_attributes(self):
     """ Test that create_impression_event creates Event object
     with right params when attributes are provided. """
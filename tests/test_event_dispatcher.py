@@ -35,7 +35,7 @@ class EventDispatcherTest(unittest.TestCase):
     event = event_builder.Event(url, params)
 
     with mock.patch('requests.get') as mock_request_get:
-      event_dispatcher.EventDispatcher.dispatch_event(event)
+      self.assertTrue(event_dispatcher.EventDispatcher.dispatch_event(event))
 
     mock_request_get.assert_called_once_with(url, params=params, timeout=event_dispatcher.REQUEST_TIMEOUT)
 
@@ -73,7 +73,7 @@ class EventDispatcherTest(unittest.TestCase):
     with mock.patch('requests.post',
                     side_effect=request_exception.RequestException('Failed Request')) as mock_request_post,\
       mock.patch('logging.error') as mock_log_error:
-      event_dispatcher.EventDispatcher.dispatch_event(event)
+      self.assertFalse(event_dispatcher.EventDispatcher.dispatch_event(event))
 
     mock_request_post.assert_called_once_with(url, data=json.dumps(params),
                                               headers={'Content-Type': 'application/json'},
@@ -0,0 +1,107 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+import unittest
+
+from optimizely import forced_variation_store
+from optimizely import optimizely
+
+from . import base
+
+
+class ForcedVariationStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.store = forced_variation_store.ForcedVariationStore()
+
+  def test_set_forced_variation(self):
+    """ Test that forced variations are kept per user and replace earlier ones for the same experiment. """
+
+    self.assertFalse(self.store.has_forced_variations())
+    self.assertIsNone(self.store.get_forced_variations('test_user'))
+
+    self.store.set_forced_variation('test_user', '111127', '111128')
+    self.store.set_forced_variation('test_user', '32222', '28901')
+    self.store.set_forced_variation('test_user', '111127', '111129')
+    self.store.set_forced_variation('other_user', '111127', '111128')
+
+    self.assertTrue(self.store.has_forced_variations())
+    self.assertEqual({'111127': '111129', '32222': '28901'}, self.store.get_forced_variations('test_user'))
+    self.assertEqual({'111127': '111128'}, self.store.get_forced_variations('other_user'))
+
+  def test_set_forced_variation__does_not_mutate_maps_handed_out(self):
+    """ Test that maps handed out stay unchanged by later updates. """
+
+    self.store.set_forced_variation('test_user', '111127', '111128')
+    forced_variations = self.store.get_forced_variations('test_user')
+    self.store.set_forced_variation('test_user', '32222', '28901')
+    self.store.remove_forced_variation('test_user', '111127')
+
+    self.assertEqual({'111127': '111128'}, forced_variations)
+
+  def test_remove_forced_variation(self):
+    """ Test that removing the last forced variation of a user drops the user. """
+
+    self.store.set_forced_variation('test_user', '111127', '111128')
+
+    self.assertFalse(self.store.remove_forced_variation('test_user', '32222'))
+    self.assertFalse(self.store.remove_forced_variation('other_user', '111127'))
+    self.assertTrue(self.store.remove_forced_variation('test_user', '111127'))
+    self.assertIsNone(self.store.get_forced_variations('test_user'))
+    self.assertFalse(self.store.has_forced_variations())
+
+  def test_capacity(self):
+    """ Test that forced variations of the least recently used users are evicted once over capacity. """
+
+    store = forced_variation_store.ForcedVariationStore(capacity=2)
+    for user_id in ['user_1', 'user_2', 'user_3']:
+      store.set_forced_variation(user_id, '111127', '111128')
+
+    self.assertIsNone(store.get_forced_variations('user_1'))
+    self.assertEqual({'111127': '111128'}, store.get_forced_variations('user_3'))
+
+  def test_timeout(self):
+    """ Test that forced variations expire after the timeout. """
+
+    store = forced_variation_store.ForcedVariationStore(timeout=60)
+    with mock.patch('time.time', return_value=1000):
+      store.set_forced_variation('test_user', '111127', '111128')
+
+    with mock.patch('time.time', return_value=1061):
+      self.assertIsNone(store.get_forced_variations('test_user'))
+
+  def test_has_forced_variations__expired(self):
+    """ Test that expired forced variations are not reported, without looking them up. """
+
+    store = forced_variation_store.ForcedVariationStore(timeout=60)
+    with mock.patch('time.time', return_value=1000):
+      store.set_forced_variation('test_user', '111127', '111128')
+      self.assertTrue(store.has_forced_variations())
+
+    with mock.patch('time.time', return_value=1061):
+      self.assertFalse(store.has_forced_variations())
+
+
+class OptimizelyForcedVariationStoreTest(base.BaseTest):
+
+  def test_forced_variations_kept_in_given_store(self):
+    """ Test that a client keeps forced variations in the store it was given. """
+
+    store = forced_variation_store.ForcedVariationStore()
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict), forced_variation_store=store)
+
+    self.assertTrue(opt_obj.set_forced_variation('test_experiment', 'test_user', 'variation'))
+    self.assertEqual({'111127': '111129'}, store.get_forced_variations('test_user'))
+    self.assertEqual('variation', opt_obj.get_variation('test_experiment', 'test_user'))
@@ -0,0 +1,168 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+
+from optimizely import impression_cache
+from optimizely import optimizely
+from optimizely.helpers import enums
+
+from . import base
+
+
+class ImpressionCacheTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.impression_cache = impression_cache.ImpressionCache()
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                            impression_cache=self.impression_cache)
+    self.project_config = self.optimizely.config
+    self.experiment = self.project_config.get_experiment_from_key('test_experiment')
+    self.variation = self.project_config.get_variation_from_key('test_experiment', 'variation')
+
+  def test_should_send(self):
+    """ Test that impressions are sent once per user, experiment, variation and revision. """
+
+    self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_1'))
+    self.assertFalse(self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_1'))
+    self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_2'))
+
+    control = self.project_config.get_variation_from_key('test_experiment', 'control')
+    self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, control, 'user_1'))
+
+    with mock.patch.object(self.project_config, 'revision', '2'):
+      self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation,
+                                                        'user_1'))
+
+    self.assertEqual({'entries': 4, 'sent': 4, 'suppressed': 1, 'evictions': 0}, self.impression_cache.get_metrics())
+
+  def test_should_send__expired(self):
+    """ Test that impressions are sent again once the timeout elapsed. """
+
+    with mock.patch('time.time', return_value=42):
+      self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation,
+                                                        'user_1'))
+
+    with mock.patch('time.time', return_value=42 + enums.ImpressionCache.DEFAULT_TIMEOUT + 1):
+      self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation,
+                                                        'user_1'))
+
+  def test_should_send__bounded(self):
+    """ Test that the least recently sent impressions are forgotten once the cache is full. """
+
+    cache = impression_cache.ImpressionCache(capacity=1)
+    self.assertTrue(cache.should_send(self.project_config, self.experiment, self.variation, 'user_1'))
+    self.assertTrue(cache.should_send(self.project_config, self.experiment, self.variation, 'user_2'))
+    self.assertTrue(cache.should_send(self.project_config, self.experiment, self.variation, 'user_1'))
+    self.assertEqual({'entries': 1, 'sent': 3, 'suppressed': 0, 'evictions': 2}, cache.get_metrics())
+
+  def test_reset(self):
+    """ Test that impressions are forgotten on reset but metrics are kept. """
+
+    self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_1')
+    self.impression_cache.reset()
+
+    self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_1'))
+    self.assertEqual({'entries': 1, 'sent': 2, 'suppressed': 0, 'evictions': 0}, self.impression_cache.get_metrics())
+
+  def test_forget(self):
+    """ Test that forgotten impressions are sent again and no longer counted as sent. """
+
+    self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_1')
+    self.impression_cache.forget(self.project_config, self.experiment, self.variation, 'user_1')
+    self.assertEqual({'entries': 0, 'sent': 0, 'suppressed': 0, 'evictions': 0}, self.impression_cache.get_metrics())
+
+    self.assertTrue(self.impression_cache.should_send(self.project_config, self.experiment, self.variation, 'user_1'))
+
+  def test_is_feature_enabled__repeated_impressions_suppressed(self):
+    """ Test that is_feature_enabled sends the impression of a user once and still notifies of suppressed ones. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event, \
+            mock.patch('optimizely.notification_center.NotificationCenter.send_notifications') as mock_broadcast:
+      for _ in range(3):
+        self.assertTrue(self.optimizely.is_feature_enabled('test_feature_in_experiment', 'test_user'))
+
+    self.assertEqual(1, mock_dispatch_event.call_count)
+    self.assertEqual(3, mock_broadcast.call_count)
+    mock_broadcast.assert_called_with(enums.NotificationTypes.ACTIVATE, self.experiment, 'test_user', None,
+                                      self.variation, None)
+    self.assertEqual(2, self.impression_cache.get_metrics()['suppressed'])
+
+  def test_is_feature_enabled__suppressed_impressions_not_notified(self):
+    """ Test that no ACTIVATE notification is sent for suppressed impressions if the cache is configured so. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                    impression_cache=impression_cache.ImpressionCache(notify_suppressed=False))
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event, \
+            mock.patch('optimizely.notification_center.NotificationCenter.send_notifications') as mock_broadcast:
+      opt_obj.is_feature_enabled('test_feature_in_experiment', 'test_user')
+      opt_obj.is_feature_enabled('test_feature_in_experiment', 'test_user')
+
+    self.assertEqual(1, mock_dispatch_event.call_count)
+    self.assertEqual(1, mock_broadcast.call_count)
+
+  def test_is_feature_enabled__failed_dispatch_not_suppressed(self):
+    """ Test that impressions which could not be dispatched are sent again when they repeat. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event',
+                       side_effect=[Exception('Failed to send'), False, None, None]) as mock_dispatch_event:
+      for _ in range(4):
+        self.optimizely.is_feature_enabled('test_feature_in_experiment', 'test_user')
+
+    self.assertEqual(3, mock_dispatch_event.call_count)
+    self.assertEqual({'entries': 1, 'sent': 1, 'suppressed': 1, 'evictions': 0}, self.impression_cache.get_metrics())
+
+  def test_is_feature_enabled_many__failed_dispatch_not_suppressed(self):
+    """ Test that batched impressions which could not be dispatched are sent again when they repeat. """
+
+    users = [('user_1', None), ('user_2', None)]
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event',
+                       side_effect=[Exception('Failed to send'), None, None]) as mock_dispatch_event:
+      self.optimizely.is_feature_enabled_many('test_feature_in_experiment', users)
+      self.optimizely.is_feature_enabled_many('test_feature_in_experiment', users)
+      self.optimizely.is_feature_enabled_many('test_feature_in_experiment', users)
+
+    self.assertEqual(2, mock_dispatch_event.call_count)
+    impression_event = mock_dispatch_event.call_args_list[1][0][0]
+    self.assertEqual(['user_1', 'user_2'], [visitor['visitor_id'] for visitor in impression_event.params['visitors']])
+
+  def test_activate__not_suppressed(self):
+    """ Test that activate always sends impressions. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      self.optimizely.is_feature_enabled('test_feature_in_experiment', 'test_user')
+      self.assertEqual('variation', self.optimizely.activate('test_experiment', 'test_user'))
+      self.assertEqual('variation', self.optimizely.activate('test_experiment', 'test_user'))
+
+    self.assertEqual(3, mock_dispatch_event.call_count)
+
+  def test_is_feature_enabled_many__repeated_impressions_suppressed(self):
+    """ Test that batched impressions leave out those sent recently. """
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=self.variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      self.optimizely.is_feature_enabled('test_feature_in_experiment', 'user_1')
+      self.optimizely.is_feature_enabled_many('test_feature_in_experiment', [('user_1', None), ('user_2', None)])
+      self.optimizely.is_feature_enabled_many('test_feature_in_experiment', [('user_1', None), ('user_2', None)])
+
+    self.assertEqual(2, mock_dispatch_event.call_count)
+    impression_event = mock_dispatch_event.call_args_list[1][0][0]
+    self.assertEqual(['user_2'], [visitor['visitor_id'] for visitor in impression_event.params['visitors']])
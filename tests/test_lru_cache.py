@@ -0,0 +1,131 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import threading
+import unittest
+
+from optimizely.lru_cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+
+  def test_lookup__saved_value(self):
+    """ Test that lookup returns the saved value and the default for unknown keys. """
+
+    cache = LRUCache()
+    cache.save('key', 'value')
+
+    self.assertEqual('value', cache.lookup('key'))
+    self.assertIsNone(cache.lookup('other_key'))
+    self.assertEqual('default', cache.lookup('other_key', 'default'))
+    self.assertEqual(1, len(cache))
+
+  def test_save__evicts_least_recently_used(self):
+    """ Test that saving into a full cache evicts the least recently used entry. """
+
+    cache = LRUCache(capacity=2)
+    cache.save('a', 1)
+    cache.save('b', 2)
+    # Looking up marks the entry as most recently used
+    cache.lookup('a')
+    cache.save('c', 3)
+
+    self.assertEqual(2, len(cache))
+    self.assertEqual(1, cache.evictions)
+    self.assertEqual(1, cache.lookup('a'))
+    self.assertIsNone(cache.lookup('b'))
+    self.assertEqual(3, cache.lookup('c'))
+
+  def test_lookup__expired(self):
+    """ Test that entries expire after the timeout and are dropped when looked up. """
+
+    cache = LRUCache(timeout=10)
+    with mock.patch('time.time', return_value=100):
+      cache.save('key', 'value')
+
+    with mock.patch('time.time', return_value=110):
+      self.assertEqual('value', cache.lookup('key'))
+
+    with mock.patch('time.time', return_value=111):
+      self.assertIsNone(cache.lookup('key'))
+
+    self.assertEqual(0, len(cache))
+
+  def test_has_entries(self):
+    """ Test that has_entries is False once all entries expired and drops them. """
+
+    cache = LRUCache(timeout=10)
+    self.assertFalse(cache.has_entries())
+
+    with mock.patch('time.time', return_value=100):
+      cache.save('a', 1)
+    with mock.patch('time.time', return_value=105):
+      cache.save('b', 2)
+
+    with mock.patch('time.time', return_value=115):
+      self.assertTrue(cache.has_entries())
+      self.assertEqual(2, len(cache))
+
+    with mock.patch('time.time', return_value=116):
+      self.assertFalse(cache.has_entries())
+    self.assertEqual(0, len(cache))
+
+  def test_update(self):
+    """ Test that update replaces the value with the result of the function and removes it on None. """
+
+    cache = LRUCache()
+
+    self.assertEqual(1, cache.update('key', lambda value: (value or 0) + 1))
+    self.assertEqual(2, cache.update('key', lambda value: (value or 0) + 1))
+    self.assertEqual(2, cache.lookup('key'))
+
+    self.assertIsNone(cache.update('key', lambda value: None))
+    self.assertEqual(0, len(cache))
+
+  def test_update__concurrent(self):
+    """ Test that concurrent updates are not lost. """
+
+    cache = LRUCache()
+
+    def increment():
+      for _ in range(1000):
+        cache.update('key', lambda value: (value or 0) + 1)
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(4000, cache.lookup('key'))
+
+  def test_remove(self):
+    """ Test that remove reports whether there was an entry. """
+
+    cache = LRUCache()
+    cache.save('key', 'value')
+
+    self.assertTrue(cache.remove('key'))
+    self.assertFalse(cache.remove('key'))
+    self.assertIsNone(cache.lookup('key'))
+
+  def test_reset(self):
+    """ Test that reset removes all entries. """
+
+    cache = LRUCache()
+    cache.save('a', 1)
+    cache.save('b', 2)
+    cache.reset()
+
+    self.assertEqual(0, len(cache))
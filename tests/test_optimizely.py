@@ -11,10 +11,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import json
 import mock
 from operator import itemgetter
 
+from optimizely import config_manager
 from optimizely import decision_service
 from optimizely import entities
 from optimizely import error_handler
@@ -24,6 +26,7 @@ from optimizely import logger
 from optimizely import optimizely
 from optimizely import project_config
 from optimizely import version
+from optimizely.helpers import condition as condition_helper
 from optimizely.helpers import enums
 from optimizely.notification_center import NotificationCenter
 from . import base
@@ -1405,6 +1408,30 @@ class OptimizelyTest(base.BaseTest):
     mock_is_experiment_running.assert_called_once_with(self.project_config.get_experiment_from_key('test_experiment'))
     self.assertEqual(0, mock_dispatch_event.call_count)
 
+  def test_track__decides_for_running_experiments_only(self):
+    """ Test that track decides once for each running experiment of the event by entity,
+    without looking experiments or variations up by key. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['groups'][0]['experiments'][0]['status'] = 'Paused'
+    config_dict['events'][0]['experimentIds'] = ['111127', '32222']
+    opt_obj = optimizely.Optimizely(json.dumps(config_dict))
+    experiment = opt_obj.config.get_experiment_from_key('test_experiment')
+    variation = opt_obj.config.get_variation_from_key('test_experiment', 'variation')
+
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation',
+                    return_value=variation) as mock_get_variation, \
+            mock.patch.object(opt_obj.config, 'get_experiment_from_key') as mock_get_experiment, \
+            mock.patch.object(opt_obj.config, 'get_variation_from_key') as mock_get_variation_from_key, \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      opt_obj.track('test_event', 'test_user')
+
+    mock_get_variation.assert_called_once_with(experiment, 'test_user', None)
+    self.assertEqual(0, mock_get_experiment.call_count)
+    self.assertEqual(0, mock_get_variation_from_key.call_count)
+    self.assertEqual([{'variation_id': '111129', 'experiment_id': '111127', 'campaign_id': '111182'}],
+                     mock_dispatch_event.call_args[0][0].params['visitors'][0]['snapshots'][0]['decisions'])
+
   def test_track_invalid_event_key(self):
     """ Test that track does not call dispatch_event when event does not exist. """
     dispatch_event_patch = mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event')
@@ -1473,6 +1500,79 @@ class OptimizelyTest(base.BaseTest):
 
     mock_client_logging.error.assert_called_once_with('Datafile has invalid format. Failing "get_variation".')
 
+  def test_get_variation_many(self):
+    """ Test that get_variation_many returns the variations of many users in order, as get_variation does. """
+
+    users = [('test_user_1', {'test_attribute': 'test_value_1'}),
+             ('test_user_2', {'test_attribute': 'test_value_2'}),
+             ('test_user_3', {'test_attribute': 'test_value_1'}),
+             (42, None),
+             ('test_user_4', 'invalid')]
+
+    expected = [self.optimizely.get_variation('test_experiment', user_id, attributes)
+                for user_id, attributes in users[:3]] + [None, None]
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging, \
+            mock.patch('optimizely.helpers.condition.CustomAttributeConditionEvaluator.evaluate', autospec=True,
+                       side_effect=condition_helper.CustomAttributeConditionEvaluator.evaluate) as mock_evaluate, \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      variation_keys = self.optimizely.get_variation_many('test_experiment', users)
+
+    self.assertEqual(expected, variation_keys)
+    # Users with the same attributes share the results of evaluating audiences
+    self.assertEqual(2, mock_evaluate.call_count)
+    self.assertEqual(0, mock_dispatch_event.call_count)
+    mock_client_logging.error.assert_any_call('Provided "user_id" is in an invalid format.')
+    mock_client_logging.error.assert_any_call('Provided attributes are in an invalid format.')
+
+  def test_get_variation_many__user_profiles_looked_up_once(self):
+    """ Test that get_variation_many looks up the profiles of all users at once and saves each once. """
+
+    user_profile_service = mock.Mock(spec=['lookup', 'lookup_many', 'save'])
+    user_profile_service.lookup_many.return_value = {
+      'test_user_1': {'user_id': 'test_user_1', 'experiment_bucket_map': {'111127': {'variation_id': '111128'}}}
+    }
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict), user_profile_service=user_profile_service)
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket',
+                    return_value=opt_obj.config.get_variation_from_id('test_experiment', '111129')) as mock_bucket:
+      self.assertEqual(['control', 'variation', 'variation'],
+                       opt_obj.get_variation_many('test_experiment',
+                                                  [('test_user_1', {'test_attribute': 'test_value_1'}),
+                                                   ('test_user_2', {'test_attribute': 'test_value_1'}),
+                                                   ('test_user_2', {'test_attribute': 'test_value_1'})]))
+
+    # The decision stored for the first entry of a user applies to the next ones
+    self.assertEqual(1, mock_bucket.call_count)
+    self.assertEqual(1, user_profile_service.lookup_many.call_count)
+    self.assertEqual(['test_user_1', 'test_user_2'], sorted(user_profile_service.lookup_many.call_args[0][0]))
+    self.assertEqual(0, user_profile_service.lookup.call_count)
+    user_profile_service.save.assert_any_call({'user_id': 'test_user_2',
+                                                       'experiment_bucket_map': {'111127': {'variation_id': '111129'}}})
+
+  def test_get_variation_many__invalid_inputs(self):
+    """ Test that get_variation_many returns no variations for invalid inputs. """
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertEqual([], self.optimizely.get_variation_many('test_experiment', 'user_1'))
+      self.assertEqual([None], self.optimizely.get_variation_many(None, [('user_1', None)]))
+      self.assertEqual([None], self.optimizely.get_variation_many('test_experiment', ['user_1']))
+      self.assertEqual([None], self.optimizely.get_variation_many('unknown_experiment', [('user_1', None)]))
+
+    self.assertEqual([mock.call('Provided "users" is in an invalid format.'),
+                      mock.call('Provided "experiment_key" is in an invalid format.'),
+                      mock.call('Provided "users" is in an invalid format.')],
+                     mock_client_logging.error.call_args_list)
+    mock_client_logging.info.assert_called_once_with(
+      'Experiment key "unknown_experiment" is invalid. Not activating 1 users.'
+    )
+
+    opt_obj = optimizely.Optimizely('invalid_datafile')
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertEqual([None], opt_obj.get_variation_many('test_experiment', [('user_1', None)]))
+
+    mock_client_logging.error.assert_called_once_with('Datafile has invalid format. Failing "get_variation_many".')
+
   def test_get_variation_unknown_experiment_key(self):
     """ Test that get_variation retuns None when invalid experiment key is given. """
     with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
@@ -1810,28 +1910,123 @@ class OptimizelyTest(base.BaseTest):
     # Check that no event is sent
     self.assertEqual(0, mock_dispatch_event.call_count)
 
+  def test_is_feature_enabled_many(self):
+    """ Test that is_feature_enabled_many decides for many users as is_feature_enabled does
+    and sends their impressions in a single event. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    users = [('user_%s' % idx, {'test_attribute': 'test_value_1'}) for idx in range(10)] + [(None, None)]
+
+    variation = opt_obj.config.get_variation_from_id('test_experiment', '111129')
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'):
+      expected = [opt_obj.is_feature_enabled('test_feature_in_experiment', user_id, attributes)
+                  for user_id, attributes in users]
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket', return_value=variation), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event, \
+            mock.patch('optimizely.notification_center.NotificationCenter.send_notifications') as mock_broadcast, \
+            mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      enabled = opt_obj.is_feature_enabled_many('test_feature_in_experiment', users)
+
+    self.assertEqual([True] * 10 + [False], enabled)
+    self.assertEqual(expected, enabled)
+    mock_dispatch_event.assert_called_once()
+    impression_event = mock_dispatch_event.call_args[0][0]
+    self.assertEqual([user_id for user_id, _ in users[:-1]],
+                     [visitor['visitor_id'] for visitor in impression_event.params['visitors']])
+    self.assertEqual(10, mock_broadcast.call_count)
+    mock_client_logging.info.assert_called_once_with(
+      'Feature "test_feature_in_experiment" is enabled for 10 of 11 users.'
+    )
+
+  def test_is_feature_enabled_many__rollout(self):
+    """ Test that is_feature_enabled_many sends no impression for decisions made by rollouts. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    mock_experiment = opt_obj.config.get_experiment_from_key('211127')
+    mock_variation = opt_obj.config.get_variation_from_id('211127', '211129')
+
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
+                    return_value=decision_service.Decision(mock_experiment, mock_variation,
+                                                           decision_service.DECISION_SOURCE_ROLLOUT)), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      self.assertEqual([True, True],
+                       opt_obj.is_feature_enabled_many('test_feature_in_rollout', [('user_1', None), ('user_2', None)]))
+
+    self.assertEqual(0, mock_dispatch_event.call_count)
+
+  def test_is_feature_enabled_many__invalid_inputs(self):
+    """ Test that is_feature_enabled_many returns False for all users for invalid inputs. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertEqual([], opt_obj.is_feature_enabled_many('test_feature_in_rollout', None))
+      self.assertEqual([False], opt_obj.is_feature_enabled_many('', [('user_1', None)]))
+      self.assertEqual([False], opt_obj.is_feature_enabled_many('unknown_feature', [('user_1', None)]))
+
+    self.assertEqual([mock.call('Provided "users" is in an invalid format.'),
+                      mock.call('Provided "feature_key" is in an invalid format.')],
+                     mock_client_logging.error.call_args_list)
+
+    opt_obj = optimizely.Optimizely('invalid_datafile')
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertEqual([False], opt_obj.is_feature_enabled_many('test_feature_in_rollout', [('user_1', None)]))
+
+    mock_client_logging.error.assert_called_once_with(
+      'Datafile has invalid format. Failing "is_feature_enabled_many".'
+    )
+
   def test_get_enabled_features(self):
     """ Test that get_enabled_features only returns features that are enabled for the specified user. """
 
     opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    config_bundle = opt_obj._config_bundle
 
     def side_effect(*args, **kwargs):
-      feature_key = args[0]
+      feature_key = args[1]
       if feature_key == 'test_feature_in_experiment' or feature_key == 'test_feature_in_rollout':
         return True
 
       return False
 
-    with mock.patch('optimizely.optimizely.Optimizely.is_feature_enabled',
+    with mock.patch('optimizely.optimizely.Optimizely._is_feature_enabled',
                     side_effect=side_effect) as mock_is_feature_enabled:
       received_features = opt_obj.get_enabled_features('user_1')
 
     expected_enabled_features = ['test_feature_in_experiment', 'test_feature_in_rollout']
     self.assertEqual(sorted(expected_enabled_features), sorted(received_features))
-    mock_is_feature_enabled.assert_any_call('test_feature_in_experiment', 'user_1', None)
-    mock_is_feature_enabled.assert_any_call('test_feature_in_rollout', 'user_1', None)
-    mock_is_feature_enabled.assert_any_call('test_feature_in_group', 'user_1', None)
-    mock_is_feature_enabled.assert_any_call('test_feature_in_experiment_and_rollout', 'user_1', None)
+    mock_is_feature_enabled.assert_any_call(config_bundle, 'test_feature_in_experiment', 'user_1', None)
+    mock_is_feature_enabled.assert_any_call(config_bundle, 'test_feature_in_rollout', 'user_1', None)
+    mock_is_feature_enabled.assert_any_call(config_bundle, 'test_feature_in_group', 'user_1', None)
+    mock_is_feature_enabled.assert_any_call(config_bundle, 'test_feature_in_experiment_and_rollout', 'user_1', None)
+
+  def test_get_enabled_features__user_profile_looked_up_and_saved_once(self):
+    """ Test that get_enabled_features looks the user's profile up once and saves it once. """
+
+    user_profiles = {}
+    user_profile_service = mock.Mock(
+      lookup=mock.Mock(side_effect=lambda user_id: copy.deepcopy(user_profiles.get(user_id))),
+      save=mock.Mock(side_effect=lambda user_profile: user_profiles.update({user_profile['user_id']: user_profile}))
+    )
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                    user_profile_service=user_profile_service)
+
+    with mock.patch('optimizely.bucketer.Bucketer.bucket',
+                    side_effect=lambda experiment, *args: entities.Variation(experiment.variations[0]['id'],
+                                                                             experiment.variations[0]['key'])), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'):
+      opt_obj.get_enabled_features('test_user', {'test_attribute': 'test_value_1'})
+
+    user_profile_service.lookup.assert_called_once_with('test_user')
+    user_profile_service.save.assert_called_once()
+    self.assertIn('111127', user_profiles['test_user']['experiment_bucket_map'])
+
+    # Nothing is saved once all decisions are stored
+    opt_obj.get_enabled_features('test_user', {'test_attribute': 'test_value_1'})
+    self.assertEqual(2, user_profile_service.lookup.call_count)
+    self.assertEqual(1, user_profile_service.save.call_count)
 
   def test_get_enabled_features_invalid_user_id(self):
     with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
@@ -1858,6 +2053,66 @@ class OptimizelyTest(base.BaseTest):
 
     mock_client_logging.error.assert_called_once_with('Datafile has invalid format. Failing "get_enabled_features".')
 
+  def test_get_all_feature_variables(self):
+    """ Test that get_all_feature_variables decides once and returns the typed values of all variables. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    mock_experiment = opt_obj.config.get_experiment_from_key('test_experiment')
+    mock_variation = opt_obj.config.get_variation_from_id('test_experiment', '111129')
+    decision = decision_service.Decision(mock_experiment, mock_variation, decision_service.DECISION_SOURCE_EXPERIMENT)
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
+                    return_value=decision) as mock_decision:
+      variables = opt_obj.get_all_feature_variables('test_feature_in_experiment', 'test_user')
+      expected = dict((variable_key, getattr(opt_obj, 'get_feature_variable_%s' % variable_type)(
+        'test_feature_in_experiment', variable_key, 'test_user'
+      )) for variable_key, variable_type in [('is_working', 'boolean'), ('environment', 'string'),
+                                             ('cost', 'double'), ('count', 'integer'),
+                                             ('variable_without_usage', 'integer')])
+
+    self.assertEqual(6, mock_decision.call_count)
+    self.assertEqual(expected, variables)
+    self.assertEqual(variables['count'], variables.get_integer('count'))
+    self.assertIsNone(variables.get_boolean('count'))
+
+  def test_get_all_feature_variables__default_values(self):
+    """ Test that get_all_feature_variables returns the default values if the user is in no variation. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
+                    return_value=decision_service.Decision(None, None, decision_service.DECISION_SOURCE_ROLLOUT)), \
+            mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      variables = opt_obj.get_all_feature_variables('test_feature_in_experiment', 'test_user')
+
+    self.assertEqual({'is_working': True, 'environment': 'devel', 'cost': 10.99, 'count': 999,
+                      'variable_without_usage': 45}, variables)
+    mock_client_logging.info.assert_called_once_with(
+      'User "test_user" is not in any variation or rollout rule. '
+      'Returning default values for variables of feature flag "test_feature_in_experiment".'
+    )
+
+  def test_get_all_feature_variables__invalid_inputs(self):
+    """ Test that get_all_feature_variables returns None for invalid inputs or features. """
+
+    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertIsNone(opt_obj.get_all_feature_variables(None, 'test_user'))
+      self.assertIsNone(opt_obj.get_all_feature_variables('test_feature_in_experiment', 42))
+      self.assertIsNone(opt_obj.get_all_feature_variables('test_feature_in_experiment', 'test_user', 'invalid'))
+      self.assertIsNone(opt_obj.get_all_feature_variables('unknown_feature', 'test_user'))
+
+    self.assertEqual([mock.call('Provided "feature_key" is in an invalid format.'),
+                      mock.call('Provided "user_id" is in an invalid format.'),
+                      mock.call('Provided attributes are in an invalid format.')],
+                     mock_client_logging.error.call_args_list)
+
+    opt_obj = optimizely.Optimizely('invalid_datafile')
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertIsNone(opt_obj.get_all_feature_variables('test_feature_in_experiment', 'test_user'))
+
+    mock_client_logging.error.assert_called_once_with(
+      'Datafile has invalid format. Failing "get_all_feature_variables".'
+    )
+
   def test_get_feature_variable_boolean(self):
     """ Test that get_feature_variable_boolean returns Boolean value as expected. """
 
@@ -1871,9 +2126,8 @@ class OptimizelyTest(base.BaseTest):
          mock.patch.object(opt_obj.config, 'logger') as mock_config_logging:
       self.assertTrue(opt_obj.get_feature_variable_boolean('test_feature_in_experiment', 'is_working', 'test_user'))
 
-    mock_config_logging.info.assert_called_once_with(
-      'Value for variable "is_working" for variation "variation" is "true".'
-    )
+    # Value is type-cast when the config is built, not looked up and logged per call
+    self.assertEqual(0, mock_config_logging.info.call_count)
 
   def test_get_feature_variable_double(self):
     """ Test that get_feature_variable_double returns Double value as expected. """
@@ -1888,9 +2142,8 @@ class OptimizelyTest(base.BaseTest):
          mock.patch.object(opt_obj.config, 'logger') as mock_config_logging:
       self.assertEqual(10.02, opt_obj.get_feature_variable_double('test_feature_in_experiment', 'cost', 'test_user'))
 
-    mock_config_logging.info.assert_called_once_with(
-      'Value for variable "cost" for variation "variation" is "10.02".'
-    )
+    # Value is type-cast when the config is built, not looked up and logged per call
+    self.assertEqual(0, mock_config_logging.info.call_count)
 
   def test_get_feature_variable_integer(self):
     """ Test that get_feature_variable_integer returns Integer value as expected. """
@@ -1905,9 +2158,8 @@ class OptimizelyTest(base.BaseTest):
          mock.patch.object(opt_obj.config, 'logger') as mock_config_logging:
       self.assertEqual(4243, opt_obj.get_feature_variable_integer('test_feature_in_experiment', 'count', 'test_user'))
 
-    mock_config_logging.info.assert_called_once_with(
-      'Value for variable "count" for variation "variation" is "4243".'
-    )
+    # Value is type-cast when the config is built, not looked up and logged per call
+    self.assertEqual(0, mock_config_logging.info.call_count)
 
   def test_get_feature_variable_string(self):
     """ Test that get_feature_variable_string returns String value as expected. """
@@ -1925,71 +2177,30 @@ class OptimizelyTest(base.BaseTest):
         opt_obj.get_feature_variable_string('test_feature_in_experiment', 'environment', 'test_user')
       )
 
-    mock_config_logging.info.assert_called_once_with(
-      'Value for variable "environment" for variation "variation" is "staging".'
-    )
+    # Value is type-cast when the config is built, not looked up and logged per call
+    self.assertEqual(0, mock_config_logging.info.call_count)
 
   def test_get_feature_variable__returns_default_value_if_variable_usage_not_in_variation(self):
     """ Test that get_feature_variable_* returns default value if variable usage not present in variation. """
 
-    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    config_dict = copy.deepcopy(self.config_dict_with_features)
+    # No variable usages for the mocked variation
+    config_dict['experiments'][0]['variations'][1]['variables'] = []
+    opt_obj = optimizely.Optimizely(json.dumps(config_dict))
     mock_experiment = opt_obj.config.get_experiment_from_key('test_experiment')
     mock_variation = opt_obj.config.get_variation_from_id('test_experiment', '111129')
 
-    # Empty variable usage map for the mocked variation
-    opt_obj.config.variation_variable_usage_map['111129'] = None
-
-    # Boolean
     with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
                     return_value=decision_service.Decision(mock_experiment, mock_variation,
-                                                           decision_service.DECISION_SOURCE_EXPERIMENT)), \
-         mock.patch.object(opt_obj.config, 'logger') as mock_config_logger:
+                                                           decision_service.DECISION_SOURCE_EXPERIMENT)):
       self.assertTrue(opt_obj.get_feature_variable_boolean('test_feature_in_experiment', 'is_working', 'test_user'))
-
-    mock_config_logger.info.assert_called_once_with(
-      'Variable "is_working" is not used in variation "variation". Assigning default value "true".'
-    )
-    mock_config_logger.info.reset_mock()
-
-    # Double
-    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
-                    return_value=decision_service.Decision(mock_experiment, mock_variation,
-                                                           decision_service.DECISION_SOURCE_EXPERIMENT)), \
-         mock.patch.object(opt_obj.config, 'logger') as mock_config_logger:
       self.assertEqual(10.99,
                        opt_obj.get_feature_variable_double('test_feature_in_experiment', 'cost', 'test_user'))
-
-    mock_config_logger.info.assert_called_once_with(
-      'Variable "cost" is not used in variation "variation". Assigning default value "10.99".'
-    )
-    mock_config_logger.info.reset_mock()
-
-    # Integer
-    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
-                    return_value=decision_service.Decision(mock_experiment, mock_variation,
-                                                           decision_service.DECISION_SOURCE_EXPERIMENT)), \
-         mock.patch.object(opt_obj.config, 'logger') as mock_config_logger:
       self.assertEqual(999,
                        opt_obj.get_feature_variable_integer('test_feature_in_experiment', 'count', 'test_user'))
-
-    mock_config_logger.info.assert_called_once_with(
-      'Variable "count" is not used in variation "variation". Assigning default value "999".'
-    )
-    mock_config_logger.info.reset_mock()
-
-    # String
-    with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
-                    return_value=decision_service.Decision(mock_experiment, mock_variation,
-                                                           decision_service.DECISION_SOURCE_EXPERIMENT)), \
-         mock.patch.object(opt_obj.config, 'logger') as mock_config_logger:
       self.assertEqual('devel',
                        opt_obj.get_feature_variable_string('test_feature_in_experiment', 'environment', 'test_user'))
 
-    mock_config_logger.info.assert_called_once_with(
-      'Variable "environment" is not used in variation "variation". Assigning default value "devel".'
-    )
-    mock_config_logger.info.reset_mock()
-
   def test_get_feature_variable__returns_default_value_if_no_variation(self):
     """ Test that get_feature_variable_* returns default value if no variation. """
 
@@ -2234,21 +2445,27 @@ class OptimizelyTest(base.BaseTest):
     )
 
   def test_get_feature_variable__returns_none_if_unable_to_cast(self):
-    """ Test that get_feature_variable_* returns None if unable_to_cast_value """
+    """ Test that get_feature_variable_* returns None if the value could not be cast when the config was built. """
+
+    config_dict = copy.deepcopy(self.config_dict_with_features)
+    config_dict['experiments'][0]['variations'][1]['variables'][3]['value'] = 'many'
+    config_logger = logger.adapt_logger(logger.NoOpLogger())
+    with mock.patch.object(config_logger, 'error') as mock_config_logging:
+      opt_obj = optimizely.Optimizely(json.dumps(config_dict), logger=config_logger)
+
+    mock_config_logging.assert_called_once_with('Unable to cast value "many" of variable "count" to type "integer".')
 
-    opt_obj = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
     mock_experiment = opt_obj.config.get_experiment_from_key('test_experiment')
     mock_variation = opt_obj.config.get_variation_from_id('test_experiment', '111129')
     with mock.patch('optimizely.decision_service.DecisionService.get_variation_for_feature',
                     return_value=decision_service.Decision(mock_experiment,
                                                            mock_variation,
                                                            decision_service.DECISION_SOURCE_EXPERIMENT)), \
-         mock.patch('optimizely.project_config.ProjectConfig.get_typecast_value',
-                    side_effect=ValueError()),\
          mock.patch.object(opt_obj, 'logger') as mock_client_logger:
       self.assertEqual(None, opt_obj.get_feature_variable_integer('test_feature_in_experiment', 'count', 'test_user'))
 
-    mock_client_logger.error.assert_called_with('Unable to cast value. Returning None.')
+    # Already reported when the config was built
+    self.assertEqual(0, mock_client_logger.error.call_count)
 
   def test_get_feature_variable_returns__variable_value__typed_audience_match(self):
     """ Test that get_feature_variable_* return variable value with typed audience match. """
@@ -2301,6 +2518,122 @@ class OptimizelyTest(base.BaseTest):
       opt_obj.get_feature_variable_integer('feat2_with_var', 'z', 'user1', {})
     )
 
+  def test_freeze_for_fork(self):
+    """ Test that freeze_for_fork freezes the config and leaves per-client state writable. """
+
+    with mock.patch('gc.freeze', create=True) as mock_gc_freeze:
+      self.optimizely.freeze_for_fork()
+
+    mock_gc_freeze.assert_called_once_with()
+    self.assertTrue(self.optimizely.config.is_frozen())
+    self.assertTrue(self.optimizely.set_forced_variation('test_experiment', 'test_user', 'variation'))
+    self.assertEqual('variation', self.optimizely.get_variation('test_experiment', 'test_user'))
+    self.assertEqual(1, self.optimizely.notification_center.add_notification_listener(
+      enums.NotificationTypes.ACTIVATE, mock.MagicMock()
+    ))
+
+  def test_freeze_for_fork__lazy_config(self):
+    """ Test that freeze_for_fork compiles everything a config in lazy mode left uncompiled. """
+
+    config_dict = copy.deepcopy(self.config_dict)
+    config_dict['experiments'][0]['status'] = 'Paused'
+    opt_obj = optimizely.Optimizely(json.dumps(config_dict), lazy_config=True)
+    self.assertNotIn('test_experiment', opt_obj.config.variation_key_map)
+
+    with mock.patch('gc.freeze', create=True):
+      opt_obj.freeze_for_fork()
+
+    self.assertIn('test_experiment', opt_obj.config.variation_key_map)
+    self.assertTrue(opt_obj.config.is_frozen())
+
+  def test_freeze_for_fork__invalid_object(self):
+    """ Test that freeze_for_fork logs error if Optimizely object is not created correctly. """
+
+    opt_obj = optimizely.Optimizely('invalid_file')
+
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging, \
+         mock.patch('gc.freeze', create=True) as mock_gc_freeze:
+      opt_obj.freeze_for_fork()
+
+    mock_client_logging.error.assert_called_once_with('Datafile has invalid format. Failing "freeze_for_fork".')
+    self.assertEqual(0, mock_gc_freeze.call_count)
+
+  def test_init__config_manager(self):
+    """ Test that the client switches over to configs published by its config manager,
+    keeping forced variations and notification listeners. """
+
+    manager = config_manager.StaticConfigManager(json.dumps(self.config_dict))
+    opt_obj = optimizely.Optimizely(config_manager=manager)
+    self.assertIs(manager.get_config(), opt_obj.config)
+
+    callback = mock.MagicMock()
+    opt_obj.notification_center.add_notification_listener(enums.NotificationTypes.ACTIVATE, callback)
+    self.assertTrue(opt_obj.set_forced_variation('test_experiment', 'test_user', 'control'))
+    previous_decision_service = opt_obj.decision_service
+
+    new_config_dict = copy.deepcopy(self.config_dict)
+    new_config_dict['revision'] = '43'
+    with mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      manager.set_datafile(json.dumps(new_config_dict))
+      self.assertEqual('control', opt_obj.activate('test_experiment', 'test_user'))
+
+    self.assertIs(manager.get_config(), opt_obj.config)
+    self.assertIs(manager.get_config(), opt_obj.decision_service.config)
+    self.assertIs(manager.get_config(), opt_obj.event_builder.config)
+    self.assertIsNot(previous_decision_service, opt_obj.decision_service)
+    self.assertEqual('43', mock_dispatch_event.call_args[0][0].params['revision'])
+    self.assertEqual(1, callback.call_count)
+
+  def test_init__config_manager_without_config(self):
+    """ Test that API calls fail until the config manager publishes a config. """
+
+    manager = config_manager.StaticConfigManager()
+    opt_obj = optimizely.Optimizely(config_manager=manager)
+    self.assertTrue(opt_obj.is_valid)
+
+    with mock.patch.object(opt_obj, 'logger') as mock_client_logging:
+      self.assertIsNone(opt_obj.get_variation('test_experiment', 'test_user'))
+
+    mock_client_logging.error.assert_called_once_with('Datafile has invalid format. Failing "get_variation".')
+
+    manager.set_datafile(json.dumps(self.config_dict))
+    self.assertEqual('control', opt_obj.get_variation('test_experiment', 'user_1'))
+
+  def test_activate__config_updated_during_call(self):
+    """ Test that an API call runs against the config it started with when a new config is published meanwhile. """
+
+    manager = config_manager.StaticConfigManager(json.dumps(self.config_dict))
+    opt_obj = optimizely.Optimizely(config_manager=manager)
+    new_config_dict = copy.deepcopy(self.config_dict)
+    new_config_dict['revision'] = '43'
+    new_config_dict['experiments'][0]['key'] = 'renamed_experiment'
+
+    def side_effect(*args, **kwargs):
+      manager.set_datafile(json.dumps(new_config_dict))
+      return self.project_config.get_variation_from_id('test_experiment', '111129')
+
+    with mock.patch('optimizely.decision_service.DecisionService.get_variation', side_effect=side_effect), \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      self.assertEqual('variation', opt_obj.activate('test_experiment', 'test_user'))
+
+    self.assertEqual('43', opt_obj.config.get_revision())
+    impression_event = mock_dispatch_event.call_args[0][0]
+    self.assertEqual('42', impression_event.params['revision'])
+    self.assertEqual('111127', impression_event.params['visitors'][0]['snapshots'][0]['decisions'][0]['experiment_id'])
+
+  def test_close(self):
+    """ Test that a closed client keeps its config and is no longer referenced by the config manager. """
+
+    manager = config_manager.StaticConfigManager(json.dumps(self.config_dict))
+    opt_obj = optimizely.Optimizely(config_manager=manager)
+    opt_obj.close()
+
+    new_config_dict = dict(self.config_dict, revision='43')
+    manager.set_datafile(json.dumps(new_config_dict))
+
+    self.assertEqual('42', opt_obj.config.get_revision())
+    self.assertEqual((), manager._config_listeners)
+
 
 class OptimizelyWithExceptionTest(base.BaseTest):
 
@@ -2374,20 +2707,17 @@ class OptimizelyWithLoggingTest(base.BaseTest):
     user_id = 'test_user'
     event_key = 'test_event'
     mock_client_logger = mock.patch.object(self.optimizely, 'logger')
-    mock_config_logger = mock.patch.object(self.optimizely.config, 'logger')
     mock_decision_logger = mock.patch.object(self.optimizely.decision_service, 'logger')
     with mock.patch('optimizely.helpers.audience.is_user_in_experiment',
                     return_value=False), \
          mock.patch('time.time', return_value=42), \
          mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'), \
          mock_decision_logger as mock_decision_logging, \
-         mock_config_logger as mock_config_logging, \
          mock_client_logger as mock_client_logging:
       self.optimizely.track(event_key, user_id)
 
-    mock_config_logging.debug.assert_called_once_with(
-      'User "test_user" is not in the forced variation map.'
-    )
+    # Forced variations are not looked up while no user is forced into any
+    self.assertEqual(0, mock_decision_logging.debug.call_count)
     mock_decision_logging.info.assert_called_once_with(
       'User "test_user" does not meet conditions to be in experiment "test_experiment".'
     )
@@ -2415,11 +2745,9 @@ class OptimizelyWithLoggingTest(base.BaseTest):
     """ Test that expected log messages are logged during activate when audience conditions are not met. """
 
     mock_client_logger = mock.patch.object(self.optimizely, 'logger')
-    mock_config_logger = mock.patch.object(self.optimizely.config, 'logger')
     mock_decision_logger = mock.patch.object(self.optimizely.decision_service, 'logger')
 
     with mock_decision_logger as mock_decision_logging, \
-         mock_config_logger as mock_config_logging, \
          mock_client_logger as mock_client_logging:
       self.optimizely.activate(
         'test_experiment',
@@ -2427,9 +2755,8 @@ class OptimizelyWithLoggingTest(base.BaseTest):
         attributes={'test_attribute': 'wrong_test_value'}
       )
 
-    mock_config_logging.debug.assert_called_once_with(
-      'User "test_user" is not in the forced variation map.'
-    )
+    # Forced variations are not looked up while no user is forced into any
+    self.assertEqual(0, mock_decision_logging.debug.call_count)
     mock_decision_logging.info.assert_called_once_with(
       'User "test_user" does not meet conditions to be in experiment "test_experiment".'
     )
@@ -2575,19 +2902,16 @@ class OptimizelyWithLoggingTest(base.BaseTest):
     experiment_key = 'test_experiment'
     user_id = 'test_user'
 
-    mock_config_logger = mock.patch.object(self.optimizely.config, 'logger')
     mock_decision_logger = mock.patch.object(self.optimizely.decision_service, 'logger')
-    with mock_decision_logger as mock_decision_logging, \
-           mock_config_logger as mock_config_logging:
+    with mock_decision_logger as mock_decision_logging:
       self.optimizely.get_variation(
         experiment_key,
         user_id,
         attributes={'test_attribute': 'wrong_test_value'}
       )
 
-    mock_config_logging.debug.assert_called_once_with(
-      'User "test_user" is not in the forced variation map.'
-    )
+    # Forced variations are not looked up while no user is forced into any
+    self.assertEqual(0, mock_decision_logging.debug.call_count)
     mock_decision_logging.info.assert_called_once_with(
       'User "test_user" does not meet conditions to be in experiment "test_experiment".'
     )
@@ -0,0 +1,191 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import unittest
+
+from optimizely import decision_cache
+from optimizely import decision_service
+from optimizely import optimizely
+from optimizely import shared_decision_cache
+
+from . import base
+
+
+def _decide_in_child_process(cache, datafile):
+  """ Make a decision in another process using the given cache. """
+
+  optimizely_instance = optimizely.Optimizely(datafile, decision_cache=cache)
+  optimizely_instance.get_variation('test_experiment', 'test_user')
+  cache.close()
+
+
+@unittest.skipUnless(shared_decision_cache.is_supported(), 'Shared memory requires Python 3.8 or later.')
+class SharedMemoryDecisionCacheTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.cache = shared_decision_cache.SharedMemoryDecisionCache(capacity=64)
+    self.datafile = json.dumps(self.config_dict_with_features)
+    self.optimizely = optimizely.Optimizely(self.datafile, decision_cache=self.cache)
+    self.project_config = self.optimizely.config
+
+  def tearDown(self):
+    self.cache.close()
+    self.cache.unlink()
+
+  def _get_key(self, config, user_id='test_user'):
+    return self.cache.get_key(config, decision_cache.KIND_EXPERIMENT, 'test_experiment', user_id, None)
+
+  def test_save_and_lookup(self):
+    """ Test that decisions are decoded into entities of the config of the key. """
+
+    experiment = self.project_config.get_experiment_from_key('test_experiment')
+    variation = self.project_config.get_variation_from_key('test_experiment', 'variation')
+    decision = decision_service.Decision(experiment, variation, decision_service.DECISION_SOURCE_EXPERIMENT)
+    self.cache.save(self._get_key(self.project_config), decision)
+
+    other_config = optimizely.Optimizely(self.datafile).config
+    cached_decision = self.cache.lookup(self._get_key(other_config))
+
+    self.assertIs(other_config.get_experiment_from_key('test_experiment'), cached_decision.experiment)
+    self.assertIs(other_config.get_variation_from_key('test_experiment', 'variation'), cached_decision.variation)
+    self.assertEqual(decision_service.DECISION_SOURCE_EXPERIMENT, cached_decision.source)
+
+    no_decision = decision_service.Decision(None, None, decision_service.DECISION_SOURCE_ROLLOUT)
+    self.cache.save(self._get_key(self.project_config, 'other_user'), no_decision)
+    self.assertEqual(no_decision, self.cache.lookup(self._get_key(self.project_config, 'other_user')))
+
+  def test_get_key(self):
+    """ Test that keys do not depend on the order of attributes and keys with unserializable attributes are None. """
+
+    key = self.cache.get_key(self.project_config, decision_cache.KIND_FEATURE, 'f', 'u', {'a': 1, 'b': 'x'})
+
+    self.assertEqual(key.digest, self.cache.get_key(self.project_config, decision_cache.KIND_FEATURE,
+                                                     'f', 'u', {'b': 'x', 'a': 1}).digest)
+    self.assertNotEqual(key.digest, self.cache.get_key(self.project_config, decision_cache.KIND_FEATURE,
+                                                        'f', 'u', {'a': True, 'b': 'x'}).digest)
+    self.assertIsNone(self.cache.get_key(self.project_config, decision_cache.KIND_FEATURE, 'f', 'u', {'a': object()}))
+
+  def test_lookup__other_revision(self):
+    """ Test that decisions made with another config revision are not used. """
+
+    self.optimizely.get_variation('test_experiment', 'test_user')
+    other_config = optimizely.Optimizely(json.dumps(dict(self.config_dict_with_features, revision='43'))).config
+
+    self.assertIsNone(self.cache.lookup(self._get_key(other_config)))
+
+  def test_lookup__other_project(self):
+    """ Test that decisions made for another project at the same revision are not used. """
+
+    self.optimizely.get_variation('test_experiment', 'test_user')
+    other_config = optimizely.Optimizely(json.dumps(dict(self.config_dict_with_features, projectId='999'))).config
+    key = self._get_key(self.project_config)
+    other_key = self._get_key(other_config)
+
+    self.assertNotEqual(key.digest, other_key.digest)
+    self.assertNotEqual(key.revision_tag, other_key.revision_tag)
+    self.assertIsNone(self.cache.lookup(other_key))
+
+  def test_lookup__corrupted_record(self):
+    """ Test that records whose checksum does not match, e.g. being written concurrently, are ignored. """
+
+    self.optimizely.get_variation('test_experiment', 'test_user')
+    key = self._get_key(self.project_config)
+    offset = self.cache._get_slot_offsets(key.digest)[0]
+    self.assertIsNotNone(self.cache.lookup(key))
+
+    self.cache._shm.buf[offset + 20] ^= 0xff
+    self.assertIsNone(self.cache.lookup(key))
+
+  def test_lookup__expired(self):
+    """ Test that decisions expire after the timeout. """
+
+    with mock.patch('time.time', return_value=100):
+      self.optimizely.get_variation('test_experiment', 'test_user')
+
+    with mock.patch('time.time', return_value=100 + self.cache.timeout + 1):
+      self.assertIsNone(self.cache.lookup(self._get_key(self.project_config)))
+
+  def test_save__evicts_when_slots_taken(self):
+    """ Test that the record in the slot a key hashes to is overwritten once all slots it may be kept in are taken. """
+
+    cache = shared_decision_cache.SharedMemoryDecisionCache(capacity=2)
+    try:
+      decision = decision_service.Decision(None, None, decision_service.DECISION_SOURCE_EXPERIMENT)
+      for idx in range(3):
+        cache.save(cache.get_key(self.project_config, decision_cache.KIND_EXPERIMENT, 'e', str(idx), None), decision)
+
+      self.assertEqual(2, cache.get_metrics()['entries'])
+      self.assertEqual(1, cache.get_metrics()['evictions'])
+
+      cache.reset()
+      self.assertEqual(0, cache.get_metrics()['entries'])
+    finally:
+      cache.close()
+      cache.unlink()
+
+  def test_attach(self):
+    """ Test that caches attached to by name or unpickled share decisions. """
+
+    self.optimizely.get_variation('test_experiment', 'test_user')
+
+    attached_cache = shared_decision_cache.SharedMemoryDecisionCache(name=self.cache.name, create=False)
+    unpickled_cache = pickle.loads(pickle.dumps(self.cache))
+    try:
+      self.assertEqual(self.cache.capacity, attached_cache.capacity)
+      self.assertIsNotNone(attached_cache.lookup(self._get_key(self.project_config)))
+      self.assertIsNotNone(unpickled_cache.lookup(self._get_key(self.project_config)))
+    finally:
+      attached_cache.close()
+      unpickled_cache.close()
+
+  def test_attach__from_independent_process(self):
+    """ Test that the block is kept once an independent process attached to it and exited. """
+
+    self.optimizely.get_variation('test_experiment', 'test_user')
+
+    code = ('from optimizely import shared_decision_cache\n'
+            'cache = shared_decision_cache.SharedMemoryDecisionCache(name=%r, create=False)\n'
+            'cache.close()\n' % self.cache.name)
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     stderr=subprocess.STDOUT)
+
+    self.assertNotIn(b'leaked', output)
+    attached_cache = shared_decision_cache.SharedMemoryDecisionCache(name=self.cache.name, create=False)
+    try:
+      self.assertIsNotNone(attached_cache.lookup(self._get_key(self.project_config)))
+    finally:
+      attached_cache.close()
+
+  def test_decision_made_in_other_process(self):
+    """ Test that decisions made in another process are used. """
+
+    process = multiprocessing.get_context('fork').Process(target=_decide_in_child_process,
+                                                          args=(self.cache, self.datafile))
+    process.start()
+    process.join()
+
+    self.assertEqual(0, process.exitcode)
+    with mock.patch('optimizely.bucketer.Bucketer.bucket') as mock_bucket:
+      self.optimizely.get_variation('test_experiment', 'test_user')
+
+    self.assertEqual(0, mock_bucket.call_count)
+    self.assertEqual(1, self.cache.get_metrics()['hits'])
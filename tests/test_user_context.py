@@ -0,0 +1,162 @@
+# Copyright 2018, Optimizely
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mock
+
+from optimizely import decision_service
+from optimizely import optimizely
+from optimizely import project_config
+from optimizely import user_context
+from optimizely.helpers import enums
+
+from . import base
+
+
+class UserContextTest(base.BaseTest):
+
+  def setUp(self):
+    base.BaseTest.setUp(self)
+    self.optimizely = optimizely.Optimizely(json.dumps(self.config_dict_with_features))
+    self.project_config = self.optimizely.config
+    self.attributes = {'test_attribute': 'test_value_1', '$opt_bucketing_id': 'bucket_1'}
+
+  def test_create_user_context(self):
+    """ Test that contexts copy the attributes they are created with. """
+
+    context = self.optimizely.create_user_context('test_user', self.attributes)
+    self.attributes['test_attribute'] = 'test_value_2'
+
+    self.assertIsInstance(context, user_context.UserContext)
+    self.assertEqual('test_user', context.user_id)
+    self.assertEqual({'test_attribute': 'test_value_1', '$opt_bucketing_id': 'bucket_1'}, context.attributes)
+
+  def test_create_user_context__invalid_inputs(self):
+    """ Test that no context is created for invalid user IDs or attributes. """
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertIsNone(self.optimizely.create_user_context(99))
+      self.assertIsNone(self.optimizely.create_user_context('test_user', 'invalid'))
+
+    mock_client_logging.error.assert_any_call(enums.Errors.INVALID_INPUT_ERROR.format('user_id'))
+    mock_client_logging.error.assert_any_call('Provided attributes are in an invalid format.')
+
+  def test_decisions__same_as_client(self):
+    """ Test that contexts decide as the client does. """
+
+    context = self.optimizely.create_user_context('test_user', self.attributes)
+
+    with mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event'):
+      self.assertEqual(self.optimizely.activate('test_experiment', 'test_user', self.attributes),
+                       context.activate('test_experiment'))
+      self.assertEqual(self.optimizely.get_variation('test_experiment', 'test_user', self.attributes),
+                       context.get_variation('test_experiment'))
+      self.assertEqual(self.optimizely.is_feature_enabled('test_feature_in_rollout', 'test_user', self.attributes),
+                       context.is_feature_enabled('test_feature_in_rollout'))
+      self.assertEqual(self.optimizely.get_enabled_features('test_user', self.attributes),
+                       context.get_enabled_features())
+      self.assertEqual(
+        self.optimizely.get_feature_variable_integer('test_feature_in_experiment', 'count', 'test_user',
+                                                     self.attributes),
+        context.get_feature_variable_integer('test_feature_in_experiment', 'count')
+      )
+      self.assertEqual(
+        self.optimizely.get_all_feature_variables('test_feature_in_experiment', 'test_user', self.attributes),
+        context.get_all_feature_variables('test_feature_in_experiment')
+      )
+
+  def test_decisions__invalid_keys(self):
+    """ Test that invalid keys are reported as by the client. """
+
+    context = self.optimizely.create_user_context('test_user')
+
+    with mock.patch.object(self.optimizely, 'logger') as mock_client_logging:
+      self.assertIsNone(context.activate(None))
+      self.assertFalse(context.is_feature_enabled(''))
+      self.assertIsNone(context.get_feature_variable_string('test_feature_in_experiment', None))
+
+    mock_client_logging.error.assert_has_calls([
+      mock.call(enums.Errors.INVALID_INPUT_ERROR.format('experiment_key')),
+      mock.call(enums.Errors.INVALID_INPUT_ERROR.format('feature_key')),
+      mock.call(enums.Errors.INVALID_INPUT_ERROR.format('variable_key'))
+    ])
+
+  def test_decisions__memoized(self):
+    """ Test that the bucketing ID and audiences are determined once across decisions. """
+
+    context = self.optimizely.create_user_context('test_user', self.attributes)
+
+    with mock.patch('optimizely.decision_service.DecisionService._get_bucketing_id',
+                    return_value='bucket_1') as mock_get_bucketing_id, \
+        mock.patch.object(self.project_config, 'get_audience',
+                          wraps=self.project_config.get_audience) as mock_get_audience:
+      context.is_feature_enabled('test_feature_in_rollout')
+      context.is_feature_enabled('test_feature_in_experiment_and_rollout')
+      context.get_feature_variable_string('test_feature_in_rollout', 'message')
+
+    self.assertEqual(1, mock_get_bucketing_id.call_count)
+    # Audience 11154 is looked up once for its conditions and once for evaluating them
+    self.assertEqual(2, mock_get_audience.call_count)
+
+  def test_activate__event_attributes_memoized(self):
+    """ Test that the attributes sent with events are built once, each event getting its own copy. """
+
+    context = self.optimizely.create_user_context('test_user', self.attributes)
+
+    with mock.patch('optimizely.event_builder.EventBuilder._get_attributes',
+                    return_value=[{'key': 'test_attribute'}]) as mock_get_attributes, \
+            mock.patch('optimizely.event_dispatcher.EventDispatcher.dispatch_event') as mock_dispatch_event:
+      context.activate('test_experiment')
+      context.track('test_event')
+
+    self.assertEqual(1, mock_get_attributes.call_count)
+    self.assertEqual(2, mock_dispatch_event.call_count)
+    impression_attributes = mock_dispatch_event.call_args_list[0][0][0].params['visitors'][0]['attributes']
+    conversion_attributes = mock_dispatch_event.call_args_list[1][0][0].params['visitors'][0]['attributes']
+    self.assertEqual(impression_attributes, conversion_attributes)
+    self.assertIsNot(impression_attributes[0], conversion_attributes[0])
+
+  def test_get_variation__user_profile_looked_up_once(self):
+    """ Test that the user's profile is looked up once and kept up to date with the decisions saved. """
+
+    user_profile_service = mock.Mock(lookup=mock.Mock(return_value={'user_id': 'test_user',
+                                                                    'experiment_bucket_map': {}}))
+    optimizely_instance = optimizely.Optimizely(json.dumps(self.config_dict_with_features),
+                                                user_profile_service=user_profile_service)
+    context = optimizely_instance.create_user_context('test_user')
+
+    variation_key = context.get_variation('test_experiment')
+    with mock.patch('optimizely.bucketer.Bucketer.bucket') as mock_bucket:
+      self.assertEqual(variation_key, context.get_variation('test_experiment'))
+
+    self.assertEqual(0, mock_bucket.call_count)
+    user_profile_service.lookup.assert_called_once_with('test_user')
+    self.assertEqual(1, user_profile_service.save.call_count)
+
+  def test_decisions__config_updated(self):
+    """ Test that memoized results are dropped when the client switches over to another config. """
+
+    context = self.optimizely.create_user_context('test_user', self.attributes)
+    context.is_feature_enabled('test_feature_in_rollout')
+    first_decision_service = context._get_config_bundle('is_feature_enabled').decision_service
+
+    logger = self.project_config.logger
+    self.optimizely.config_manager.set_config(project_config.ProjectConfig(
+      json.dumps(dict(self.config_dict_with_features, revision='43')), logger, self.optimizely.error_handler
+    ))
+    context.is_feature_enabled('test_feature_in_rollout')
+    decision_service_in_use = context._get_config_bundle('is_feature_enabled').decision_service
+
+    self.assertIsNot(first_decision_service, decision_service_in_use)
+    self.assertIsInstance(decision_service_in_use, decision_service.UserDecisionService)
+    self.assertEqual('43', decision_service_in_use.config.revision)
@@ -60,6 +60,14 @@ class UserProfileServiceTest(unittest.TestCase):
     user_profile_service = user_profile.UserProfileService()
     self.assertEqual({'user_id': 'test_user', 'experiment_bucket_map': {}}, user_profile_service.lookup('test_user'))
 
+  def test_lookup_many(self):
+    """ Test that lookup_many looks up each user. """
+
+    user_profile_service = user_profile.UserProfileService()
+    self.assertEqual({'user_1': {'user_id': 'user_1', 'experiment_bucket_map': {}},
+                      'user_2': {'user_id': 'user_2', 'experiment_bucket_map': {}}},
+                     user_profile_service.lookup_many(['user_1', 'user_2']))
+
   def test_save(self):
     """ Test that nothing happens on calling save. """
 